@@ -6,8 +6,10 @@
 # Versão          : 1.0
 # ---------------------------------------------------------------------------------
 
-import sys, os, json, csv
-from scipy import stats
+import sys, os, re, csv, glob, math, argparse, subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import compile_cache, program_store, elf, timing, results, workspace, growth, source_metrics, hygiene, time_trace, spans
 
 # Versão do Clang utilizada
 CLANG_VERSION = 21
@@ -15,6 +17,10 @@ CLANG_VERSION = 21
 # Número de execuções para média estatística
 RUN = 2
 
+# Reaproveita o IR ligado e otimizado da primeira execução e repete só as etapas
+# medidas (opt e llc); '--full-pipeline' refaz a cadeia inteira a cada execução
+REUSE_STAGES = True
+
 # Variáveis de ambiente com base na versão do Clang
 CC   = f'clang-{CLANG_VERSION}'
 OPT  = f'opt-{CLANG_VERSION}'
@@ -40,152 +46,416 @@ BEGIN_ITERATION_RANGE = 4
 FINAL_ITERATION_RANGE = 11
 grammar_iterations = range(BEGIN_ITERATION_RANGE, FINAL_ITERATION_RANGE + 1)
 
-# Dados que serão armazenados no CSV
-csv_data = [['clang_time','opt_time','llc_time','bin_size','opt', 'iteration', 'grammar_name', 'data_structure']]
+# Cache de binários compartilhado entre os scripts de artefato
+binary_cache = compile_cache.CompileCache()
+
+# Colunas do CSV de resultados
+CSV_HEADER = (['clang_time','opt_time','llc_time','bin_size','opt', 'iteration', 'grammar_name', 'data_structure', 'data_size', 'bss_size']
+              + timing.summary_columns('clang_time') + source_metrics.COLUMNS + hygiene.ENV_COLUMNS)
+
+# Tamanho de cada função dos binários, em formato longo
+SYMBOL_HEADER = ['opt', 'iteration', 'grammar_name', 'data_structure', 'symbol', 'size']
+
+# Tempo de cada passe do opt e do llc (relatório do -time-passes), em formato longo
+PASS_HEADER = ['opt', 'iteration', 'grammar_name', 'data_structure', 'tool', 'run', 'report', 'pass',
+               'user_time', 'system_time', 'user_system_time', 'wall_time']
+
+# Nomes das colunas do relatório do -time-passes nas colunas do CSV de passes
+PASS_COLUMNS = {'User Time': 'user_time', 'System Time': 'system_time',
+                'User+System': 'user_system_time', 'Wall Time': 'wall_time'}
+
+# Colunas que identificam uma célula, usadas para retomar uma execução interrompida
+KEY_COLUMNS = ['opt', 'iteration', 'grammar_name', 'data_structure']
+
+# Tempos do '-ftime-trace' do clang por arquivo e por função (só com --time-trace)
+TRACE_HEADER = KEY_COLUMNS + time_trace.COLUMNS
+
+# Granularidade do '-ftime-trace' em µs; None desativa a coleta
+TIME_TRACE = None
+
+# Arquivos de resultado, abertos por open_results
+csv_writer    = None
+symbol_writer = None
+pass_writer   = None
+trace_writer  = None
 
-def generate_csv():
-    """Gera o arquivo CSV com os dados coletados."""
-    print(csv_data)
-    with open(f'/tmp/asymptotic_behavior.csv', 'w', newline='', encoding='utf-8') as file_csv:
-        writer = csv.writer(file_csv)
-        writer.writerows(csv_data)
+def open_results(output_dir, resume=False):
+    """Abre os CSVs de resultado, gravados linha a linha; com resume, mantém as células já medidas."""
+    global csv_writer, symbol_writer, pass_writer, trace_writer
+
+    csv_writer    = results.ResultWriter(f'{output_dir}/asymptotic_behavior.csv', CSV_HEADER, KEY_COLUMNS, resume)
+    symbol_writer = results.ResultWriter(f'{output_dir}/asymptotic_behavior_symbols.csv', SYMBOL_HEADER, KEY_COLUMNS,
+                                         resume, only=csv_writer.done)
+    pass_writer   = results.ResultWriter(f'{output_dir}/asymptotic_behavior_passes.csv', PASS_HEADER, KEY_COLUMNS,
+                                         resume, only=csv_writer.done)
+    if TIME_TRACE is not None:
+        trace_writer = results.ResultWriter(f'{output_dir}/asymptotic_behavior_time_trace.csv', TRACE_HEADER,
+                                            KEY_COLUMNS, resume, only=csv_writer.done)
+
+def close_results():
+    """Fecha os CSVs de resultado."""
+    csv_writer.close()
+    symbol_writer.close()
+    pass_writer.close()
+    if trace_writer is not None:
+        trace_writer.close()
 
 def generatePrograms(benchGen_path):
-    """Gera os programas com BenchGen para cada combinação de parâmetros."""
-    program_names = []
-    try:
-        os.chdir(f'{benchGen_path}/src/gen/')
-        if os.system('find benchGen') != 0:
-            print('Compilando BenchGen...')
-            os.system('make 2>/dev/null')
-
-        for grammar_id in grammar_ids:
-            production_rule = f'./examples/{grammar_id}/production_rule.txt'
-            seed_string     = f'./examples/{grammar_id}/seed_string.txt'
-
-            for iteration in grammar_iterations:
-                for data_structure in data_structures:
-                    program_name = f'{data_structure}_{iteration}_{grammar_id}'
-                    program_names.append(program_name)
-                    cmd = f'./benchGen {iteration} {production_rule} {seed_string} {program_name} {data_structure}'
-                    print(f'Gerando programa: {grammar_id} iteração: {iteration} estrutura: {data_structure}')
-                    os.system(f'{cmd} 2>/dev/null')
-
-                    os.system(f"echo '{grammar_id}' > ./{program_name}/src/grammar.txt")
-                    os.system(f"echo '{iteration}' > ./{program_name}/src/iteration.txt")
-                    os.system(f"echo '{data_structure}' > ./{program_name}/src/data_structure.txt")
-        return program_names
-    except OSError:
-        raise OSError("Erro ao gerar os programas!")
-
-def read_compilation_time(grammar_id):
-    """Lê o tempo médio de compilação do arquivo JSON exportado pelo Hyperfine."""
-    with open(file=f'/tmp/result_{RUN}_{grammar_id}.json', mode='r', encoding='utf-8') as file:
-        data = json.load(file)
-    return float(data['results'][0]['mean'])
-
-def read_opt_llc_size(file):
-    """Lê valores numéricos simples de arquivos (opt_time, llc_time, size)."""
-    with open(file=file, mode='r', encoding='utf-8') as f:
-        return float(f.read().strip())
+    """Gera (ou reaproveita) os programas do BenchGen para cada combinação de parâmetros."""
+    program_store.ensure_benchgen(benchGen_path)
+
+    # Gerações simultâneas; todas terminam antes das medições, que começam logo na primeira compilação
+    return list(program_store.generate_all(benchGen_path, [(grammar_id, iteration, data_structure)
+                                                           for grammar_id in grammar_ids
+                                                           for iteration in grammar_iterations
+                                                           for data_structure in data_structures]))
+
+def parse_time_passes(report):
+    """
+    Interpreta o relatório completo do '-time-passes' do opt ou do llc.
+
+    Parameters:
+        report (str): Saída de erro do opt/llc com os relatórios de tempo.
+
+    Returns:
+        tuple[float, list[dict]]: 'Total Execution Time' do primeiro relatório
+                                  (o valor usado nas colunas opt_time/llc_time)
+                                  e um registro por passe, com o nome do
+                                  relatório ('pass', 'analysis'...), o nome do
+                                  passe e as colunas de tempo presentes.
+    """
+    total   = None
+    section = None
+    columns = None
+    records = []
+
+    for line in report.splitlines():
+        stripped = line.strip()
+
+        if stripped.startswith('...') and stripped.endswith('...'):
+            section = stripped.strip('. ').replace(' timing report', '').replace(' execution', '').lower()
+            columns = None
+        elif stripped.startswith('Total Execution Time:'):
+            if total is None:
+                total = float(stripped.split()[3])
+        elif stripped.endswith('--- Name ---'):
+            columns = [name for name in re.findall(r'-{2,}\s*([^-]+?)\s*-{2,}', stripped) if name != 'Name']
+        elif columns and stripped:
+            match = re.match(r'^' + r'([\d.]+)\s*(?:\(\s*[\d.]+%\))?\s+' * len(columns) + r'(.+)$', stripped)
+            if match is None or match.group(len(columns) + 1) == 'Total':
+                continue
+
+            record = {'report': section, 'pass': match.group(len(columns) + 1)}
+            for index, column in enumerate(columns):
+                name = PASS_COLUMNS.get(column, column.lower().replace(' ', '_'))
+                record[name] = float(match.group(index + 1))
+            records.append(record)
+
+    return total, records
+
+def run_time_passes(cmd):
+    """
+    Executa o opt ou o llc com '-time-passes' e lê o relatório de tempos.
+
+    Parameters:
+        cmd (str): Comando, executado no diretório atual.
+
+    Returns:
+        tuple[float, list[dict]]: Resultado de parse_time_passes.
+    """
+    hygiene.check()
+    result = spans.run('measure', cmd.split()[0], cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                       text=True, preexec_fn=hygiene.preexec_fn())
+    with spans.span('parse', 'time passes'):
+        return parse_time_passes(result.stderr)
+
+def pass_rows(key_values, tool, run, passes):
+    """Linhas do CSV de passes para um relatório de tempos."""
+    return [list(key_values) + [tool, run, record['report'], record['pass']]
+            + [record.get(column, '') for column in PASS_HEADER[8:]]
+            for record in passes]
 
 def get_compilation_time(benchGen_root_path, opt, grammar_id):
-    """Executa Hyperfine para medir o tempo de compilação com Clang."""
+    """Mede o tempo de compilação com Clang (amostras e estatísticas, ver common/timing.py)."""
     dalloc_path = f'{benchGen_root_path}/src/Dalloc/src/'
-    os.system(f'hyperfine --warmup 1 --runs {RUN} --show-output "{CC} {opt} -S -emit-llvm *.c *.h -I{dalloc_path}" --export-json /tmp/result_{RUN}_{grammar_id}.json')
-    return read_compilation_time(grammar_id)
+    return timing.measure(f'{CC} {opt} -S -emit-llvm *.c *.h -I{dalloc_path}', RUN, 1, show_output=True)
+
+def get_time_trace(benchGen_root_path, opt):
+    """
+    Repete a etapa do clang uma vez com '-ftime-trace', fora da medição, e
+    agrega os traces por arquivo e por função (ver common/time_trace.py).
+    """
+    dalloc_path = f'{benchGen_root_path}/src/Dalloc/src/'
+    return time_trace.collect(f'{CC} {opt} -S -emit-llvm -I{dalloc_path}', sorted(glob.glob('*.c')),
+                              TIME_TRACE)
+
+def link_ir():
+    """Liga o IR de cada arquivo em 'all.bc' e o converte para texto em 'all.ll'."""
+    spans.system('compile', 'llvm-link', f'{LINK} *.ll -o all.bc')
+    spans.system('compile', 'llvm-dis', f'{DIS} all.bc -o all.ll')
 
 def get_opt_time(opt, grammar_id):
-    """Executa opt e mede o tempo total de execução das otimizações."""
-    os.system(f'{LINK} *.ll -o all.bc')
-    os.system(f'{DIS} all.bc -o all.ll')
-    
+    """Executa opt sobre 'all.ll' e retorna o tempo total das otimizações e o tempo de cada passe."""
     opt = '-O3' if opt == '-O3 -ffast-math' or opt == '-Ofast' else opt
-    os.system(OPT + " " + opt + " -time-passes all.ll -o optimized.ll 2>&1 | grep 'Total Execution Time' | head -n 1 | awk '{print $4}' > /tmp/opt_"+str(RUN)+"_" + grammar_id +".txt")
-    return read_opt_llc_size(f'/tmp/opt_{RUN}_{grammar_id}.txt')
+    return run_time_passes(f'{OPT} {opt} -time-passes all.ll -o optimized.ll')
 
 def get_binary_size(opt, grammar_id):
-    """Compila para binário final e retorna o tamanho do executável."""
-    os.system(f"{CC} {opt} optimized.ll -o a.out")
-    os.system("size ./a.out | awk 'NR==2 {print $1}' > /tmp/size_"+str(RUN)+"_"+grammar_id+".txt")
-    return read_opt_llc_size(f'/tmp/size_{RUN}_{grammar_id}.txt')
+    """Compila para binário final (ou reaproveita do cache) e retorna o tamanho das seções do executável."""
+    binary_cache.compile(f"{CC} {opt} optimized.ll -o a.out", ['optimized.ll'], CC, opt, 'a.out')
+    return elf.section_sizes('./a.out')
 
 def get_llc_time(opt, grammar_id):
-    """Mede o tempo de execução do llc na geração de código nativo."""
+    """Executa o llc na geração de código nativo e retorna o tempo total e o tempo de cada passe."""
     opt = '-O3' if opt == '-O3 -ffast-math' or opt == '-Ofast' else opt
-    os.system(LLC+" "+opt+" -time-passes  -o program.s optimized.ll 2>&1 | grep 'Total Execution Time' | head -n 1 | awk '{print $4}' > /tmp/llc_"+str(RUN)+"_" + grammar_id + ".txt")
-    return read_opt_llc_size(f'/tmp/llc_{RUN}_{grammar_id}.txt')
-
-def get_info(file):
-    """Lê informações básicas de arquivos auxiliares."""
-    with open(file=file, mode='r', encoding='utf-8') as f:
-        return f.read().strip()
-
-def clear(benchGen_root_path, program_names):
-    """Limpa os diretórios de programas gerados após a execução."""
+    return run_time_passes(f'{LLC} {opt} -time-passes -o program.s optimized.ll')
+
+def pass_growth(passes_csv, top=10):
+    """
+    Ordena os passes pela taxa de crescimento do tempo de parede com a iteração.
+    A taxa é o fator por iteração de um ajuste exponencial (mínimos quadrados
+    de log(tempo) contra a iteração) sobre a média das execuções; a coluna
+    relativa divide esse fator pelo do total da ferramenta, de modo que valores
+    acima de 1 indicam passes que crescem mais rápido que o opt/llc como um todo.
+
+    Parameters:
+        passes_csv (str): CSV de passes (asymptotic_behavior_passes.csv).
+        top (int): Número de passes retornados.
+
+    Returns:
+        list[dict]: Passes com 'tool', 'pass', 'opt', 'grammar_name',
+                    'data_structure', 'growth', 'relative' e 'last_time'
+                    (tempo médio na maior iteração), do maior para o menor 'growth'.
+    """
+    times  = {}
+    totals = {}
+
+    with open(passes_csv, mode='r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['report'] != 'pass' or row['wall_time'] == '':
+                continue
+            cell      = (row['tool'], row['opt'], row['grammar_name'], row['data_structure'])
+            iteration = int(row['iteration'])
+            wall      = float(row['wall_time'])
+
+            times.setdefault(cell + (row['pass'],), {}).setdefault(iteration, {})
+            times[cell + (row['pass'],)][iteration][row['run']] = wall
+            totals.setdefault(cell, {}).setdefault(iteration, {}).setdefault(row['run'], 0.0)
+            totals[cell][iteration][row['run']] += wall
+
+    def rate(by_iteration):
+        points = [(iteration, math.log(sum(runs.values()) / len(runs)))
+                  for iteration, runs in by_iteration.items() if sum(runs.values()) > 0]
+        if len(points) < 2:
+            return None
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        var_x  = sum((x - mean_x) ** 2 for x, _ in points)
+        return math.exp(sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x) if var_x else None
+
+    total_rates = {cell: rate(by_iteration) for cell, by_iteration in totals.items()}
+    ranking     = []
+
+    for (tool, opt, grammar, data_structure, name), by_iteration in times.items():
+        growth = rate(by_iteration)
+        if growth is None:
+            continue
+        total = total_rates.get((tool, opt, grammar, data_structure))
+        runs  = by_iteration[max(by_iteration)]
+        ranking.append({'tool': tool, 'pass': name, 'opt': opt, 'grammar_name': grammar, 'data_structure': data_structure,
+                        'growth': growth, 'relative': growth / total if total else None,
+                        'last_time': sum(runs.values()) / len(runs)})
+
+    return sorted(ranking, key=lambda item: item['growth'], reverse=True)[:top]
+
+def print_pass_growth(passes_csv, top):
+    """Mostra os passes que mais crescem com a iteração."""
+    print(f"{'tool':<5} {'opt':<16} {'grammar':<8} {'growth':>8} {'relative':>9} {'last (s)':>10}  pass")
+    for item in pass_growth(passes_csv, top):
+        relative = f"{item['relative']:.3f}" if item['relative'] is not None else '-'
+        print(f"{item['tool']:<5} {item['opt']:<16} {item['grammar_name']:<8} {item['growth']:>8.3f} {relative:>9} "
+              f"{item['last_time']:>10.6f}  {item['pass']}")
+
+def run_pipeline(benchGen_root_path, opt, grammar_id, key_values, reuse_stages=None):
+    """
+    Executa as RUN repetições da cadeia clang → llvm-link → opt → llc no
+    diretório atual. Com reaproveitamento de etapas, o clang, a ligação e o
+    binário final são feitos só na primeira repetição, e as seguintes repetem
+    apenas o opt (sobre o mesmo 'all.ll') e o llc (sobre o mesmo 'optimized.ll').
+
+    Parameters:
+        benchGen_root_path (str): Caminho raiz do BenchGen.
+        opt (str): Otimização utilizada.
+        grammar_id (str): Identificador da gramática.
+        key_values (list): Colunas que identificam a célula nos CSVs.
+        reuse_stages (bool): Sobrepõe REUSE_STAGES.
+
+    Returns:
+        dict: 'clang_time' (medição da primeira repetição), 'opt_times',
+              'llc_times', 'bin_size', 'symbols', 'passes' (linhas do CSV de passes)
+              e, com TIME_TRACE, 'time_trace' (linhas do CSV do '-ftime-trace').
+    """
+    reuse_stages = REUSE_STAGES if reuse_stages is None else reuse_stages
+    result = {'opt_times': [], 'llc_times': [], 'passes': []}
+
+    for i in range(RUN):
+        print(f'OTIMIZAÇÃO: {opt}, EXECUÇÃO: {i+1}/{RUN}')
+        full = i == 0 or not reuse_stages
+
+        if full:
+            clang_time = get_compilation_time(benchGen_root_path, opt, grammar_id)
+            link_ir()
+            if i == 0:
+                result['clang_time'] = clang_time
+                if TIME_TRACE is not None:
+                    result['time_trace'] = time_trace.rows(key_values, get_time_trace(benchGen_root_path, opt))
+
+        opt_time, opt_passes = get_opt_time(opt, grammar_id)
+
+        if full:
+            bin_size = get_binary_size(opt, grammar_id)
+            if i == 0:
+                result['bin_size'] = bin_size
+                result['symbols']  = elf.symbol_rows('./a.out', key_values)
+
+        llc_time, llc_passes = get_llc_time(opt, grammar_id)
+
+        if not reuse_stages:
+            spans.system('cleanup', 'intermediate files', 'rm -r *.ll *.bc *.s')
+
+        result['opt_times'].append(opt_time)
+        result['llc_times'].append(llc_time)
+        result['passes'] += pass_rows(key_values, 'opt', i, opt_passes) + pass_rows(key_values, 'llc', i, llc_passes)
+
+    if reuse_stages:
+        spans.system('cleanup', 'intermediate files', 'rm -r *.ll *.bc *.s')
+
+    return result
+
+def report_fits(output_dir, save=False):
+    """
+    Ajusta os modelos de crescimento aos resultados gravados até agora e mostra
+    o melhor modelo de cada grupo (ver common/growth.py).
+
+    Parameters:
+        output_dir (str): Diretório dos CSVs de resultado.
+        save (bool): Grava também asymptotic_behavior_fits.csv.
+    """
+    rows = growth.fit_csv(f'{output_dir}/asymptotic_behavior.csv')
+    growth.print_fits(rows)
+    if save:
+        growth.write_fits(rows, f'{output_dir}/asymptotic_behavior_fits.csv')
+
+def clear(benchGen_root_path, program_paths):
+    """Remove os projetos gerados após a execução (por padrão eles são mantidos para reuso)."""
     os.chdir(f'{benchGen_root_path}/src/gen')
-    for program_name in program_names:
-        os.system(f'rm -r {program_name}')
-
-def usage():
-    """Exibe instruções de uso do script."""
-    print("BenchGen 'Comportamento Assintótico' artifact")
-    print("Usage: python asymptotic_behavior.py <OPTIONS>")
-    print("OPTIONS: (-h | --help) | ('BenchGen root path')")
+    for program_path in program_paths:
+        spans.system('cleanup', 'generated project', f'rm -r {program_path}')
+
+def parse_args(argv):
+    """
+    Lê as opções de linha de comando do script.
+
+    Parameters:
+        argv (list[str]): Argumentos recebidos, sem o nome do script.
+
+    Returns:
+        argparse.Namespace: Opções interpretadas.
+    """
+    parser = argparse.ArgumentParser(
+        prog='asymptotic_behavior.py',
+        description="BenchGen 'Comportamento Assintótico' artifact")
+    parser.add_argument('benchGen_root_path', nargs='?',
+                        help='Caminho raiz do BenchGen; sem ele, só mostra os passes de --top-passes')
+    parser.add_argument('--clean', action='store_true', help='Remove os programas gerados ao final')
+    parser.add_argument('--full-pipeline', action='store_true',
+                        help='Refaz a cadeia clang → opt → llc inteira a cada execução')
+    parser.add_argument('--fit', action='store_true',
+                        help='Ajusta modelos de crescimento após cada programa e grava <output-dir>/asymptotic_behavior_fits.csv')
+    parser.add_argument('--top-passes', type=int, default=None, metavar='N',
+                        help='Mostra os N passes que mais crescem com a iteração, lidos de '
+                             '<output-dir>/asymptotic_behavior_passes.csv')
+    workspace.add_workspace_arguments(parser)
+    timing.add_adaptive_arguments(parser)
+    hygiene.add_hygiene_arguments(parser)
+    time_trace.add_time_trace_arguments(parser)
+    results.add_output_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if args.benchGen_root_path is None and args.top_passes is None:
+        parser.error('the BenchGen root path is required unless --top-passes is given')
+    return args
 
 if __name__ == '__main__':
 
     if os.name == 'win32':
         raise Exception('Este script não é compatível com Windows!')
 
-    args = sys.argv
-
-    if len(args) > 1:
-        option = args[1]
-        if option in ('-h', '--help'):
-            usage()
-        else:
-            benchGen_root_path = option.rstrip('/')
-
-            print('Gerando programas...')
-            program_names = generatePrograms(benchGen_root_path)
-
-            print('Compilando programas')
-            for program_name in program_names:
-                grammar_id = program_name.split("_")[-1].strip()
-                for opt in opts:
-                    program_src_path = f'{benchGen_root_path}/src/gen/{program_name}/src/'
-                    os.chdir(program_src_path)
-                    llc_times = []
-                    opt_times = []
-
-                    for i in range(RUN):
-                        print(f'PROGRAMA {program_name}, OTIMIZAÇÃO: {opt}, EXECUÇÃO: {i+1}/{RUN}')
-                        if i == 0:
-                            clang_time = get_compilation_time(benchGen_root_path, opt, grammar_id)
-                            opt_time = get_opt_time(opt, grammar_id)
-                            bin_size = get_binary_size(opt, grammar_id)
-                            llc_time = get_llc_time(opt, grammar_id)
-                        else:
-                            _ = get_compilation_time(benchGen_root_path, opt, grammar_id)
-                            opt_time = get_opt_time(opt, grammar_id)
-                            _ = get_binary_size(opt, grammar_id)
-                            llc_time = get_llc_time(opt, grammar_id)
-
-                        os.system('rm -r *.ll *.bc *.s')
-                        opt_times.append(opt_time)
-                        llc_times.append(llc_time)
-
-                    opt_avg = sum(opt_times) / len(opt_times)
-                    llc_avg = sum(llc_times) / len(llc_times)
-
-                    iteration = get_info(f'{program_src_path}iteration.txt')
-                    grammar = get_info(f'{program_src_path}grammar.txt')
-                    data_structure = get_info(f'{program_src_path}data_structure.txt')
-
-                    csv_data.append([clang_time, opt_avg, llc_avg, bin_size, opt, iteration, grammar, data_structure])
-
-            generate_csv()
-            clear(benchGen_root_path, program_names)
+    args = parse_args(sys.argv[1:])
+    timing.enable_from_args(args)
+    hygiene.enable_from_args(args)
+    if args.time_trace:
+        TIME_TRACE = args.time_trace_granularity
+    REUSE_STAGES = not args.full_pipeline
+    output_dir   = args.output_dir
+
+    if args.benchGen_root_path is None:
+        print_pass_growth(f'{os.path.abspath(output_dir)}/asymptotic_behavior_passes.csv', args.top_passes)
     else:
-        usage()
+        benchGen_root_path = os.path.abspath(args.benchGen_root_path).rstrip('/')
+        spans.enable(os.path.abspath(output_dir), 'asymptotic_behavior')
+
+        print('Gerando programas...')
+        program_paths = generatePrograms(benchGen_root_path)
+
+        open_results(os.path.abspath(output_dir), args.resume)
+
+        area = workspace.Workspace() if args.ram_workspace else None
+
+        print('Compilando programas')
+        for program_path in program_paths:
+            manifest   = program_store.load_manifest(program_path)
+            grammar_id = manifest['grammar']
+            work_path  = area.stage(program_path) if area else program_path
+            for opt in opts:
+                if csv_writer.is_done(opt, manifest['iteration'], manifest['grammar'], manifest['data_structure']):
+                    print(f'PROGRAMA {manifest["name"]}, OTIMIZAÇÃO: {opt} já está nos resultados')
+                    continue
+
+                program_src_path = f'{work_path}/src/'
+                os.chdir(program_src_path)
+                key_values = [opt, manifest['iteration'], manifest['grammar'], manifest['data_structure']]
+
+                print(f'PROGRAMA {manifest["name"]}')
+                pipeline   = run_pipeline(benchGen_root_path, opt, grammar_id, key_values)
+                clang_time = pipeline['clang_time']
+                bin_size   = pipeline['bin_size']
+
+                opt_avg = sum(pipeline['opt_times']) / len(pipeline['opt_times'])
+                llc_avg = sum(pipeline['llc_times']) / len(pipeline['llc_times'])
+
+                iteration = manifest['iteration']
+                grammar = manifest['grammar']
+                data_structure = manifest['data_structure']
+
+                symbol_writer.write_rows(pipeline['symbols'])
+                pass_writer.write_rows(pipeline['passes'])
+                if TIME_TRACE is not None:
+                    trace_writer.write_rows(pipeline['time_trace'])
+                csv_writer.write([clang_time['mean'], opt_avg, llc_avg, bin_size['text'], opt, iteration, grammar, data_structure,
+                                  bin_size['data'], bin_size['bss']] + timing.summary_values(clang_time)
+                                 + source_metrics.values(manifest) + hygiene.env_values(manifest, CC))
+
+            if area:
+                os.chdir(benchGen_root_path)
+                area.release(work_path)
+
+            if args.fit:
+                report_fits(os.path.abspath(output_dir))
+
+        close_results()
+        if args.fit:
+            report_fits(os.path.abspath(output_dir), save=True)
+        if args.top_passes:
+            print_pass_growth(f'{os.path.abspath(output_dir)}/asymptotic_behavior_passes.csv', args.top_passes)
+        if args.clean:
+            clear(benchGen_root_path, program_paths)
@@ -0,0 +1,4 @@
+# ---------------------------------------------------------------------------------
+# Nome do Pacote  : common
+# Descrição       : Módulos compartilhados pelos scripts de artefato do BenchGen.
+# ---------------------------------------------------------------------------------
@@ -0,0 +1,379 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : columnar.py
+# Descrição       : Armazenamento colunar dos resultados dos artefatos. Os CSVs
+#                   são convertidos uma única vez para um diretório com uma
+#                   coluna tipada por arquivo .npy (inteiros, reais ou textos
+#                   codificados por dicionário) e uma máscara explícita para os
+#                   valores ausentes, como '<not supported>' do perf. As colunas
+#                   são abertas com memória mapeada, de forma que os notebooks
+#                   carregam o histórico acumulado sem reler os CSVs, e as
+#                   métricas derivadas (speedups, IPC, taxas de falha) são
+#                   calculadas com operações vetorizadas do NumPy.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, sys, csv, json, shutil, argparse, tempfile
+import numpy as np
+
+# Valores tratados como ausentes ao ler os CSVs
+MISSING = {'', 'nan', 'NaN', '<not supported>', '<not counted>'}
+
+META_NAME = 'meta.json'
+
+# Coluna com o nome do CSV de origem de cada linha
+SOURCE_COLUMN = 'source'
+
+# Métricas derivadas calculadas por derive: nome -> (numerador, denominador), com os
+# nomes usados pelo multilang_comparison (cpu_*) e pelo path (instructions_value, cpu_cycles)
+RATIOS = {
+    'ipc': [('cpu_instructions', 'cpu_cycle'), ('instructions_value', 'cpu_cycles')],
+    'branch_miss_rate': [('cpu_branch_misses', 'cpu_branches')],
+    'cache_miss_rate': [('cpu_cache_misses', 'cpu_cache_references')],
+    'L1_dcache_miss_rate': [('cpu_L1_dcache_load_misses', 'cpu_L1_dcache_loads')],
+    'LLC_miss_rate': [('cpu_LLC_load_misses', 'cpu_LLC_loads')],
+    'dTLB_miss_rate': [('cpu_dTLB_load_misses', 'cpu_dTLB_loads')],
+}
+
+def _parse_column(raw):
+    """
+    Converte os textos de uma coluna do CSV para o tipo mais restrito que os
+    comporta (int64, float64 ou texto).
+
+    Returns:
+        tuple[str, np.ndarray, np.ndarray]: Tipo ('int', 'float' ou 'str'), valores e máscara de ausentes.
+    """
+    mask = np.array([value in MISSING for value in raw], dtype=bool)
+
+    for kind, dtype, parse in (('int', np.int64, int), ('float', np.float64, float)):
+        try:
+            values = np.array([0 if missing else parse(value) for value, missing in zip(raw, mask)], dtype=dtype)
+        except (ValueError, OverflowError):
+            continue
+        return kind, values, mask
+
+    return 'str', np.array(['' if missing else value for value, missing in zip(raw, mask)], dtype=object), mask
+
+def _promote(kind, values, target):
+    """Converte uma coluna já lida para o tipo 'target' ('float' ou 'str')."""
+    if kind == target:
+        return values
+    if target == 'float':
+        return values.astype(np.float64)
+    return np.array([str(value) for value in values], dtype=object)
+
+def _concat(parts):
+    """
+    Concatena partes de uma coluna, promovendo int para float e números para
+    texto quando os tipos das partes diferem.
+
+    Parameters:
+        parts (list[tuple]): (tipo, valores, máscara) de cada parte.
+
+    Returns:
+        tuple[str, np.ndarray, np.ndarray]: Coluna concatenada.
+    """
+    kinds  = {kind for kind, _, _ in parts}
+    target = 'str' if 'str' in kinds else 'float' if 'float' in kinds else 'int'
+    values = np.concatenate([_promote(kind, part, target) for kind, part, _ in parts])
+    mask   = np.concatenate([part_mask for _, _, part_mask in parts])
+    return target, values, mask
+
+def _missing(kind, rows):
+    """Coluna inteiramente ausente, usada quando um CSV não tem a coluna."""
+    values = np.zeros(rows, dtype=object if kind == 'str' else np.int64)
+    if kind == 'str':
+        values[:] = ''
+    return kind, values, np.ones(rows, dtype=bool)
+
+def read_csv(path):
+    """
+    Lê um CSV de resultados em colunas tipadas, acrescentando a coluna
+    SOURCE_COLUMN com o nome do arquivo.
+
+    Parameters:
+        path (str): CSV de um artefato.
+
+    Returns:
+        tuple[int, dict]: Número de linhas e {coluna: (tipo, valores, máscara)}.
+    """
+    with open(path, mode='r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        raw    = [[] for _ in header]
+        for row in reader:
+            if len(row) != len(header):
+                continue
+            for column, value in zip(raw, row):
+                column.append(value.strip())
+
+    rows    = len(raw[0]) if raw else 0
+    columns = {name: _parse_column(values) for name, values in zip(header, raw)}
+    columns[SOURCE_COLUMN] = ('str', np.array([os.path.basename(path)] * rows, dtype=object), np.zeros(rows, dtype=bool))
+    return rows, columns
+
+def _source_entry(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def write_store(store_dir, rows, columns, sources):
+    """
+    Grava as colunas no diretório do armazenamento, substituindo-o de forma
+    atômica: o novo conteúdo é escrito ao lado e só então trocado pelo antigo.
+
+    Parameters:
+        store_dir (str): Diretório do armazenamento.
+        rows (int): Número de linhas.
+        columns (dict): {coluna: (tipo, valores, máscara)}.
+        sources (list[dict]): CSVs de origem, usados para não importar o mesmo arquivo duas vezes.
+    """
+    store_dir = os.path.abspath(store_dir)
+    parent    = os.path.dirname(store_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir   = tempfile.mkdtemp(prefix=f'.{os.path.basename(store_dir)}.', dir=parent)
+
+    meta = {'rows': rows, 'columns': [], 'sources': sources}
+    for index, (name, (kind, values, mask)) in enumerate(columns.items()):
+        entry = {'name': name, 'type': kind, 'file': f'{index:04d}.npy', 'mask': f'{index:04d}.mask.npy'}
+        if kind == 'str':
+            # Textos são guardados como códigos inteiros de um dicionário
+            categories, codes = np.unique(values.astype(str), return_inverse=True)
+            entry['categories'] = categories.tolist()
+            values = codes.astype(np.int32)
+        np.save(os.path.join(tmp_dir, entry['file']), values)
+        np.save(os.path.join(tmp_dir, entry['mask']), mask)
+        meta['columns'].append(entry)
+
+    with open(os.path.join(tmp_dir, META_NAME), mode='w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    old_dir = None
+    if os.path.exists(store_dir):
+        old_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(store_dir)}.old.', dir=parent)
+        os.rename(store_dir, os.path.join(old_dir, 'store'))
+    os.rename(tmp_dir, store_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+def convert(csv_paths, store_dir, append=False):
+    """
+    Converte CSVs de resultados para o armazenamento colunar.
+
+    Parameters:
+        csv_paths (list[str]): CSVs de um mesmo artefato (ex.: várias execuções).
+        store_dir (str): Diretório do armazenamento.
+        append (bool): Acrescenta as linhas a um armazenamento existente; CSVs
+                       já importados, com o mesmo tamanho e data, são ignorados.
+
+    Returns:
+        Table: O armazenamento resultante, aberto com memória mapeada.
+    """
+    parts, sources, table = [], [], None
+
+    if append and os.path.isfile(os.path.join(store_dir, META_NAME)):
+        table = Table(store_dir)
+        parts.append((table.rows, {name: table.raw(name) for name in table.columns}))
+        sources = list(table.meta['sources'])
+
+    for path in csv_paths:
+        entry = _source_entry(path)
+        if entry in sources:
+            print(f'{path} is already in {store_dir}')
+            continue
+        parts.append(read_csv(path))
+        sources.append(entry)
+
+    if table is not None and len(parts) == 1:
+        return table
+
+    names = []
+    for _, columns in parts:
+        names += [name for name in columns if name not in names]
+
+    rows    = sum(part_rows for part_rows, _ in parts)
+    columns = {}
+    for name in names:
+        kind = next(part[name][0] for _, part in parts if name in part)
+        columns[name] = _concat([part[name] if name in part else _missing(kind, part_rows)
+                                 for part_rows, part in parts])
+
+    write_store(store_dir, rows, columns, sources)
+    return Table(store_dir)
+
+class Table:
+    """Armazenamento colunar aberto para leitura; as colunas são mapeadas só quando usadas."""
+
+    def __init__(self, store_dir):
+        """
+        Parameters:
+            store_dir (str): Diretório criado por convert.
+        """
+        self.store_dir = os.path.abspath(store_dir)
+        with open(os.path.join(self.store_dir, META_NAME), mode='r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows     = self.meta['rows']
+        self.entries  = {entry['name']: entry for entry in self.meta['columns']}
+        self.columns  = list(self.entries)
+        self.derived  = {}
+        self._arrays  = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self.entries or name in self.derived
+
+    def _load(self, file):
+        if file not in self._arrays:
+            self._arrays[file] = np.load(os.path.join(self.store_dir, file), mmap_mode='r')
+        return self._arrays[file]
+
+    def kind(self, name):
+        """Tipo de uma coluna: 'int', 'float' ou 'str'; as derivadas são 'float'."""
+        return 'float' if name in self.derived else self.entries[name]['type']
+
+    def mask(self, name):
+        """Máscara dos valores ausentes de uma coluna (True = ausente)."""
+        if name in self.derived:
+            return np.isnan(self.derived[name])
+        return self._load(self.entries[name]['mask'])
+
+    def codes(self, name):
+        """Códigos de uma coluna de texto e o seu dicionário."""
+        entry = self.entries[name]
+        return self._load(entry['file']), np.array(entry['categories'], dtype=object)
+
+    def raw(self, name):
+        """
+        Coluna no formato interno (tipo, valores, máscara), com os textos
+        decodificados; usada para acrescentar linhas ao armazenamento.
+        """
+        if self.kind(name) == 'str':
+            codes, categories = self.codes(name)
+            return 'str', categories[codes] if len(categories) else np.full(self.rows, '', dtype=object), np.array(self.mask(name))
+        return self.kind(name), np.array(self._load(self.entries[name]['file'])), np.array(self.mask(name))
+
+    def __getitem__(self, name):
+        """
+        Valores de uma coluna. Colunas numéricas voltam como float64 com NaN
+        nos ausentes; colunas de texto voltam decodificadas, com None nos ausentes.
+        """
+        if name in self.derived:
+            return self.derived[name]
+        if self.kind(name) == 'str':
+            codes, categories = self.codes(name)
+            values = categories[codes] if len(categories) else np.empty(self.rows, dtype=object)
+            return np.where(self.mask(name), None, values)
+        return np.where(self.mask(name), np.nan, self._load(self.entries[name]['file']))
+
+    def group_codes(self, columns):
+        """
+        Atribui um número a cada combinação distinta de valores das colunas.
+
+        Returns:
+            tuple[np.ndarray, int]: Grupo de cada linha e o número de grupos.
+        """
+        if not columns:
+            return np.zeros(self.rows, dtype=np.int64), 1
+        keys = []
+        for name in columns:
+            if name not in self.derived and self.kind(name) == 'str':
+                codes, _ = self.codes(name)
+                keys.append(np.where(self.mask(name), -1, codes).astype(np.float64))
+            else:
+                values = self[name]
+                keys.append(np.where(np.isnan(values), -np.inf, values))
+        unique, groups = np.unique(np.stack(keys, axis=1), axis=0, return_inverse=True)
+        return groups.reshape(-1), len(unique)
+
+    def to_pandas(self, columns=None):
+        """
+        DataFrame com as colunas pedidas (padrão: todas, inclusive as derivadas).
+        Inteiros usam o tipo Int64 do pandas, que aceita ausentes, e textos
+        viram categorias.
+        """
+        import pandas as pd
+
+        data = {}
+        for name in columns or self.columns + list(self.derived):
+            kind = self.kind(name)
+            if kind == 'str':
+                codes, categories = self.codes(name)
+                data[name] = pd.Categorical.from_codes(np.where(self.mask(name), -1, codes), categories=categories)
+            elif kind == 'int':
+                data[name] = pd.arrays.IntegerArray(np.array(self._load(self.entries[name]['file'])),
+                                                    np.array(self.mask(name)))
+            else:
+                data[name] = self[name]
+        return pd.DataFrame(data)
+
+def ratio(table, numerator, denominator):
+    """Razão vetorizada entre duas colunas; ausentes e divisões por zero viram NaN."""
+    num, den = table[numerator], table[denominator]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, num / den, np.nan)
+
+def speedup(table, metric, column, baseline, keys):
+    """
+    Speedup de cada linha em relação à linha de referência do mesmo grupo:
+    valor da referência / valor da linha (> 1 é mais rápido que a referência).
+
+    Parameters:
+        table (Table): Resultados.
+        metric (str): Métrica comparada (ex.: 'execution_time').
+        column (str): Coluna que varia dentro do grupo (ex.: 'opt', 'compiler').
+        baseline (str): Valor de 'column' usado como referência (ex.: '-O0').
+        keys (list[str]): Colunas que definem o grupo (ex.: programa, estrutura,
+                          iteração e 'source', para não misturar execuções).
+
+    Returns:
+        np.ndarray: Speedup por linha; NaN quando o grupo não tem referência.
+    """
+    groups, count = table.group_codes([key for key in keys if key != column])
+    values        = table[metric]
+    reference     = (table[column] == baseline) & ~np.isnan(values)
+
+    # Média das referências de cada grupo, para o caso de haver repetições
+    sums   = np.bincount(groups[reference], weights=values[reference], minlength=count)
+    counts = np.bincount(groups[reference], minlength=count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base = np.where(counts > 0, sums / counts, np.nan)
+        return base[groups] / values
+
+def derive(table, speedups=()):
+    """
+    Calcula as métricas derivadas disponíveis (ver RATIOS) e os speedups
+    pedidos, que ficam acessíveis como colunas da tabela.
+
+    Parameters:
+        table (Table): Resultados.
+        speedups (list[tuple]): (métrica, coluna, referência, chaves) de cada
+                                speedup; a coluna se chama '<métrica>_speedup_<coluna>'.
+
+    Returns:
+        Table: A mesma tabela, com table.derived preenchido.
+    """
+    for name, candidates in RATIOS.items():
+        for numerator, denominator in candidates:
+            if numerator in table and denominator in table:
+                table.derived[name] = ratio(table, numerator, denominator)
+                break
+
+    for metric, column, baseline, keys in speedups:
+        table.derived[f'{metric}_speedup_{column}'] = speedup(table, metric, column, baseline, keys)
+    return table
+
+def usage_parser():
+    """Cria o parser da linha de comando do armazenamento colunar."""
+    parser = argparse.ArgumentParser(prog='columnar.py', description='Armazenamento colunar dos resultados')
+    parser.add_argument('store', help='Diretório do armazenamento')
+    parser.add_argument('csv', nargs='*', help='CSVs convertidos; sem CSVs, só mostra as colunas')
+    parser.add_argument('--append', action='store_true', help='Acrescenta os CSVs ao armazenamento existente')
+    return parser
+
+if __name__ == '__main__':
+    args = usage_parser().parse_args(sys.argv[1:])
+    table = convert(args.csv, args.store, args.append) if args.csv else Table(args.store)
+
+    print(f'{table.store_dir}: {table.rows} rows from {len(table.meta["sources"])} CSV(s)')
+    for name in table.columns:
+        print(f'  {name:<32} {table.kind(name):<6} missing: {int(np.count_nonzero(table.mask(name)))}')
@@ -0,0 +1,285 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : compile_cache.py
+# Descrição       : Cache de binários endereçado por conteúdo, compartilhado
+#                   pelos scripts de artefato. A chave é o hash dos fontes, da
+#                   identidade exata do compilador (binário e versão) e das flags.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, sys, glob, json, time, shutil, hashlib, tempfile, subprocess, functools, argparse
+
+# Diretório e limite de tamanho padrão do cache (podem ser alterados por variáveis de ambiente)
+DEFAULT_DIR       = os.environ.get('BENCHGEN_CACHE_DIR', os.path.expanduser('~/.cache/benchgen-artifact/binaries'))
+DEFAULT_MAX_BYTES = int(os.environ.get('BENCHGEN_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+# Defina BENCHGEN_CACHE_DISABLE=1 para sempre recompilar
+ENABLED = os.environ.get('BENCHGEN_CACHE_DISABLE', '0') in ('', '0')
+
+BINARY_NAME = 'binary'
+META_NAME   = 'meta.json'
+
+@functools.lru_cache(maxsize=None)
+def compiler_identity(compiler):
+    """
+    Identifica o compilador pelo caminho real do executável e pela versão.
+
+    Parameters:
+        compiler (str): Nome ou caminho do compilador (ex.: 'gcc-14').
+
+    Returns:
+        str: Caminho real do binário seguido da saída de '--version'.
+    """
+    path = shutil.which(compiler) or compiler
+    path = os.path.realpath(path)
+    try:
+        version = subprocess.run([path, '--version'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        version = ''
+    return f'{path}\n{version}'
+
+def cache_key(sources, compiler, flags):
+    """
+    Calcula a chave do cache para uma compilação.
+
+    Parameters:
+        sources (list[str]): Arquivos de entrada (fontes, cabeçalhos, perfis).
+        compiler (str): Compilador utilizado.
+        flags (str): Flags que afetam o binário gerado.
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal.
+    """
+    digest = hashlib.sha256()
+    digest.update(compiler_identity(compiler).encode())
+    digest.update(b'\0')
+    digest.update(' '.join(flags.split()).encode())
+    _update_files(digest, sources)
+    return digest.hexdigest()
+
+def _update_files(digest, paths):
+    for path in sorted(paths, key=os.path.basename):
+        digest.update(b'\0')
+        digest.update(os.path.basename(path).encode())
+        digest.update(b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+
+def files_digest(paths):
+    """Hash SHA-256 dos nomes e do conteúdo dos arquivos, como na chave de cache_key."""
+    digest = hashlib.sha256()
+    _update_files(digest, paths)
+    return digest.hexdigest()
+
+def include_headers(include_dir):
+    """
+    Cabeçalhos de um diretório passado com '-I' (ex.: o Dalloc do BenchGen).
+    Eles não estão entre os fontes do projeto, mas mudam o binário, então
+    entram na chave junto com eles.
+    """
+    return sorted(glob.glob(os.path.join(include_dir, '*.h')))
+
+class CompileCache:
+    """Cache de binários com remoção LRU limitada por tamanho."""
+
+    def __init__(self, root=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root      = root
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def _read_meta(self, key):
+        with open(os.path.join(self._entry(key), META_NAME), mode='r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, entry_dir, meta):
+        tmp_path = os.path.join(entry_dir, f'.{META_NAME}.{os.getpid()}')
+        with open(tmp_path, mode='w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(entry_dir, META_NAME))
+
+    def lookup(self, key):
+        """
+        Procura um binário no cache e atualiza seu último uso.
+
+        Parameters:
+            key (str): Chave calculada por cache_key.
+
+        Returns:
+            str | None: Caminho do binário em cache, ou None se não existir.
+        """
+        binary = os.path.join(self._entry(key), BINARY_NAME)
+        if not os.path.isfile(binary):
+            return None
+
+        try:
+            meta = self._read_meta(key)
+            meta['last_used'] = time.time()
+            meta['hits'] = meta.get('hits', 0) + 1
+            self._write_meta(self._entry(key), meta)
+        except (OSError, ValueError):
+            pass
+
+        return binary
+
+    def store(self, key, binary, info=None):
+        """
+        Guarda um binário no cache. A entrada é criada em um diretório
+        temporário e renomeada, o que permite uso por processos concorrentes.
+
+        Parameters:
+            key (str): Chave calculada por cache_key.
+            binary (str): Caminho do binário compilado.
+            info (dict): Informações extras registradas no metadado.
+
+        Returns:
+            str: Caminho do binário em cache.
+        """
+        entry_dir = self._entry(key)
+        if os.path.isfile(os.path.join(entry_dir, BINARY_NAME)):
+            return os.path.join(entry_dir, BINARY_NAME)
+
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        shutil.copy2(binary, os.path.join(tmp_dir, BINARY_NAME))
+
+        now  = time.time()
+        meta = dict(info or {})
+        meta.update({'key': key, 'size': os.path.getsize(binary), 'created': now, 'last_used': now, 'hits': 0})
+        self._write_meta(tmp_dir, meta)
+
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict()
+        return os.path.join(entry_dir, BINARY_NAME)
+
+    def entries(self):
+        """
+        Lista as entradas do cache.
+
+        Returns:
+            list[dict]: Metadados das entradas, do uso mais recente ao mais antigo.
+        """
+        result = []
+        for key in os.listdir(self.root):
+            if key.startswith('.'):
+                continue
+            try:
+                result.append(self._read_meta(key))
+            except (OSError, ValueError):
+                continue
+        return sorted(result, key=lambda meta: meta.get('last_used', 0), reverse=True)
+
+    def remove(self, key):
+        """Remove uma entrada do cache."""
+        shutil.rmtree(self._entry(key), ignore_errors=True)
+
+    def evict(self):
+        """
+        Remove as entradas usadas há mais tempo até o cache caber em max_bytes.
+
+        Returns:
+            int: Número de entradas removidas.
+        """
+        entries = self.entries()
+        total   = sum(meta.get('size', 0) for meta in entries)
+        removed = 0
+
+        while entries and total > self.max_bytes:
+            meta   = entries.pop()
+            total -= meta.get('size', 0)
+            self.remove(meta['key'])
+            removed += 1
+
+        return removed
+
+    def purge(self, older_than=None):
+        """
+        Remove entradas do cache.
+
+        Parameters:
+            older_than (float): Idade mínima, em segundos desde o último uso,
+                                das entradas removidas. None remove todas.
+
+        Returns:
+            int: Número de entradas removidas.
+        """
+        now     = time.time()
+        removed = 0
+
+        for meta in self.entries():
+            if older_than is None or now - meta.get('last_used', 0) >= older_than:
+                self.remove(meta['key'])
+                removed += 1
+
+        for name in os.listdir(self.root):
+            if name.startswith('.tmp-'):
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+        return removed
+
+    def compile(self, compiling_cmd, sources, compiler, flags, output, force=False):
+        """
+        Produz o binário 'output', reaproveitando o cache quando possível.
+
+        Parameters:
+            compiling_cmd (str): Comando de compilação, executado no diretório atual.
+            sources (list[str]): Arquivos de entrada que definem o binário.
+            compiler (str): Compilador utilizado.
+            flags (str): Flags que afetam o binário gerado.
+            output (str): Caminho do binário gerado pelo comando.
+            force (bool): Compila de verdade mesmo se houver entrada no cache.
+
+        Returns:
+            bool: True se o binário veio do cache.
+        """
+        # Importado aqui para que o cache continue executável como script (list/purge)
+        from common import spans
+
+        with spans.span('compile', f'{compiler} {flags}', compiling_cmd) as current:
+            key = cache_key(sources, compiler, flags)
+
+            if ENABLED and not force:
+                cached = self.lookup(key)
+                if cached is not None:
+                    shutil.copy2(cached, output)
+                    current.set(cached=True)
+                    return True
+
+            current.set(returncode=os.waitstatus_to_exitcode(os.system(compiling_cmd)))
+
+            if ENABLED and os.path.isfile(output):
+                self.store(key, output, {'compiler': compiler, 'flags': flags,
+                                         'sources': [os.path.abspath(source) for source in sources]})
+            return False
+
+def usage_parser():
+    """Cria o parser da linha de comando do cache."""
+    parser = argparse.ArgumentParser(prog='compile_cache.py', description='BenchGen compilation cache')
+    parser.add_argument('--dir', default=DEFAULT_DIR, help='Diretório do cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='Lista as entradas do cache')
+    purge = commands.add_parser('purge', help='Remove entradas do cache')
+    purge.add_argument('--older-than', type=float, default=None,
+                       help='Remove só as entradas sem uso há mais de N dias')
+    return parser
+
+if __name__ == '__main__':
+    args  = usage_parser().parse_args(sys.argv[1:])
+    cache = CompileCache(args.dir)
+
+    if args.command == 'list':
+        total = 0
+        for meta in cache.entries():
+            total += meta.get('size', 0)
+            last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(meta.get('last_used', 0)))
+            print(f"{meta['key'][:16]}  {meta.get('size', 0):>10}  {last_used}  hits={meta.get('hits', 0):<4} "
+                  f"{meta.get('compiler', '')} {meta.get('flags', '')}")
+        print(f'Total: {total} bytes (limit {cache.max_bytes})')
+    else:
+        older_than = None if args.older_than is None else args.older_than * 86400
+        print(f'Removed {cache.purge(older_than)} entries')
@@ -0,0 +1,175 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : elf.py
+# Descrição       : Leitor de arquivos ELF em Python puro. Calcula os tamanhos
+#                   text/data/bss no formato Berkeley (como o 'size' do binutils)
+#                   e o tamanho de cada função a partir da tabela de símbolos,
+#                   sem criar processos nem arquivos temporários.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import struct
+
+from common import spans
+
+ELF_MAGIC = b'\x7fELF'
+
+# Tipos e flags de seção usados no cálculo dos tamanhos
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+SHF_WRITE  = 0x1
+SHF_ALLOC  = 0x2
+
+SHN_UNDEF  = 0
+SHN_XINDEX = 0xffff
+
+STT_FUNC = 2
+
+def _layout(elf_class, endianness):
+    """Retorna os formatos struct do cabeçalho, das seções e dos símbolos."""
+    prefix = '<' if endianness == 1 else '>'
+    if elf_class == 2:
+        return (prefix + 'HHIQQQIHHHHHH',
+                prefix + 'IIQQQQIIQQ',
+                prefix + 'IBBHQQ')
+    return (prefix + 'HHIIIIIHHHHHH',
+            prefix + 'IIIIIIIIII',
+            prefix + 'IIIBBH')
+
+def read_sections(path):
+    """
+    Lê a tabela de seções de um arquivo ELF.
+
+    Parameters:
+        path (str): Caminho do binário.
+
+    Returns:
+        tuple[list[dict], str]: Seções (nome, tipo, flags, offset, tamanho,
+                                link, entsize) e o formato struct dos símbolos.
+
+    Raises:
+        ValueError: Se o arquivo não for um ELF.
+    """
+    with open(path, 'rb') as f:
+        ident = f.read(16)
+        if len(ident) < 16 or ident[:4] != ELF_MAGIC:
+            raise ValueError(f'{path} is not an ELF file')
+
+        header_fmt, section_fmt, symbol_fmt = _layout(ident[4], ident[5])
+        header = struct.unpack(header_fmt, f.read(struct.calcsize(header_fmt)))
+        shoff, shentsize, shnum, shstrndx = header[5], header[10], header[11], header[12]
+
+        if shoff == 0:
+            return [], symbol_fmt
+
+        def read_header(index):
+            f.seek(shoff + index * shentsize)
+            return struct.unpack(section_fmt, f.read(struct.calcsize(section_fmt)))
+
+        # Com muitas seções, o número real e o índice da tabela de nomes ficam na seção 0
+        first = read_header(0)
+        if shnum == 0:
+            shnum = first[5]
+        if shstrndx == SHN_XINDEX:
+            shstrndx = first[6]
+
+        raw = [read_header(index) for index in range(shnum)]
+
+        names_header = raw[shstrndx]
+        f.seek(names_header[4])
+        names = f.read(names_header[5])
+
+    sections = []
+    for name, sh_type, flags, _, offset, size, link, _, _, entsize in raw:
+        sections.append({
+            'name': names[name:names.index(b'\0', name)].decode(errors='replace'),
+            'type': sh_type,
+            'flags': flags,
+            'offset': offset,
+            'size': size,
+            'link': link,
+            'entsize': entsize,
+        })
+    return sections, symbol_fmt
+
+def section_sizes(path):
+    """
+    Calcula os tamanhos text, data e bss de um binário, como 'size' no formato Berkeley.
+
+    Parameters:
+        path (str): Caminho do binário.
+
+    Returns:
+        dict: Tamanhos em bytes nas chaves 'text', 'data' e 'bss'.
+    """
+    with spans.span('parse', 'ELF sections'):
+        sizes = {'text': 0, 'data': 0, 'bss': 0}
+        sections, _ = read_sections(path)
+
+        for section in sections:
+            if not section['flags'] & SHF_ALLOC:
+                continue
+            if section['type'] == SHT_NOBITS:
+                sizes['bss'] += section['size']
+            elif section['flags'] & SHF_WRITE:
+                sizes['data'] += section['size']
+            else:
+                sizes['text'] += section['size']
+
+    return sizes
+
+def function_sizes(path):
+    """
+    Lê o tamanho de cada função definida no binário.
+
+    Parameters:
+        path (str): Caminho do binário.
+
+    Returns:
+        dict[str, int]: Tamanho em bytes por nome de função. Usa a tabela
+                        '.symtab' e, se o binário estiver sem ela, '.dynsym'.
+    """
+    with spans.span('parse', 'ELF symbols'):
+        sections, symbol_fmt = read_sections(path)
+        symbol_size = struct.calcsize(symbol_fmt)
+        is_64 = symbol_size == 24
+
+        tables = [s for s in sections if s['type'] == SHT_SYMTAB] or [s for s in sections if s['type'] == SHT_DYNSYM]
+        functions = {}
+
+        with open(path, 'rb') as f:
+            for table in tables:
+                strings = sections[table['link']]
+                f.seek(strings['offset'])
+                names = f.read(strings['size'])
+
+                f.seek(table['offset'])
+                data = f.read(table['size'])
+
+                for offset in range(0, len(data) - symbol_size + 1, table['entsize'] or symbol_size):
+                    fields = struct.unpack_from(symbol_fmt, data, offset)
+                    if is_64:
+                        name, info, _, shndx, _, size = fields
+                    else:
+                        name, _, size, info, _, shndx = fields
+
+                    if info & 0xf != STT_FUNC or shndx == SHN_UNDEF or size == 0:
+                        continue
+
+                    symbol = names[name:names.index(b'\0', name)].decode(errors='replace')
+                    functions[symbol] = functions.get(symbol, 0) + size
+
+    return functions
+
+def symbol_rows(path, key_values):
+    """
+    Monta linhas de CSV em formato longo com o tamanho de cada função.
+
+    Parameters:
+        path (str): Caminho do binário.
+        key_values (list): Valores que identificam a célula (programa, opt...).
+
+    Returns:
+        list[list]: Uma linha 'key_values + [função, tamanho]' por função.
+    """
+    return [list(key_values) + [symbol, size] for symbol, size in sorted(function_sizes(path).items())]
@@ -0,0 +1,227 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : growth.py
+# Descrição       : Ajuste de modelos de crescimento (linear, n·log n,
+#                   polinomial e exponencial) aos resultados do artefato
+#                   'Comportamento Assintótico'. Todos os grupos (gramática,
+#                   estrutura de dados, otimização, métrica) são ajustados de
+#                   uma vez com operações vetorizadas do NumPy; o melhor modelo
+#                   é escolhido pelo AICc e o expoente de crescimento é
+#                   reportado com intervalo de confiança.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, sys, csv, argparse
+import numpy as np
+
+# Métricas ajustadas por padrão (colunas do asymptotic_behavior.csv / cs3.csv)
+METRICS = ['clang_time', 'opt_time', 'llc_time', 'bin_size']
+
+# Colunas que identificam um grupo
+GROUP_COLUMNS = ['grammar_name', 'data_structure', 'opt']
+
+MODELS = ['linear', 'nlogn', 'polynomial', 'exponential']
+
+CONFIDENCE = 0.95
+
+FIT_HEADER = (GROUP_COLUMNS + ['metric', 'points', 'best_model', 'best_a', 'best_b',
+                               'exponent', 'exponent_ci_low', 'exponent_ci_high',
+                               'growth_factor', 'growth_factor_ci_low', 'growth_factor_ci_high']
+              + [f'{model}_aicc' for model in MODELS])
+
+def _regress(x, y, mask):
+    """
+    Regressão linear simples y = a + b·x em cada linha das matrizes, considerando
+    só as posições de 'mask'.
+
+    Returns:
+        tuple: (a, b, erro padrão de b, soma dos quadrados dos resíduos, n), um valor por linha.
+    """
+    n    = mask.sum(axis=1)
+    x    = np.where(mask, x, 0.0)
+    y    = np.where(mask, y, 0.0)
+    sx   = x.sum(axis=1)
+    sy   = y.sum(axis=1)
+    sxx  = (x * x).sum(axis=1)
+    sxy  = (x * y).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = sxx - sx * sx / n
+        b     = (sxy - sx * sy / n) / var_x
+        a     = (sy - b * sx) / n
+        rss   = (np.where(mask, y - a[:, None] - b[:, None] * x, 0.0) ** 2).sum(axis=1)
+        se_b  = np.sqrt(rss / (n - 2) / var_x)
+
+    return a, b, se_b, rss, n
+
+def _aicc(log_likelihood, n, k=3):
+    """AIC corrigido para amostras pequenas; k conta os dois coeficientes e a variância."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(n - k - 1 > 0, 2 * k - 2 * log_likelihood + 2 * k * (k + 1) / (n - k - 1), np.inf)
+
+def _normal_log_likelihood(rss, n):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -n / 2 * (np.log(2 * np.pi * np.maximum(rss, 1e-300) / n) + 1)
+
+def fit_groups(x, y, mask, confidence=CONFIDENCE):
+    """
+    Ajusta os quatro modelos a cada linha de (x, y).
+
+    Os modelos linear (y = a + b·n) e n·log n (y = a + b·n·log n) supõem erro
+    normal em y; o polinomial (y = a·n^b) e o exponencial (y = a·e^(b·n)) são
+    ajustados em log y, com erro log-normal, e a verossimilhança é levada de
+    volta à escala de y (jacobiano -Σ log y), de forma que os AICc sejam
+    comparáveis. Grupos com algum y <= 0 não recebem os modelos em log.
+
+    Parameters:
+        x (np.ndarray): Tamanhos (ex.: iteração), uma linha por grupo.
+        y (np.ndarray): Valores da métrica, com a mesma forma de x.
+        mask (np.ndarray): Posições válidas de cada linha.
+        confidence (float): Nível de confiança dos intervalos.
+
+    Returns:
+        dict: Arrays por grupo: 'points', '<modelo>_a', '<modelo>_b', '<modelo>_aicc',
+              'best_model' (índice em MODELS), 'exponent' e 'growth_factor' com
+              os limites '_ci_low' e '_ci_high'.
+    """
+    from scipy import special
+
+    positive = np.where(mask, y > 0, True).all(axis=1)[:, None] & mask
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_x = np.log(np.where(mask, x, 1.0))
+        log_y = np.log(np.where(positive, y, 1.0))
+        sum_log_y = np.where(positive, log_y, 0.0).sum(axis=1)
+
+    fits = {}
+    for model, features, target, log_scale in (('linear', x, y, False),
+                                               ('nlogn', x * log_x, y, False),
+                                               ('polynomial', log_x, log_y, True),
+                                               ('exponential', x, log_y, True)):
+        model_mask = positive if log_scale else mask
+        a, b, se_b, rss, n = _regress(features, target, model_mask)
+
+        log_likelihood = _normal_log_likelihood(rss, n)
+        if log_scale:
+            log_likelihood = log_likelihood - sum_log_y
+            a = np.exp(a)
+            aicc = np.where(positive.sum(axis=1) == mask.sum(axis=1), _aicc(log_likelihood, n), np.inf)
+        else:
+            aicc = _aicc(log_likelihood, n)
+
+        fits[model] = {'a': a, 'b': b, 'se_b': se_b, 'n': n, 'aicc': aicc}
+
+    with np.errstate(invalid='ignore'):
+        t = np.nan_to_num(special.stdtrit(np.maximum(mask.sum(axis=1) - 2, 1), (1 + confidence) / 2), nan=np.inf)
+
+    aicc_table = np.stack([fits[model]['aicc'] for model in MODELS], axis=1)
+    best       = np.where(np.isfinite(aicc_table).any(axis=1), np.argmin(np.nan_to_num(aicc_table, nan=np.inf), axis=1), -1)
+
+    polynomial, exponential = fits['polynomial'], fits['exponential']
+    result = {
+        'points': mask.sum(axis=1),
+        'best_model': best,
+        'exponent': polynomial['b'],
+        'exponent_ci_low': polynomial['b'] - t * polynomial['se_b'],
+        'exponent_ci_high': polynomial['b'] + t * polynomial['se_b'],
+        'growth_factor': np.exp(exponential['b']),
+        'growth_factor_ci_low': np.exp(exponential['b'] - t * exponential['se_b']),
+        'growth_factor_ci_high': np.exp(exponential['b'] + t * exponential['se_b']),
+    }
+    for model in MODELS:
+        for field in ('a', 'b', 'aicc'):
+            result[f'{model}_{field}'] = fits[model][field]
+    return result
+
+def load_points(csv_path, metrics=METRICS, x_column='iteration'):
+    """
+    Lê um CSV de resultados e monta as matrizes de pontos de cada grupo.
+
+    Parameters:
+        csv_path (str): CSV do artefato (asymptotic_behavior.csv ou cs3.csv).
+        metrics (list[str]): Métricas ajustadas.
+        x_column (str): Coluna usada como tamanho do programa.
+
+    Returns:
+        tuple[list[tuple], np.ndarray, np.ndarray, np.ndarray]: Chaves dos grupos
+            (gramática, estrutura, opt, métrica) e as matrizes x, y e máscara.
+    """
+    with open(csv_path, mode='r', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    metrics = [metric for metric in metrics if rows and metric in rows[0]]
+    groups  = {}
+    for row in rows:
+        key = tuple(row[column] for column in GROUP_COLUMNS)
+        groups.setdefault(key, []).append(row)
+
+    width = max((len(group) for group in groups.values()), default=0)
+    keys  = [key + (metric,) for key in groups for metric in metrics]
+    x     = np.zeros((len(keys), width))
+    y     = np.zeros((len(keys), width))
+    mask  = np.zeros((len(keys), width), dtype=bool)
+
+    index = 0
+    for group in groups.values():
+        sizes = np.array([float(row[x_column]) for row in group])
+        for metric in metrics:
+            values = np.array([float(row[metric]) if row[metric] not in ('', 'nan') else np.nan for row in group])
+            valid  = ~np.isnan(values)
+            x[index, :len(group)]    = sizes
+            y[index, :len(group)]    = np.nan_to_num(values)
+            mask[index, :len(group)] = valid
+            index += 1
+
+    return keys, x, y, mask
+
+def fit_csv(csv_path, metrics=METRICS, x_column='iteration', confidence=CONFIDENCE):
+    """
+    Ajusta os modelos a todos os grupos de um CSV de resultados.
+
+    Returns:
+        list[list]: Linhas no formato de FIT_HEADER.
+    """
+    keys, x, y, mask = load_points(csv_path, metrics, x_column)
+    if not keys:
+        return []
+
+    fits = fit_groups(x, y, mask, confidence)
+    rows = []
+    for i, key in enumerate(keys):
+        best = int(fits['best_model'][i])
+        name = MODELS[best] if best >= 0 else ''
+        rows.append(list(key) + [int(fits['points'][i]), name,
+                                 fits[f'{name}_a'][i] if name else '', fits[f'{name}_b'][i] if name else '']
+                    + [fits[field][i] for field in FIT_HEADER[len(GROUP_COLUMNS) + 5:len(GROUP_COLUMNS) + 11]]
+                    + [fits[f'{model}_aicc'][i] for model in MODELS])
+    return rows
+
+def write_fits(rows, output):
+    """Grava as linhas de fit_csv em um CSV."""
+    with open(output, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIT_HEADER)
+        writer.writerows(rows)
+
+def print_fits(rows):
+    """Mostra um resumo com o melhor modelo e o expoente de cada grupo."""
+    print(f"{'grammar':<8} {'ds':<11} {'opt':<16} {'metric':<11} {'best':<12} {'exponent (CI)':<24} factor/iteration")
+    for row in rows:
+        grammar, data_structure, opt, metric, _, best = row[:6]
+        exponent, low, high, factor = row[8], row[9], row[10], row[11]
+        print(f'{grammar:<8} {data_structure:<11} {opt:<16} {metric:<11} {best:<12} '
+              f'{exponent:6.2f} [{low:6.2f}, {high:6.2f}]     {factor:.3f}')
+
+def usage_parser():
+    """Cria o parser da linha de comando do ajuste."""
+    parser = argparse.ArgumentParser(prog='growth.py', description='Ajuste de modelos de crescimento')
+    parser.add_argument('csv', help='CSV do artefato (asymptotic_behavior.csv ou cs3.csv)')
+    parser.add_argument('--x', default='iteration', help='Coluna usada como tamanho do programa')
+    parser.add_argument('--metrics', default=','.join(METRICS), help='Métricas ajustadas, separadas por vírgula')
+    parser.add_argument('--output', default=None, help='Grava os ajustes neste CSV')
+    return parser
+
+if __name__ == '__main__':
+    args = usage_parser().parse_args(sys.argv[1:])
+    rows = fit_csv(args.csv, args.metrics.split(','), args.x)
+    print_fits(rows)
+    if args.output:
+        write_fits(rows, os.path.abspath(args.output))
@@ -0,0 +1,237 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : hygiene.py
+# Descrição       : Controle do ambiente das medições. No modo opcional de
+#                   higiene, cada processo medido é fixado em um conjunto de
+#                   CPUs (sched_setaffinity) e recebe prioridade maior, e antes
+#                   de cada medição o governor, a frequência, a carga e a
+#                   temperatura da máquina são verificados, com aviso ou recusa
+#                   se ela estiver ruidosa. Independentemente do modo, cada linha
+#                   de resultado leva a identificação do ambiente (máquina,
+#                   kernel, CPU, versão do compilador e commit do BenchGen).
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, glob, shutil, platform, functools, subprocess
+
+from common import compile_cache
+
+# Configuração do modo de higiene (None desativa; ver enable)
+HYGIENE = None
+
+# Limites padrão das verificações
+MAX_LOAD = 1.0
+MAX_TEMP = 80.0
+MIN_FREQ_RATIO = 0.9
+
+# Colunas acrescentadas aos CSVs dos artefatos
+ENV_COLUMNS = ['env_kernel', 'env_cpu', 'env_compiler', 'env_benchgen_commit', 'env_pinned_cpus', 'env_host']
+
+class NoisyMachineError(RuntimeError):
+    """A máquina não está em condições de medir e o modo de higiene foi configurado para recusar."""
+
+def parse_cpus(text):
+    """Converte uma lista de CPUs no formato do taskset ('2,3' ou '2-5,8') em um conjunto."""
+    cpus = set()
+    for part in text.split(','):
+        first, _, last = part.strip().partition('-')
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+def format_cpus(cpus):
+    return ','.join(str(cpu) for cpu in sorted(cpus))
+
+def enable(cpus, nice=-10, on_noise='warn', max_load=MAX_LOAD, max_temp=MAX_TEMP, min_freq_ratio=MIN_FREQ_RATIO):
+    """
+    Ativa o modo de higiene para as medições de common/timing.py.
+
+    Parameters:
+        cpus (set[int] | str): CPUs, de preferência isoladas (isolcpus), onde os processos medidos rodam.
+        nice (int): Prioridade dos processos medidos; valores negativos exigem
+                    root ou CAP_SYS_NICE.
+        on_noise (str): 'warn' só avisa; 'refuse' interrompe a medição.
+        max_load (float): Carga média de 1 minuto máxima.
+        max_temp (float): Temperatura máxima, em °C, das zonas térmicas.
+        min_freq_ratio (float): Frequência atual mínima, relativa à máxima, das CPUs usadas.
+
+    Raises:
+        ValueError: Se as CPUs não estiverem disponíveis para o processo ou 'on_noise' for inválido.
+    """
+    global HYGIENE
+
+    cpus = parse_cpus(cpus) if isinstance(cpus, str) else set(cpus)
+    if not cpus or not cpus <= os.sched_getaffinity(0):
+        raise ValueError(f'CPUs {format_cpus(cpus)} are not available (allowed: {format_cpus(os.sched_getaffinity(0))})')
+    if on_noise not in ('warn', 'refuse'):
+        raise ValueError(f'Unknown noise policy {on_noise!r}')
+
+    if nice < os.getpriority(os.PRIO_PROCESS, 0) and os.geteuid() != 0:
+        print(f'Raising the priority to nice {nice} may need root or CAP_SYS_NICE; it is skipped if not allowed')
+
+    HYGIENE = {'cpus': cpus, 'nice': nice, 'on_noise': on_noise,
+               'max_load': max_load, 'max_temp': max_temp, 'min_freq_ratio': min_freq_ratio}
+
+    # O próprio script sai das CPUs de medição quando há outras disponíveis
+    others = os.sched_getaffinity(0) - cpus
+    if others:
+        os.sched_setaffinity(0, others)
+
+def _pin_and_raise_priority():
+    # Executado no processo filho, entre o fork e o exec
+    os.sched_setaffinity(0, HYGIENE['cpus'])
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, HYGIENE['nice'])
+    except PermissionError:
+        pass
+
+def preexec_fn():
+    """Função para o 'preexec_fn' do subprocess: fixa as CPUs e a prioridade do processo medido, se ativo."""
+    return _pin_and_raise_priority if HYGIENE is not None else None
+
+def worker_cpus(jobs):
+    """
+    CPUs de um pool de processos que medem em paralelo, uma por processo: as
+    do modo de higiene, se ativo, ou as disponíveis para o script.
+
+    Returns:
+        list[int]: No máximo 'jobs' CPUs.
+    """
+    cpus = HYGIENE['cpus'] if HYGIENE is not None else os.sched_getaffinity(0)
+    return sorted(cpus)[:jobs]
+
+def pin_worker(cpus, jobs):
+    """
+    Initializer de um processo do pool: pega uma CPU da fila 'cpus'
+    (multiprocessing.Queue preenchida com worker_cpus) e passa a rodar, junto
+    com os comandos que mede, só nela. Com o modo de higiene ativo, a carga
+    máxima aceita cresce com as medições dos outros processos.
+    """
+    global HYGIENE
+
+    cpu = cpus.get()
+    os.sched_setaffinity(0, {cpu})
+    if HYGIENE is not None:
+        HYGIENE = dict(HYGIENE, cpus={cpu}, max_load=HYGIENE['max_load'] + jobs - 1)
+
+def _read(path):
+    try:
+        with open(path, mode='r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def problems():
+    """
+    Verifica se a máquina está ruidosa para as CPUs do modo de higiene.
+
+    Returns:
+        list[str]: Descrição de cada problema encontrado (vazia se tudo estiver bem).
+    """
+    found = []
+
+    for cpu in sorted(HYGIENE['cpus']):
+        cpufreq  = f'/sys/devices/system/cpu/cpu{cpu}/cpufreq'
+        governor = _read(f'{cpufreq}/scaling_governor')
+        if governor is not None and governor != 'performance':
+            found.append(f'cpu{cpu} governor is {governor}, not performance')
+
+        current, maximum = _read(f'{cpufreq}/scaling_cur_freq'), _read(f'{cpufreq}/scaling_max_freq')
+        if current and maximum and int(current) < HYGIENE['min_freq_ratio'] * int(maximum):
+            found.append(f'cpu{cpu} runs at {int(current) // 1000} MHz of {int(maximum) // 1000} MHz')
+
+    if _read('/sys/devices/system/cpu/intel_pstate/no_turbo') == '0' or _read('/sys/devices/system/cpu/cpufreq/boost') == '1':
+        found.append('turbo boost is enabled')
+
+    load = os.getloadavg()[0]
+    if load > HYGIENE['max_load']:
+        found.append(f'load average is {load:.2f} (max {HYGIENE["max_load"]})')
+
+    for zone in glob.glob('/sys/class/thermal/thermal_zone*/temp'):
+        value = _read(zone)
+        if value and value.lstrip('-').isdigit() and int(value) / 1000 > HYGIENE['max_temp']:
+            found.append(f'{os.path.basename(os.path.dirname(zone))} is at {int(value) / 1000:.0f} °C')
+
+    return found
+
+def check():
+    """
+    Verifica a máquina antes de uma medição, avisando ou recusando conforme
+    a política do modo de higiene. Não faz nada com o modo desativado.
+
+    Raises:
+        NoisyMachineError: Se houver problemas e a política for 'refuse'.
+    """
+    if HYGIENE is None:
+        return
+
+    found = problems()
+    if not found:
+        return
+    if HYGIENE['on_noise'] == 'refuse':
+        raise NoisyMachineError('Noisy machine: ' + '; '.join(found))
+    print('Warning, noisy machine: ' + '; '.join(found))
+
+@functools.lru_cache(maxsize=None)
+def cpu_model():
+    """Modelo da CPU, lido do /proc/cpuinfo."""
+    for line in (_read('/proc/cpuinfo') or '').splitlines():
+        name, _, value = line.partition(':')
+        if name.strip() in ('model name', 'Hardware', 'cpu model'):
+            return value.strip()
+    return platform.processor() or platform.machine()
+
+@functools.lru_cache(maxsize=None)
+def compiler_version(compiler):
+    """
+    Primeira linha da versão de um compilador ou ferramenta. Ferramentas que
+    não aceitam '--version' (ex.: go, odin) são consultadas com 'version'.
+    """
+    if not compiler:
+        return ''
+    version = compile_cache.compiler_identity(compiler).partition('\n')[2].strip()
+    if not version:
+        try:
+            path    = shutil.which(compiler) or compiler
+            version = subprocess.run([path, 'version'], capture_output=True, text=True).stdout.strip()
+        except OSError:
+            version = ''
+    return version.splitlines()[0] if version else ''
+
+def fingerprint(manifest, compiler):
+    """
+    Identificação do ambiente de uma linha de resultado.
+
+    Parameters:
+        manifest (dict): Manifesto do programa medido, com o commit do BenchGen que o gerou.
+        compiler (str): Compilador ou ferramenta usada na linha.
+
+    Returns:
+        dict: Valores das colunas de ENV_COLUMNS.
+    """
+    return {
+        'env_kernel': platform.release(),
+        'env_cpu': cpu_model(),
+        'env_compiler': compiler_version(compiler),
+        'env_benchgen_commit': (manifest or {}).get('benchgen_commit', ''),
+        'env_pinned_cpus': format_cpus(HYGIENE['cpus']) if HYGIENE is not None else '',
+        'env_host': platform.node(),
+    }
+
+def env_values(manifest, compiler):
+    """Valores das colunas de ENV_COLUMNS, na ordem do CSV."""
+    values = fingerprint(manifest, compiler)
+    return [values[column] for column in ENV_COLUMNS]
+
+def add_hygiene_arguments(parser):
+    """Acrescenta as opções do modo de higiene a um argparse.ArgumentParser."""
+    parser.add_argument('--pin-cpus', default=None, metavar='CPUS',
+                        help='Fixa os processos medidos nestas CPUs (ex.: 2,3 ou 2-5) e ativa as verificações da máquina')
+    parser.add_argument('--nice', type=int, default=-10, help='Prioridade dos processos medidos (padrão: -10)')
+    parser.add_argument('--on-noise', choices=['warn', 'refuse'], default='warn',
+                        help='Avisa ou interrompe quando a máquina está ruidosa (padrão: warn)')
+    parser.add_argument('--max-load', type=float, default=MAX_LOAD, help='Carga média máxima (padrão: 1.0)')
+    parser.add_argument('--max-temp', type=float, default=MAX_TEMP, help='Temperatura máxima em °C (padrão: 80)')
+
+def enable_from_args(args):
+    """Ativa o modo de higiene a partir das opções de add_hygiene_arguments, se '--pin-cpus' foi usado."""
+    if args.pin_cpus is not None:
+        enable(args.pin_cpus, args.nice, args.on_noise, args.max_load, args.max_temp)
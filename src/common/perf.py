@@ -0,0 +1,264 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : perf.py
+# Descrição       : Coleta de contadores de hardware com o 'perf stat' sem
+#                   multiplexação. Os eventos pedidos são divididos em grupos
+#                   que cabem nos contadores da máquina; cada grupo é medido em
+#                   execuções próprias e os resultados são unidos com a variação
+#                   e a fração de tempo em que cada contador esteve ativo. Os
+#                   eventos suportados e o tamanho de grupo que a máquina
+#                   comporta ficam guardados em cache.
+#                   Também fornece um 'sampler' para timing.measure, que conta
+#                   os eventos em cada execução medida, e as métricas derivadas
+#                   (IPC e falhas de desvio e de cache por mil instruções).
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, json, platform, tempfile, subprocess
+
+from common import hygiene, timing, spans
+
+# Contadores de uso geral por núcleo; um grupo que não cabe é dividido e o limite aprendido fica no cache
+COUNTERS = int(os.environ.get('BENCHGEN_PERF_COUNTERS', 4))
+
+CACHE_FILE = os.environ.get('BENCHGEN_PERF_CACHE', os.path.expanduser('~/.cache/benchgen-artifact/perf_events.json'))
+
+# Eventos de software, que não ocupam contadores de hardware
+SOFTWARE_EVENTS = {'duration_time', 'task-clock', 'cpu-clock', 'page-faults', 'minor-faults', 'major-faults',
+                   'context-switches', 'cpu-migrations', 'alignment-faults', 'emulation-faults'}
+
+# Evento medido em todos os grupos para obter o tempo de execução
+DURATION_EVENT = 'duration_time'
+
+# Métricas derivadas: nome -> (numerador, denominador, escala)
+DERIVED = {
+    'ipc'        : ('instructions', 'cycles', 1),
+    'branch_mpki': ('branch-misses', 'instructions', 1000),
+    'cache_mpki' : ('cache-misses', 'instructions', 1000),
+}
+DERIVED_COLUMNS = list(DERIVED)
+
+def missing(status):
+    """Contagem de um evento sem valor ('not supported' ou 'not counted')."""
+    return {'value': None, 'stddev': None, 'running': 0.0, 'status': status}
+
+def machine_key():
+    """Identifica a máquina no cache: modelo da CPU e kernel, que decidem os eventos disponíveis."""
+    return f'{hygiene.cpu_model()} | {platform.release()}'
+
+def load_cache():
+    try:
+        with open(CACHE_FILE, mode='r', encoding='utf-8') as f:
+            return json.load(f).get(machine_key(), {})
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(entry):
+    """Grava a entrada desta máquina no cache, de forma atômica."""
+    try:
+        with open(CACHE_FILE, mode='r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[machine_key()] = entry
+
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    tmp_path = f'{CACHE_FILE}.{os.getpid()}'
+    with open(tmp_path, mode='w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, CACHE_FILE)
+
+def parse_stat_csv(text):
+    """
+    Lê a saída do 'perf stat -x,'. Cada linha tem valor, unidade, evento, a
+    variação entre repetições (só com -r > 1, terminada em '%'), o tempo em que
+    o contador esteve ativo e a porcentagem desse tempo.
+
+    Returns:
+        dict: {evento: {'value', 'stddev', 'running', 'status'}}, com o desvio
+              padrão absoluto e 'status' 'counted', 'not counted' ou 'not supported'.
+    """
+    counts = {}
+    for line in text.splitlines():
+        if not line.strip() or line.startswith('#'):
+            continue
+        fields = line.split(',')
+        if len(fields) < 3:
+            continue
+
+        raw, event = fields[0].strip(), fields[2].split(':')[0].strip()
+        rest       = fields[3:]
+        variance   = None
+        if rest and rest[0].endswith('%'):
+            variance, rest = float(rest[0].rstrip('%')), rest[1:]
+        running = float(rest[1]) if len(rest) > 1 and rest[1] else 100.0
+
+        if raw.startswith('<'):
+            counts[event] = missing(raw.strip('<>'))
+            continue
+
+        value = float(raw)
+        counts[event] = {'value': value, 'stddev': value * variance / 100 if variance is not None else None,
+                         'running': running, 'status': 'counted'}
+    return counts
+
+def stat_command(events, output, repeat=1):
+    """Prefixo 'perf stat' que grava a saída -x, de 'events' em 'output'."""
+    return ['perf', 'stat', '-x', ',', '-r', str(repeat), '-e', ','.join(events), '-o', output, '--']
+
+def read_stat(path):
+    """Lê um arquivo gravado com 'perf stat -x, -o <arquivo>' (ver parse_stat_csv)."""
+    with open(path, mode='r', encoding='utf-8') as f:
+        return parse_stat_csv(f.read())
+
+def run_stat(cmd, events, repeat=1, cwd=None, env=None, show_output=False):
+    """
+    Executa o comando sob 'perf stat -x, -r <repeat>'.
+
+    Parameters:
+        cmd (list[str]): Comando medido.
+        events (list[str]): Eventos; uma string '{a,b}' forma um grupo agendado junto.
+        repeat (int): Repetições feitas pelo perf.
+
+    Returns:
+        tuple[dict, int]: Contagens (ver parse_stat_csv) e o código de saída.
+    """
+    stdout = None if show_output else subprocess.DEVNULL
+    with tempfile.NamedTemporaryFile(prefix='perf_', suffix='.csv') as perf_out:
+        process = subprocess.run(stat_command(events, perf_out.name, repeat) + list(cmd), cwd=cwd, env=env,
+                                 stdout=stdout, preexec_fn=hygiene.preexec_fn())
+        counts  = read_stat(perf_out.name)
+    return counts, process.returncode
+
+def supported_events(events):
+    """
+    Indica quais eventos esta máquina consegue contar, testando uma vez cada
+    evento ainda desconhecido com 'perf stat -e <evento> -- true'.
+
+    Returns:
+        dict: {evento: bool}.
+    """
+    cache  = load_cache()
+    known  = cache.setdefault('events', {})
+    probed = False
+
+    for event in events:
+        if event in known:
+            continue
+        counts, returncode = run_stat(['true'], [event])
+        known[event] = returncode == 0 and counts.get(event, {}).get('status') == 'counted'
+        probed = True
+
+    if probed:
+        save_cache(cache)
+    return {event: known[event] for event in events}
+
+def group_events(events, size):
+    """Divide os eventos de hardware em grupos de até 'size' eventos, na ordem pedida."""
+    hardware = [event for event in events if event not in SOFTWARE_EVENTS]
+    return [hardware[i:i + size] for i in range(0, len(hardware), max(size, 1))]
+
+def stat(cmd, events, repeat=1, cwd=None, env=None, show_output=False):
+    """
+    Conta os eventos sem multiplexação: cada grupo é executado em repetições
+    próprias. Um grupo em que algum contador não ficou ativo o tempo todo não
+    coube nos contadores e é dividido ao meio e medido de novo; o tamanho que
+    funcionou fica no cache para as próximas medições.
+
+    Parameters:
+        cmd (str | list[str]): Comando medido.
+        events (list[str]): Eventos pedidos.
+        repeat (int): Repetições de cada grupo.
+        cwd (str): Diretório de execução.
+        env (dict): Variáveis de ambiente do processo.
+        show_output (bool): Mostra a saída padrão do comando.
+
+    Returns:
+        dict: 'events' ({evento: contagem, ver parse_stat_csv}, inclusive os não
+              suportados), 'execution_time' (média, em segundos), 'groups'
+              (número de grupos medidos) e 'returncode' (o pior código de saída).
+    """
+    cmd       = timing.command(cmd, cwd)
+    supported = supported_events(events)
+    cache     = load_cache()
+    size      = min(cache.get('group_size', COUNTERS), COUNTERS)
+
+    result    = {event: missing('not supported') for event in events if not supported[event]}
+    software  = [event for event in events if supported[event] and event in SOFTWARE_EVENTS and event != DURATION_EVENT]
+    queue     = group_events([event for event in events if supported[event]], size) or [[]]
+    durations = []
+    groups    = 0
+    worst     = 0
+
+    hygiene.check()
+    with spans.span('measure', 'perf stat', cmd) as current:
+        while queue:
+            group  = queue.pop(0)
+            extra  = [DURATION_EVENT] + (software if groups == 0 else [])
+            counts, returncode = run_stat(cmd, ([f'{{{",".join(group)}}}'] if group else []) + extra, repeat, cwd, env, show_output)
+
+            partial = [event for event in group if counts.get(event, {}).get('running', 0.0) < 100.0]
+            if partial and len(group) > 1:
+                half = len(group) // 2
+                queue[:0] = [group[:half], group[half:]]
+                size = min(size, half)
+                print(f'perf group {",".join(group)} does not fit in the counters, splitting it')
+                continue
+
+            groups += 1
+            worst   = returncode if worst == 0 else worst
+            for event in group + extra:
+                if event != DURATION_EVENT:
+                    result[event] = counts.get(event, missing('not counted'))
+            if counts.get(DURATION_EVENT, {}).get('value') is not None:
+                durations.append(counts[DURATION_EVENT]['value'] / 1e9)
+
+        current.set(returncode=worst, groups=groups)
+
+    if size < cache.get('group_size', COUNTERS):
+        cache['group_size'] = size
+        save_cache(cache)
+
+    return {
+        'events': {event: result[event] for event in events if event in result},
+        'execution_time': sum(durations) / len(durations) if durations else None,
+        'groups': groups,
+        'returncode': worst,
+    }
+
+def derived(counts):
+    """
+    Calcula as métricas de DERIVED a partir das contagens de stat ou de um sampler.
+
+    Returns:
+        dict: {métrica: valor}, com None quando algum dos eventos não foi contado.
+    """
+    values = {}
+    for name, (numerator, denominator, scale) in DERIVED.items():
+        top, bottom = counts.get(numerator, {}).get('value'), counts.get(denominator, {}).get('value')
+        values[name] = top / bottom * scale if top is not None and bottom else None
+    return values
+
+def sampler(events):
+    """
+    Cria um 'sampler' para timing.measure que conta os eventos em cada execução
+    medida, com um único 'perf stat -x,' por execução. Cada amostra traz, além
+    dos campos de timing.run_once, o valor de cada evento (None se não foi
+    contado) e as contagens completas em 'counts'.
+
+    Parameters:
+        events (list[str]): Eventos contados; devem caber juntos nos contadores.
+
+    Returns:
+        callable: Função com a assinatura de timing.run_once.
+    """
+    def perf_sampler(cmd, cwd=None, env=None, show_output=False):
+        with tempfile.NamedTemporaryFile(prefix='perf_', suffix='.csv') as perf_out:
+            sample = timing.run_once(stat_command(events, perf_out.name) + timing.command(cmd, cwd),
+                                     cwd=cwd, env=env, show_output=show_output)
+            counts = read_stat(perf_out.name)
+
+        sample['counts'] = {event: counts.get(event, missing('not counted')) for event in events}
+        sample.update({event: sample['counts'][event]['value'] for event in events})
+        return sample
+
+    return perf_sampler
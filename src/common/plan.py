@@ -0,0 +1,179 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : plan.py
+# Descrição       : Grafo de tarefas (geração → compilação → medição) usado pelo
+#                   planejador de experimentos. Tarefas com o mesmo tipo e os
+#                   mesmos parâmetros são unificadas, de forma que o trabalho
+#                   comum a vários artefatos é executado uma única vez.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import heapq
+
+# Etapas, na ordem em que são executadas; as medições ficam por último para
+# não sofrerem interferência de gerações e compilações
+STAGES = ['generate', 'compile', 'measure']
+
+class Node:
+    """Tarefa do grafo: uma ação identificada pelo tipo e pelos parâmetros."""
+
+    def __init__(self, index, kind, params, stage, action, deps, release=None):
+        self.index   = index
+        self.kind    = kind
+        self.params  = params
+        self.stage   = stage
+        self.action  = action
+        self.deps    = list(deps)
+        self.release = release
+        self.result  = None
+        self.done    = False
+        self.users   = set()
+
+    @property
+    def key(self):
+        return (self.kind, self.params)
+
+    def __repr__(self):
+        return f'Node({self.kind}, {self.params})'
+
+class Plan:
+    """Grafo de tarefas de vários artefatos, com unificação de tarefas idênticas."""
+
+    def __init__(self):
+        self.nodes     = {}
+        self.cells     = []
+        self.requested = {}
+
+    def add(self, kind, params, action, deps=(), stage='compile', user=None, release=None):
+        """
+        Adiciona uma tarefa ao grafo, ou devolve a tarefa já existente com o
+        mesmo tipo e os mesmos parâmetros.
+
+        Parameters:
+            kind (str): Tipo da tarefa (ex.: 'generate', 'compile').
+            params (tuple): Parâmetros que identificam a tarefa; devem ser hashable
+                            e incluir tudo o que altera o resultado.
+            action (callable): Função chamada com os resultados das dependências.
+            deps (list[Node]): Tarefas cujos resultados a ação recebe.
+            stage (str): Etapa da tarefa (ver STAGES).
+            user (str): Artefato que pediu a tarefa, para o resumo do plano.
+            release (callable): Chamada com o resultado assim que nenhuma tarefa
+                                ou célula precisa mais dele (ex.: para remover a
+                                pasta de trabalho de uma compilação).
+
+        Returns:
+            Node: A tarefa no grafo.
+        """
+        if stage not in STAGES:
+            raise ValueError(f'Unknown stage {stage!r}')
+
+        self.requested[kind] = self.requested.get(kind, 0) + 1
+
+        node = self.nodes.get((kind, params))
+        if node is None:
+            node = Node(len(self.nodes), kind, params, stage, action, deps, release)
+            self.nodes[node.key] = node
+
+        if user is not None:
+            node.users.add(user)
+        return node
+
+    def add_cell(self, nodes, emit):
+        """
+        Registra uma célula de resultado de um artefato. Assim que todas as
+        tarefas da célula terminam, 'emit' é chamada com os seus resultados,
+        na mesma ordem de 'nodes'.
+
+        Parameters:
+            nodes (list[Node]): Tarefas de que a célula depende.
+            emit (callable): Função que grava a linha da célula.
+        """
+        self.cells.append({'nodes': list(nodes), 'emit': emit, 'pending': len(set(nodes))})
+
+    def order(self):
+        """
+        Ordena as tarefas de forma topológica, executando uma etapa inteira
+        antes da seguinte e, dentro da etapa, na ordem de inserção.
+
+        Returns:
+            list[Node]: Tarefas na ordem de execução.
+
+        Raises:
+            ValueError: Se uma dependência estiver em uma etapa posterior à da tarefa.
+        """
+        waiting = {node.key: len(node.deps) for node in self.nodes.values()}
+        users   = {node.key: [] for node in self.nodes.values()}
+
+        for node in self.nodes.values():
+            for dep in node.deps:
+                if STAGES.index(dep.stage) > STAGES.index(node.stage):
+                    raise ValueError(f'{node} depends on {dep}, which runs in a later stage')
+                users[dep.key].append(node)
+
+        ready = [(STAGES.index(node.stage), node.index, node) for node in self.nodes.values() if not node.deps]
+        heapq.heapify(ready)
+        ordered = []
+
+        while ready:
+            _, _, node = heapq.heappop(ready)
+            ordered.append(node)
+            for user in users[node.key]:
+                waiting[user.key] -= 1
+                if waiting[user.key] == 0:
+                    heapq.heappush(ready, (STAGES.index(user.stage), user.index, user))
+
+        return ordered
+
+    def run(self):
+        """
+        Executa o grafo uma vez. As células são gravadas assim que a última
+        das suas tarefas termina, e o resultado de uma tarefa é liberado
+        (ver 'release' em add) quando a última tarefa ou célula que o usa termina.
+        """
+        cells_by_node = {}
+        refs          = {key: 0 for key in self.nodes}
+        for cell in self.cells:
+            for node in set(cell['nodes']):
+                cells_by_node.setdefault(node.key, []).append(cell)
+                refs[node.key] += 1
+        for node in self.nodes.values():
+            for dep in set(node.deps):
+                refs[dep.key] += 1
+
+        def settle(node):
+            if refs[node.key] == 0 and node.done and node.release is not None:
+                release, node.release = node.release, None
+                release(node.result)
+
+        def unref(node):
+            refs[node.key] -= 1
+            settle(node)
+
+        for node in self.order():
+            node.result = node.action(*[dep.result for dep in node.deps])
+            node.done   = True
+
+            for cell in cells_by_node.get(node.key, []):
+                cell['pending'] -= 1
+                if cell['pending'] == 0:
+                    cell['emit'](*[cell_node.result for cell_node in cell['nodes']])
+                    for cell_node in set(cell['nodes']):
+                        unref(cell_node)
+
+            for dep in set(node.deps):
+                unref(dep)
+            settle(node)
+
+    def summary(self):
+        """
+        Resume o plano por tipo de tarefa.
+
+        Returns:
+            list[tuple]: (tipo, tarefas pedidas pelos artefatos, tarefas únicas,
+                         tarefas compartilhadas por mais de um artefato).
+        """
+        rows = []
+        for kind, requested in self.requested.items():
+            nodes  = [node for node in self.nodes.values() if node.kind == kind]
+            shared = sum(1 for node in nodes if len(node.users) > 1)
+            rows.append((kind, requested, len(nodes), shared))
+        return rows
@@ -0,0 +1,221 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : program_store.py
+# Descrição       : Repositório de programas gerados pelo BenchGen, compartilhado
+#                   pelos scripts de artefato. Cada projeto é identificado pelo
+#                   hash da gramática, iteração, estrutura de dados, linguagem e
+#                   commit do BenchGen, e carrega um manifesto com esses dados.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, json, time, fcntl, shlex, shutil, hashlib, subprocess, functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from common import source_metrics, spans
+
+MANIFEST_NAME = 'benchgen_manifest.json'
+
+# Execuções simultâneas do BenchGen em generate_all (BENCHGEN_GENERATE_JOBS altera o padrão)
+GENERATE_JOBS = int(os.environ.get('BENCHGEN_GENERATE_JOBS', os.cpu_count() or 1))
+
+def last_line(text):
+    """Última linha não vazia de uma saída, usada nas mensagens de erro."""
+    return (text.strip().splitlines() or [''])[-1]
+
+def gen_dir(benchgen_root):
+    """Retorna o diretório 'src/gen' do BenchGen, onde os projetos são gerados."""
+    return os.path.join(os.path.abspath(benchgen_root), 'src', 'gen')
+
+def ensure_benchgen(benchgen_root):
+    """
+    Compila o BenchGen caso o executável ainda não exista.
+
+    Parameters:
+        benchgen_root (str): Caminho raiz do BenchGen.
+
+    Raises:
+        OSError: Se o make falhar.
+    """
+    if not os.path.isfile(os.path.join(gen_dir(benchgen_root), 'benchGen')):
+        print('Compiling BenchGen...')
+        process = spans.run('generate', 'make benchGen', ['make'], cwd=gen_dir(benchgen_root),
+                            stderr=subprocess.PIPE, text=True)
+        if process.returncode != 0:
+            raise OSError(f'Could not build BenchGen (make exit {process.returncode}): {last_line(process.stderr)}')
+
+@functools.lru_cache(maxsize=None)
+def benchgen_commit(benchgen_root):
+    """
+    Obtém o commit atual do BenchGen.
+
+    Parameters:
+        benchgen_root (str): Caminho raiz do BenchGen.
+
+    Returns:
+        str: Hash do commit, ou 'unknown' se não for um repositório git.
+    """
+    result = subprocess.run(['git', '-C', benchgen_root, 'rev-parse', 'HEAD'], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else 'unknown'
+
+def rules_hash(benchgen_root, grammar_id):
+    """
+    Calcula o hash das regras de produção e da semente de uma gramática.
+
+    Parameters:
+        benchgen_root (str): Caminho raiz do BenchGen.
+        grammar_id (str): Identificador da gramática (ex.: 'ex8').
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal.
+    """
+    digest = hashlib.sha256()
+    for file_name in ('production_rule.txt', 'seed_string.txt'):
+        with open(os.path.join(gen_dir(benchgen_root), 'examples', grammar_id, file_name), 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def project_key(benchgen_root, grammar_id, iteration, data_structure, lang=None):
+    """
+    Calcula a chave de um projeto gerado.
+
+    Returns:
+        tuple[str, dict]: Hash da chave e os campos que a compõem.
+    """
+    fields = {
+        'grammar': grammar_id,
+        'iteration': int(iteration),
+        'data_structure': data_structure,
+        'lang': lang or 'c',
+        'rules_hash': rules_hash(benchgen_root, grammar_id),
+        'benchgen_commit': benchgen_commit(benchgen_root),
+    }
+    key = hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+    return key, fields
+
+def load_manifest(project_path):
+    """
+    Lê o manifesto de um projeto gerado.
+
+    Parameters:
+        project_path (str): Diretório do projeto.
+
+    Returns:
+        dict | None: Conteúdo do manifesto, ou None se não existir.
+    """
+    try:
+        with open(os.path.join(project_path, MANIFEST_NAME), mode='r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(project_path, manifest):
+    """Escreve o manifesto de um projeto de forma atômica."""
+    tmp_path = os.path.join(project_path, f'.{MANIFEST_NAME}.{os.getpid()}')
+    with open(tmp_path, mode='w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(project_path, MANIFEST_NAME))
+
+def generate(benchgen_root, grammar_id, iteration, data_structure, lang=None):
+    """
+    Retorna o projeto gerado para os parâmetros informados, executando o
+    BenchGen apenas se não houver um projeto com o mesmo manifesto.
+
+    Parameters:
+        benchgen_root (str): Caminho raiz do BenchGen.
+        grammar_id (str): Identificador da gramática (ex.: 'ex8').
+        iteration (int): Número de iterações (profundidade) do L-system.
+        data_structure (str): Estrutura de dados usada pelo programa.
+        lang (str): Linguagem alvo do BenchGen; None gera C.
+
+    Returns:
+        str: Caminho absoluto do projeto gerado.
+
+    Raises:
+        OSError: Se o BenchGen falhar ou não gerar o projeto.
+    """
+    key, fields = project_key(benchgen_root, grammar_id, iteration, data_structure, lang)
+
+    name         = '_'.join([grammar_id, str(iteration), data_structure] + ([lang] if lang else []) + [key[:12]])
+    project_path = os.path.join(gen_dir(benchgen_root), name)
+
+    # Vários processos (ex.: workers do modo distribuído na mesma máquina) podem pedir o mesmo projeto
+    with open(os.path.join(gen_dir(benchgen_root), f'.{name}.lock'), mode='w') as lock, \
+         spans.span('generate', name) as current:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        manifest = load_manifest(project_path)
+        if manifest is not None and manifest.get('key') == key:
+            print(f'Reusing program: {grammar_id} iteration: {iteration} data_structure: {data_structure}' + (f' lang: {lang}' if lang else ''))
+            current.set(reused=True)
+            ensure_source_metrics(project_path, manifest)
+            return project_path
+
+        shutil.rmtree(project_path, ignore_errors=True)
+
+        print(f'Generating program: {grammar_id} iteration: {iteration} data_structure: {data_structure}' + (f' lang: {lang}' if lang else ''))
+        cmd = ['./benchGen', str(iteration),
+               f'./examples/{grammar_id}/production_rule.txt', f'./examples/{grammar_id}/seed_string.txt',
+               name, data_structure] + ([lang] if lang else [])
+        process = subprocess.run(cmd, cwd=gen_dir(benchgen_root), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        current.set(cmd=shlex.join(cmd), returncode=process.returncode)
+
+        if process.returncode != 0:
+            shutil.rmtree(project_path, ignore_errors=True)
+            raise OSError(f'BenchGen failed for {name} (exit {process.returncode}): {last_line(process.stderr)}')
+        if not os.path.isdir(project_path):
+            raise OSError(f'BenchGen did not generate {project_path}')
+
+        fields.update({'key': key, 'name': name, 'created': time.time()})
+        ensure_source_metrics(project_path, fields)
+
+    return project_path
+
+def generate_all(benchgen_root, projects, jobs=None):
+    """
+    Gera vários projetos com até 'jobs' processos do BenchGen ao mesmo tempo,
+    cada um no seu diretório, e entrega cada projeto assim que ele fica pronto,
+    para que a compilação dele comece sem esperar pelos demais.
+
+    Parameters:
+        benchgen_root (str): Caminho raiz do BenchGen.
+        projects (iterable[tuple]): Parâmetros de generate, sem o benchgen_root:
+                                    (gramática, iteração, estrutura de dados[, linguagem]).
+        jobs (int): Gerações simultâneas (padrão: GENERATE_JOBS).
+
+    Yields:
+        str: Caminho de cada projeto, na ordem em que as gerações terminam.
+
+    Raises:
+        OSError: Se alguma geração falhar, depois que as gerações em andamento terminarem.
+    """
+    projects = list(dict.fromkeys(tuple(project) for project in projects))
+    jobs     = max(1, min(jobs or GENERATE_JOBS, len(projects) or 1))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(generate, benchgen_root, *project) for project in projects]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+def ensure_source_metrics(project_path, manifest):
+    """
+    Guarda no manifesto as métricas do código do projeto (ver
+    common/source_metrics.py), calculadas só quando ainda não estão lá ou
+    foram obtidas por outra versão do scanner.
+
+    Parameters:
+        project_path (str): Diretório do projeto.
+        manifest (dict): Manifesto do projeto, atualizado e gravado em disco.
+    """
+    metrics = manifest.get('source_metrics')
+    if metrics and metrics.get('version') == source_metrics.SCANNER_VERSION:
+        return
+
+    with spans.span('parse', 'source metrics'):
+        metrics = source_metrics.scan_project(project_path, manifest.get('lang', 'c'), manifest.get('data_structure', ''))
+    metrics['version'] = source_metrics.SCANNER_VERSION
+    manifest['source_metrics'] = metrics
+    write_manifest(project_path, manifest)
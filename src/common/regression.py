@@ -0,0 +1,205 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : regression.py
+# Descrição       : Detector de regressões entre versões do GCC a partir dos
+#                   resultados do artefato 'Versões do GCC'. Para cada célula
+#                   (otimização, iteração, gramática, estrutura de dados) e par
+#                   de versões adjacentes, compara as amostras de cada execução
+#                   com o teste de Mann-Whitney e o delta de Cliff, e marca como
+#                   regressão as pioras de tempo de compilação, tempo de execução
+#                   ou tamanho do binário acima de um limiar. O relatório pode
+#                   bloquear a adoção de uma versão nova (código de saída 1).
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, re, sys, csv, glob, argparse
+import numpy as np
+
+# Colunas que identificam uma célula (mesmas de gcc_versions.KEY_COLUMNS)
+KEY_COLUMNS = ['opt', 'iteration', 'grammar_name', 'data_structure']
+
+# Métricas com amostras por execução e a métrica determinística de tamanho
+TIME_METRICS = ['gcc_compilation_time', 'gcc_program_time']
+SIZE_METRIC  = 'bin_size'
+
+# Piora relativa mínima da mediana (ou do tamanho) para marcar uma regressão
+THRESHOLD = 0.05
+
+# Nível de significância, aplicado aos p-valores corrigidos por Holm
+ALPHA = 0.05
+
+# Delta de Cliff mínimo; 0.33 separa efeitos pequenos de médios (Romano et al.)
+MIN_DELTA = 0.33
+
+REPORT_HEADER = KEY_COLUMNS + ['metric', 'old_version', 'new_version', 'old_runs', 'new_runs',
+                               'old_median', 'new_median', 'change', 'p_value', 'p_holm', 'cliffs_delta', 'status']
+
+# data_{versão}_{execuções}_{gramática}.csv, nome usado por gcc_versions.py e pelo planejador
+RESULT_NAME = re.compile(r'^data_(?P<version>[^_]+)_(?P<runs>\d+)_(?P<grammar>.+?)(?P<suffix>_runs|_symbols)?\.csv$')
+
+def version_key(version):
+    """Ordena versões como números: 'gcc5' < '9.4' < '13' < '14.2'."""
+    return tuple(int(part) for part in re.findall(r'\d+', str(version))) or (float('inf'),)
+
+def cliffs_delta(new, old):
+    """
+    Delta de Cliff: P(new > old) - P(new < old), entre -1 e 1. Valores
+    positivos indicam que a versão nova é maior (mais lenta ou maior).
+    """
+    signs = np.sign(np.subtract.outer(np.asarray(new, dtype=float), np.asarray(old, dtype=float)))
+    return float(signs.mean()) if signs.size else float('nan')
+
+def holm(p_values):
+    """
+    Corrige os p-valores de vários testes pelo método de Holm-Bonferroni.
+
+    Returns:
+        np.ndarray: P-valores corrigidos, na ordem original; NaN é mantido.
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    valid    = np.flatnonzero(~np.isnan(p_values))
+    adjusted = np.full(p_values.shape, np.nan)
+    if valid.size:
+        order  = valid[np.argsort(p_values[valid])]
+        scaled = p_values[order] * (valid.size - np.arange(valid.size))
+        adjusted[order] = np.minimum(np.maximum.accumulate(scaled), 1.0)
+    return adjusted
+
+def load_results(paths):
+    """
+    Lê os resultados de várias versões do GCC. Para cada CSV principal,
+    as amostras vêm do '_runs.csv' ao lado; sem ele, não há teste de tempo.
+
+    Parameters:
+        paths (list[str]): CSVs principais (data_<versão>_<execuções>_<gramática>.csv) ou diretórios.
+
+    Returns:
+        tuple[dict, dict]: {(chave, métrica, versão): amostras} e {(chave, versão): tamanho}.
+    """
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, 'data_*.csv'))) if os.path.isdir(path) else [path]
+
+    samples, sizes = {}, {}
+    for path in files:
+        match = RESULT_NAME.match(os.path.basename(path))
+        if match is None or match.group('suffix'):
+            continue
+        version = match.group('version')
+
+        with open(path, mode='r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get(SIZE_METRIC) not in (None, ''):
+                    sizes[(tuple(row[column] for column in KEY_COLUMNS), version)] = float(row[SIZE_METRIC])
+
+        runs_path = path[:-len('.csv')] + '_runs.csv'
+        if not os.path.isfile(runs_path):
+            print(f'{runs_path} not found: only sizes are compared for version {version}')
+            continue
+        with open(runs_path, mode='r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                key = (tuple(row[column] for column in KEY_COLUMNS), row['metric'], row['gcc_version'])
+                samples.setdefault(key, []).append(float(row['value']))
+
+    return samples, sizes
+
+def compare(samples, sizes, threshold=THRESHOLD, alpha=ALPHA, min_delta=MIN_DELTA):
+    """
+    Compara cada versão com a anterior, célula a célula.
+
+    Uma piora de tempo é regressão quando a mediana cresce mais que
+    'threshold', o p-valor corrigido fica abaixo de 'alpha' e o delta de
+    Cliff passa de 'min_delta'; o tamanho, que é determinístico, só precisa
+    crescer mais que 'threshold'. Melhorias simétricas são marcadas como
+    'improvement' e o restante como 'ok'.
+
+    Returns:
+        list[list]: Linhas no formato de REPORT_HEADER.
+    """
+    from scipy import stats
+
+    rows, p_values = [], []
+
+    series = {}
+    for (key, metric, version), values in samples.items():
+        series.setdefault((key, metric), {})[version] = np.array(values)
+    for (key, version), size in sizes.items():
+        series.setdefault((key, SIZE_METRIC), {})[version] = np.array([size])
+
+    for (key, metric), by_version in sorted(series.items()):
+        versions = sorted(by_version, key=version_key)
+        for old, new in zip(versions, versions[1:]):
+            old_values, new_values = by_version[old], by_version[new]
+            old_median, new_median = float(np.median(old_values)), float(np.median(new_values))
+            change = new_median / old_median - 1 if old_median else float('nan')
+
+            p_value = delta = float('nan')
+            if metric != SIZE_METRIC and len(old_values) > 1 and len(new_values) > 1:
+                p_value = float(stats.mannwhitneyu(new_values, old_values, alternative='two-sided').pvalue)
+                delta   = cliffs_delta(new_values, old_values)
+
+            rows.append(list(key) + [metric, old, new, len(old_values), len(new_values),
+                                     old_median, new_median, change, p_value, None, delta, None])
+            p_values.append(p_value)
+
+    for row, p_holm in zip(rows, holm(p_values)):
+        metric, change, delta = row[len(KEY_COLUMNS)], row[-5], row[-2]
+        row[-3] = p_holm
+
+        if metric == SIZE_METRIC:
+            significant = abs(change) > threshold
+        else:
+            significant = p_holm < alpha and abs(delta) >= min_delta and abs(change) > threshold
+        row[-1] = 'ok' if not significant else 'regression' if change > 0 else 'improvement'
+
+    return rows
+
+def write_report(rows, output):
+    """Grava o relatório completo em CSV."""
+    with open(output, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_HEADER)
+        writer.writerows(rows)
+
+def print_report(rows):
+    """Mostra as regressões encontradas e a contagem por par de versões."""
+    status = REPORT_HEADER.index('status')
+    counts = {}
+    for row in rows:
+        pair = (row[len(KEY_COLUMNS) + 1], row[len(KEY_COLUMNS) + 2])
+        counts.setdefault(pair, {'ok': 0, 'improvement': 0, 'regression': 0})[row[status]] += 1
+
+    print(f"{'versions':<16}{'compared':>10}{'regressions':>13}{'improvements':>14}")
+    for (old, new), count in sorted(counts.items(), key=lambda item: version_key(item[0][1])):
+        print(f'{old + " -> " + new:<16}{sum(count.values()):>10}{count["regression"]:>13}{count["improvement"]:>14}')
+
+    regressions = [row for row in rows if row[status] == 'regression']
+    if regressions:
+        print()
+        print(f"{'opt':<6}{'it':>4} {'grammar':<8}{'ds':<12}{'metric':<22}{'versions':<14}{'change':>9}{'p_holm':>9}{'delta':>7}")
+    for row in regressions:
+        opt, iteration, grammar, data_structure, metric, old, new = row[:7]
+        change, p_holm, delta = row[-5], row[-3], row[-2]
+        print(f'{opt:<6}{iteration:>4} {grammar:<8}{data_structure:<12}{metric:<22}{old + "->" + new:<14}'
+              f'{change:>+9.1%}{p_holm:>9.3g}{delta:>7.2f}')
+
+def usage_parser():
+    """Cria o parser da linha de comando do detector."""
+    parser = argparse.ArgumentParser(prog='regression.py', description='Regressões entre versões do GCC')
+    parser.add_argument('results', nargs='+', help='CSVs data_<versão>_<execuções>_<gramática>.csv ou diretórios com eles')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='Piora relativa mínima (padrão: 0.05)')
+    parser.add_argument('--alpha', type=float, default=ALPHA, help='Significância após a correção de Holm (padrão: 0.05)')
+    parser.add_argument('--min-delta', type=float, default=MIN_DELTA, help="Delta de Cliff mínimo (padrão: 0.33)")
+    parser.add_argument('--output', default=None, help='Grava o relatório completo neste CSV')
+    parser.add_argument('--gate', action='store_true', help='Termina com código 1 se houver alguma regressão')
+    return parser
+
+if __name__ == '__main__':
+    args = usage_parser().parse_args(sys.argv[1:])
+    samples, sizes = load_results(args.results)
+    rows = compare(samples, sizes, args.threshold, args.alpha, args.min_delta)
+
+    print_report(rows)
+    if args.output:
+        write_report(rows, os.path.abspath(args.output))
+    if args.gate and any(row[-1] == 'regression' for row in rows):
+        sys.exit(1)
@@ -0,0 +1,113 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : results.py
+# Descrição       : Escrita incremental dos CSVs de resultados. Cada linha é
+#                   gravada e sincronizada com o disco assim que a célula
+#                   termina, e o modo de retomada lê o arquivo parcial para
+#                   pular as células já medidas.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, csv
+
+# Diretório padrão dos resultados (mesmo local usado originalmente pelos scripts)
+DEFAULT_OUTPUT_DIR = '/tmp'
+
+def add_output_arguments(parser):
+    """Acrescenta as opções '--output-dir' e '--resume' a um argparse.ArgumentParser."""
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help='Diretório dos CSVs de resultado (padrão: /tmp)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continua uma execução interrompida, pulando as células já gravadas')
+
+class ResultWriter:
+    """CSV gravado linha a linha, com retomada pelas colunas que identificam cada célula."""
+
+    def __init__(self, path, header, key_columns, resume=False, only=None):
+        """
+        Parameters:
+            path (str): Caminho do CSV.
+            header (list[str]): Cabeçalho do CSV.
+            key_columns (list[str]): Colunas que identificam uma célula.
+            resume (bool): Mantém as linhas já gravadas em vez de recomeçar o arquivo.
+            only (set[tuple]): Se informado, descarta na retomada as linhas cuja
+                               chave não está no conjunto (ex.: linhas auxiliares
+                               de células que não chegaram a terminar).
+
+        Raises:
+            ValueError: Se o arquivo existente tiver outro cabeçalho.
+        """
+        self.path        = path
+        self.header      = list(header)
+        self.key_indexes = [self.header.index(column) for column in key_columns]
+        self.done        = set()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        rows = self._read_existing() if resume else None
+
+        if rows is None:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            self._write(self.header)
+            return
+
+        if only is not None:
+            rows = [row for row in rows if self.key(row) in only]
+
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.header)
+        self.writer.writerows(rows)
+        self._flush()
+
+        self.done.update(self.key(row) for row in rows)
+
+    def _read_existing(self):
+        """Lê as linhas completas de um CSV parcial; retorna None se ele não existir."""
+        if not os.path.isfile(self.path):
+            return None
+
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            content = f.read()
+
+        # Uma linha sem quebra no final foi interrompida no meio da escrita
+        if content and not content.endswith('\n'):
+            content = content[:content.rfind('\n') + 1]
+
+        rows = list(csv.reader(content.splitlines()))
+        if not rows:
+            return None
+        if rows[0] != self.header:
+            raise ValueError(f'{self.path} has a different header and cannot be resumed')
+
+        return [row for row in rows[1:] if len(row) == len(self.header)]
+
+    def _flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _write(self, row):
+        self.writer.writerow(row)
+        self._flush()
+
+    def key(self, row):
+        """Chave de uma linha, com os valores normalizados como texto."""
+        return tuple(str(row[index]) for index in self.key_indexes)
+
+    def is_done(self, *key_values):
+        """Indica se a célula com os valores de chave informados já foi gravada."""
+        return tuple(str(value) for value in key_values) in self.done
+
+    def write(self, row):
+        """Grava uma linha e a sincroniza com o disco."""
+        self._write(row)
+        self.done.add(self.key(row))
+
+    def write_rows(self, rows):
+        """Grava várias linhas de uma vez."""
+        self.writer.writerows(rows)
+        self._flush()
+        self.done.update(self.key(row) for row in rows)
+
+    def close(self):
+        self.file.close()
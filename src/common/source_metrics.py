@@ -0,0 +1,185 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : source_metrics.py
+# Descrição       : Métricas de tamanho do código gerado pelo BenchGen (linhas,
+#                   funções, laços, chamadas e operações sobre a estrutura de
+#                   dados), usadas como eixo de tamanho no lugar da iteração.
+#                   Os arquivos são lidos linha a linha, sem carregar o projeto
+#                   inteiro na memória; program_store guarda o resultado no
+#                   manifesto de cada projeto.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, re, sys, json
+
+# Versão do scanner; mudar invalida as métricas guardadas nos manifestos
+SCANNER_VERSION = 1
+
+# Colunas acrescentadas aos CSVs dos artefatos
+COLUMNS = ['src_lines', 'src_functions', 'src_loops', 'src_calls', 'src_ds_ops']
+
+# Extensões dos fontes de cada linguagem gerada pelo BenchGen
+EXTENSIONS = {
+    'c': ('.c', '.h'),
+    'cpp': ('.cpp', '.hpp', '.h'),
+    'go': ('.go',),
+    'julia': ('.jl',),
+    'v': ('.v',),
+    'odin': ('.odin',),
+    'd': ('.d',),
+    'nim': ('.nim',),
+    'ada': ('.adb', '.ads'),
+    'cangjie': ('.cj',),
+}
+
+# Comentário de linha de cada linguagem
+LINE_COMMENT = {'julia': '#', 'nim': '#', 'ada': '--'}
+
+# Linguagens com comentário de bloco no estilo /* */
+BLOCK_COMMENTS = {'c', 'cpp', 'go', 'v', 'odin', 'd', 'cangjie'}
+
+# Definição de função, por linguagem; as linguagens no estilo C usam a regra de chaves de scan_file
+FUNCTION_DEFINITION = {
+    'go': re.compile(r'^\s*func\b'),
+    'julia': re.compile(r'^\s*function\b'),
+    'v': re.compile(r'^\s*(pub\s+)?fn\b'),
+    'odin': re.compile(r'::\s*proc\b'),
+    'nim': re.compile(r'^\s*(proc|func|method|iterator)\b'),
+    'ada': re.compile(r'^\s*(procedure|function)\b.*\bis\s*$', re.IGNORECASE),
+    'cangjie': re.compile(r'^\s*func\b'),
+}
+
+LOOP     = re.compile(r'\b(for|while)\b')
+ADA_LOOP = re.compile(r'^\s*(\w+\s*:\s*)?loop\b', re.IGNORECASE)
+CALL     = re.compile(r'\b([A-Za-z_]\w*)\s*\(')
+STRING   = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])\'')
+
+KEYWORDS = {'if', 'for', 'while', 'switch', 'return', 'sizeof', 'case', 'do', 'else', 'elif', 'elsif', 'loop',
+            'func', 'function', 'fn', 'proc', 'procedure', 'method', 'iterator', 'when', 'match', 'defer', 'not',
+            'and', 'or', 'in', 'typeof', 'alignof', 'cast', 'auto', 'new', 'delete'}
+
+def _strip(line, lang, in_block):
+    """
+    Remove strings e comentários de uma linha.
+
+    Returns:
+        tuple[str, bool]: Linha sem comentários e se um comentário de bloco continua aberto.
+    """
+    line = STRING.sub('""', line)
+    code = ''
+
+    if lang in BLOCK_COMMENTS:
+        while line:
+            if in_block:
+                end = line.find('*/')
+                if end < 0:
+                    return code, True
+                line, in_block = line[end + 2:], False
+            else:
+                start = line.find('/*')
+                if start < 0:
+                    code += line
+                    break
+                code, line, in_block = code + line[:start], line[start + 2:], True
+        line = code
+
+    marker = LINE_COMMENT.get(lang, '//')
+    position = line.find(marker)
+    if position >= 0:
+        line = line[:position]
+    return line, in_block
+
+def scan_file(path, lang, data_structure, counts):
+    """
+    Conta linhas, funções, laços, chamadas e operações sobre a estrutura de
+    dados de um arquivo, lendo-o linha a linha.
+
+    Parameters:
+        path (str): Arquivo fonte.
+        lang (str): Linguagem do projeto.
+        data_structure (str): Estrutura de dados do programa; chamadas cujo nome
+                              contém esse nome contam como operações sobre ela.
+        counts (dict): Contadores atualizados, com as chaves de COLUMNS.
+    """
+    definition = FUNCTION_DEFINITION.get(lang)
+    ds_name    = data_structure.lower().replace('_', '')
+    depth      = 0
+    in_block   = False
+
+    with open(path, mode='r', encoding='utf-8', errors='replace') as f:
+        for raw in f:
+            counts['src_lines'] += 1
+            line, in_block = _strip(raw, lang, in_block)
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#') and lang in ('c', 'cpp'):
+                continue
+
+            calls = [name for name in CALL.findall(line) if name not in KEYWORDS]
+
+            if definition is not None:
+                is_definition = bool(definition.search(line))
+            else:
+                # Estilo C: 'nome(...)' fora de qualquer bloco e sem ';' é uma definição
+                is_definition = depth == 0 and bool(calls) and not stripped.endswith(';')
+                depth += line.count('{') - line.count('}')
+
+            if is_definition:
+                counts['src_functions'] += 1
+                calls = calls[1:]
+
+            # O 'while' de um do-while conta o laço; em Ada, só o 'loop' sem for/while abre um laço
+            counts['src_loops'] += len(LOOP.findall(line))
+            if lang == 'ada' and ADA_LOOP.match(line):
+                counts['src_loops'] += 1
+
+            counts['src_calls']  += len(calls)
+            counts['src_ds_ops'] += sum(1 for name in calls if ds_name and ds_name in name.lower().replace('_', ''))
+
+def scan_project(project_path, lang='c', data_structure=''):
+    """
+    Calcula as métricas de todos os fontes de um projeto.
+
+    Parameters:
+        project_path (str): Diretório do projeto gerado.
+        lang (str): Linguagem do projeto.
+        data_structure (str): Estrutura de dados do programa.
+
+    Returns:
+        dict: Valores das colunas de COLUMNS e o número de arquivos lidos.
+    """
+    counts     = dict.fromkeys(COLUMNS, 0)
+    extensions = EXTENSIONS.get(lang, EXTENSIONS['c'])
+    files      = 0
+
+    for root, dirs, names in os.walk(project_path):
+        dirs.sort()
+        for name in sorted(names):
+            if name.endswith(extensions):
+                scan_file(os.path.join(root, name), lang, data_structure, counts)
+                files += 1
+
+    counts['files'] = files
+    return counts
+
+def values(manifest):
+    """
+    Valores das colunas de COLUMNS guardados no manifesto de um projeto
+    (ver program_store.generate); colunas ausentes ficam vazias.
+
+    Parameters:
+        manifest (dict): Manifesto do projeto.
+
+    Returns:
+        list: Um valor por coluna de COLUMNS.
+    """
+    metrics = (manifest or {}).get('source_metrics') or {}
+    return [metrics.get(column, '') for column in COLUMNS]
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from common import program_store
+
+    # Projetos do repositório usam a linguagem e a estrutura de dados do manifesto
+    for path in sys.argv[1:]:
+        manifest = program_store.load_manifest(path) or {}
+        metrics  = scan_project(os.path.abspath(path), manifest.get('lang', 'c'), manifest.get('data_structure', ''))
+        print(path, json.dumps(metrics))
@@ -0,0 +1,223 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : spans.py
+# Descrição       : Rastreamento do próprio harness. Cada etapa de uma execução
+#                   (geração, compilação, medição, leitura de resultados e
+#                   limpeza) é registrada como um intervalo com início, fim, o
+#                   comando executado e o seu código de saída. Os intervalos
+#                   são gravados, um por linha, em um arquivo compartilhado
+#                   pelos processos filhos (ex.: o pool de compilação) e, no
+#                   fim da execução, exportados como um trace do Chrome
+#                   (chrome://tracing ou ui.perfetto.dev) e como uma tabela com
+#                   o tempo de cada etapa.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, csv, json, time, shlex, atexit, itertools, threading, subprocess, contextlib
+
+# Etapas registradas pelos scripts; o tempo fora de qualquer intervalo aparece como OTHER
+STAGES = ['generate', 'compile', 'measure', 'parse', 'cleanup']
+OTHER  = 'other'
+
+# Defina BENCHGEN_SPANS_DISABLE=1 para não gravar o trace do harness
+ENABLED = os.environ.get('BENCHGEN_SPANS_DISABLE', '0') in ('', '0')
+
+SUMMARY_HEADER = ['stage', 'spans', 'seconds', 'share', 'max_seconds', 'max_span']
+
+# Estado da gravação, definido por enable
+TRACE = None
+
+_ids   = itertools.count()
+_local = threading.local()
+
+class Span:
+    """Intervalo aberto por span; set acrescenta argumentos (ex.: o código de saída)."""
+
+    def __init__(self, stage, name, cmd=None):
+        self.stage = stage
+        self.name  = name
+        self.args  = {} if cmd is None else {'cmd': cmd if isinstance(cmd, str) else shlex.join(cmd)}
+
+    def set(self, **args):
+        self.args.update(args)
+
+def enable(output_dir, name):
+    """
+    Começa a gravar os intervalos desta execução em output_dir. O trace e a
+    tabela são exportados quando o processo termina.
+
+    Parameters:
+        output_dir (str): Diretório dos resultados.
+        name (str): Prefixo dos arquivos (ex.: 'compilers_comparison').
+    """
+    global TRACE
+    if not ENABLED:
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = os.path.join(os.path.abspath(output_dir), f'{name}_harness')
+    TRACE  = {'spans': f'{prefix}_spans.jsonl', 'trace': f'{prefix}_trace.json', 'stages': f'{prefix}_stages.csv',
+              'pid': os.getpid(), 'start': time.time(), 'fd': None, 'fd_pid': None}
+    open(TRACE['spans'], mode='w').close()
+    atexit.register(export)
+
+def _stack():
+    # Os processos filhos herdam a pilha do pai no fork, mas os intervalos do pai não são deles
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.pid, _local.stack = os.getpid(), []
+    return _local.stack
+
+def _write(record):
+    if TRACE['fd_pid'] != os.getpid():
+        TRACE['fd']     = os.open(TRACE['spans'], os.O_WRONLY | os.O_APPEND)
+        TRACE['fd_pid'] = os.getpid()
+    # Uma única escrita com O_APPEND, para que linhas de processos diferentes não se misturem
+    os.write(TRACE['fd'], (json.dumps(record) + '\n').encode())
+
+@contextlib.contextmanager
+def span(stage, name, cmd=None):
+    """
+    Registra o intervalo do bloco. Uma exceção é gravada nos argumentos e
+    propagada.
+
+    Parameters:
+        stage (str): Etapa, uma de STAGES.
+        name (str): Descrição curta do intervalo.
+        cmd (str | list[str]): Comando executado, se houver.
+
+    Yields:
+        Span: Intervalo, para acrescentar argumentos com set.
+    """
+    current = Span(stage, name, cmd)
+    if TRACE is None:
+        yield current
+        return
+
+    stack     = _stack()
+    span_id   = f'{os.getpid()}.{next(_ids)}'
+    parent_id = stack[-1] if stack else None
+    stack.append(span_id)
+    start = time.time()
+    try:
+        yield current
+    except BaseException as error:
+        current.set(error=type(error).__name__)
+        raise
+    finally:
+        stack.pop()
+        _write({'id': span_id, 'parent': parent_id, 'pid': os.getpid(), 'tid': threading.get_native_id(),
+                'stage': stage, 'name': name, 'start': start, 'end': time.time(), 'args': current.args})
+
+def run(stage, name, cmd, **kwargs):
+    """subprocess.run dentro de um intervalo que grava o comando e o código de saída."""
+    with span(stage, name, cmd) as current:
+        process = subprocess.run(cmd, **kwargs)
+        current.set(returncode=process.returncode)
+    return process
+
+def system(stage, name, cmd):
+    """os.system dentro de um intervalo que grava o comando e o código de saída."""
+    with span(stage, name, cmd) as current:
+        status = os.system(cmd)
+        current.set(returncode=os.waitstatus_to_exitcode(status))
+    return status
+
+def read(path):
+    """Lê os intervalos gravados, ignorando uma linha final interrompida."""
+    records = []
+    with open(path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def chrome_trace(records, origin):
+    """
+    Converte os intervalos para o formato de eventos do trace do Chrome, com
+    os tempos em microssegundos a partir de 'origin'.
+
+    Returns:
+        dict: Objeto com a lista 'traceEvents'.
+    """
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'harness {pid}'}}
+              for pid in sorted({record['pid'] for record in records})]
+    for record in sorted(records, key=lambda record: record['start']):
+        events.append({'name': record['name'], 'cat': record['stage'], 'ph': 'X',
+                       'ts': (record['start'] - origin) * 1e6, 'dur': (record['end'] - record['start']) * 1e6,
+                       'pid': record['pid'], 'tid': record['tid'], 'args': record['args']})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def summarize(records, wall, pid):
+    """
+    Tempo de cada etapa, descontado o tempo dos intervalos internos (ex.: a
+    leitura do ELF dentro de uma compilação conta só como 'parse'). Os
+    processos filhos rodam em paralelo com o principal, então a soma das
+    partes pode passar de 100%; OTHER é o tempo do processo principal fora de
+    qualquer intervalo.
+
+    Parameters:
+        records (list[dict]): Intervalos gravados.
+        wall (float): Duração da execução, em segundos.
+        pid (int): Processo principal.
+
+    Returns:
+        list[list]: Linhas com as colunas de SUMMARY_HEADER.
+    """
+    durations = {record['id']: record['end'] - record['start'] for record in records}
+    own       = dict(durations)
+    for record in records:
+        if record['parent'] in own:
+            own[record['parent']] -= durations[record['id']]
+
+    stages = {}
+    for record in records:
+        entry = stages.setdefault(record['stage'], {'spans': 0, 'seconds': 0.0, 'max': None})
+        entry['spans']   += 1
+        entry['seconds'] += own[record['id']]
+        if entry['max'] is None or durations[record['id']] > durations[entry['max']['id']]:
+            entry['max'] = record
+
+    traced = sum(own[record['id']] for record in records if record['pid'] == pid)
+    rows   = []
+    for stage in STAGES + sorted(set(stages) - set(STAGES)):
+        if stage in stages:
+            entry, longest = stages[stage], stages[stage]['max']
+            label = longest['name'] + (f" ({longest['args']['cmd']})" if 'cmd' in longest['args'] else '')
+            rows.append([stage, entry['spans'], entry['seconds'], entry['seconds'] / wall if wall else None,
+                         durations[longest['id']], label])
+    rows.append([OTHER, '', max(wall - traced, 0.0), max(wall - traced, 0.0) / wall if wall else None, '', ''])
+    return rows
+
+def print_summary(rows, wall):
+    print(f'\nHarness time by stage ({wall:.1f} s):')
+    print(f'  {"stage":<10} {"spans":>7} {"seconds":>10} {"share":>7}  slowest')
+    for stage, count, seconds, share, longest, label in rows:
+        share   = f'{share:.1%}' if share is not None else ''
+        longest = f'{longest:.2f} s  {label}' if longest != '' else ''
+        print(f'  {stage:<10} {count:>7} {seconds:>10.2f} {share:>7}  {longest[:100]}')
+
+def export():
+    """Grava o trace do Chrome e a tabela por etapa; só o processo que chamou enable exporta."""
+    global TRACE
+    if TRACE is None or TRACE['pid'] != os.getpid():
+        return
+
+    trace, TRACE = TRACE, None
+    if trace['fd'] is not None:
+        os.close(trace['fd'])
+    wall    = time.time() - trace['start']
+    records = read(trace['spans'])
+
+    with open(trace['trace'], mode='w', encoding='utf-8') as f:
+        json.dump(chrome_trace(records, trace['start']), f)
+
+    rows = summarize(records, wall, trace['pid'])
+    with open(trace['stages'], mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_HEADER)
+        writer.writerows(rows)
+
+    os.remove(trace['spans'])
+    print_summary(rows, wall)
+    print(f"Harness trace written to {trace['trace']}")
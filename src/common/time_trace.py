@@ -0,0 +1,220 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : time_trace.py
+# Descrição       : Coleta e agregação dos traces do '-ftime-trace' do Clang.
+#                   Cada arquivo-fonte é compilado uma vez com o trace ligado,
+#                   fora das medições de tempo, e os JSONs gerados (um por
+#                   unidade de tradução) são lidos em fluxo, evento a evento,
+#                   porque os traces dos programas de iteração alta chegam a
+#                   centenas de MB. Os tempos de frontend, parse, instanciação
+#                   e backend são somados por arquivo-fonte e por função gerada
+#                   em uma tabela compacta, ligada às linhas do CSV do artefato
+#                   pelas colunas de chave.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, re, sys, json, glob, shlex, shutil, tempfile, subprocess
+
+# Duração mínima, em microssegundos, de um evento gravado no trace (-ftime-trace-granularity);
+# o padrão do Clang (500) descarta quase todas as funções pequenas geradas pelo BenchGen
+GRANULARITY = 50
+
+# Funções mantidas por célula; as demais são somadas na linha OTHER
+TOP_FUNCTIONS = 50
+OTHER = '<other>'
+
+# Categorias de tempo e os eventos do trace somados em cada uma
+CATEGORIES = {
+    'frontend'     : {'Frontend'},
+    'parse'        : {'ParseFunctionDefinition', 'ParseClass', 'ParseTemplate', 'ParseDeclarationOrFunctionDefinition'},
+    'instantiation': {'InstantiateFunction', 'InstantiateClass', 'PerformPendingInstantiations'},
+    'backend'      : {'Backend'},
+}
+
+# Eventos com o nome da função no campo 'detail' e a categoria de cada um
+# (o evento 'Backend' não tem o nome da função, só os passes por função)
+FUNCTION_EVENTS = {
+    'ParseFunctionDefinition': 'parse',
+    'InstantiateFunction'    : 'instantiation',
+    'OptFunction'            : 'backend',
+    'CodeGen Function'       : 'backend',
+}
+
+# Evento com o tempo total da unidade de tradução e evento de cada arquivo incluído
+TOTAL_EVENT  = 'ExecuteCompiler'
+SOURCE_EVENT = 'Source'
+
+# Colunas da tabela; os tempos são em segundos
+COLUMNS = ['scope', 'name', 'frontend', 'parse', 'instantiation', 'backend', 'total']
+
+CHUNK_SIZE = 1 << 16
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def is_clang(compiler):
+    """Indica se o compilador aceita '-ftime-trace' (Clang 9 ou mais novo)."""
+    return 'clang' in os.path.basename(compiler.split()[0])
+
+def events(path, chunk_size=CHUNK_SIZE):
+    """
+    Lê os eventos de um trace do Chrome sem carregar o arquivo inteiro:
+    só o trecho ainda não decodificado fica em memória.
+
+    Parameters:
+        path (str): Arquivo JSON gerado pelo '-ftime-trace'.
+        chunk_size (int): Tamanho de cada leitura.
+
+    Yields:
+        dict: Cada evento da lista 'traceEvents'.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, mode='r', encoding='utf-8') as f:
+        buffer = ''
+        while True:
+            start = buffer.find('"traceEvents"')
+            if start >= 0 and buffer.find('[', start) >= 0:
+                break
+            data = f.read(chunk_size)
+            if not data:
+                return
+            buffer += data
+
+        pos = buffer.find('[', start) + 1
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if buffer.startswith(']', pos):
+                return
+            try:
+                event, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                data = f.read(chunk_size)
+                if not data:
+                    return
+                buffer, pos = buffer[pos:] + data, 0
+                continue
+            yield event
+
+def _empty():
+    return dict.fromkeys(COLUMNS[2:], 0)
+
+def aggregate(trace_paths, sources=()):
+    """
+    Soma os tempos dos traces por arquivo-fonte e por função.
+
+    O arquivo de cada unidade de tradução leva os tempos totais dela; os
+    arquivos incluídos levam o tempo do evento 'Source' (inclusivo) como
+    frontend e parse. Cada função leva o parse da sua definição, as suas
+    instanciações e os passes de otimização e de geração de código.
+
+    Parameters:
+        trace_paths (list[str]): Traces, um por unidade de tradução, nomeados
+                                 como a fonte (ex.: main.json para main.c).
+        sources (list[str]): Fontes compiladas, para nomear cada unidade pelo
+                             arquivo em vez do nome do trace.
+
+    Returns:
+        dict: {'file': {nome: tempos}, 'function': {nome: tempos}}, em microssegundos.
+    """
+    table = {'file': {}, 'function': {}}
+    names = {os.path.splitext(os.path.basename(source))[0]: os.path.basename(source) for source in sources}
+
+    for trace_path in trace_paths:
+        unit  = os.path.splitext(os.path.basename(trace_path))[0]
+        unit  = names.get(unit, unit)
+        times = table['file'].setdefault(unit, _empty())
+
+        for event in events(trace_path):
+            if event.get('ph') != 'X':
+                continue
+            name     = event.get('name', '')
+            duration = event.get('dur', 0)
+            detail   = event.get('args', {}).get('detail', '')
+
+            if name == TOTAL_EVENT:
+                times['total'] += duration
+            elif name == SOURCE_EVENT and detail:
+                header = table['file'].setdefault(os.path.basename(detail), _empty())
+                header['frontend'] += duration
+                header['parse']    += duration
+                header['total']    += duration
+                continue
+
+            for category, members in CATEGORIES.items():
+                if name in members:
+                    times[category] += duration
+
+            if name in FUNCTION_EVENTS and detail:
+                table['function'].setdefault(detail, _empty())[FUNCTION_EVENTS[name]] += duration
+
+    for times in table['function'].values():
+        times['frontend'] = times['parse'] + times['instantiation']
+        times['total']    = times['frontend'] + times['backend']
+    return table
+
+def rows(key_values, table, top=TOP_FUNCTIONS):
+    """
+    Linhas da tabela compacta de uma célula: todos os arquivos e as 'top'
+    funções mais lentas, com as demais somadas em uma linha OTHER.
+
+    Returns:
+        list[list]: Linhas com key_values seguido de COLUMNS.
+    """
+    def line(scope, name, times):
+        return list(key_values) + [scope, name] + [times[column] / 1e6 for column in COLUMNS[2:]]
+
+    lines     = [line('file', name, times) for name, times in sorted(table['file'].items())]
+    functions = sorted(table['function'].items(), key=lambda item: item[1]['total'], reverse=True)
+    lines    += [line('function', name, times) for name, times in functions[:top]]
+
+    if len(functions) > top:
+        other = _empty()
+        for _, times in functions[top:]:
+            for column in other:
+                other[column] += times[column]
+        lines.append(line('function', OTHER, other))
+    return lines
+
+def collect(command, sources, granularity=GRANULARITY, env=None):
+    """
+    Compila as fontes uma vez com '-ftime-trace' em um diretório temporário,
+    fora de qualquer medição, e agrega os traces gerados.
+
+    Parameters:
+        command (str): Compilador e flags, sem as fontes; deve gerar um arquivo
+                       por fonte (ex.: 'clang-21 -O2 -c' ou '... -S -emit-llvm').
+        sources (list[str]): Arquivos .c compilados.
+        granularity (int): Duração mínima dos eventos, em microssegundos.
+
+    Returns:
+        dict: Resultado de aggregate (vazio se o compilador falhar).
+    """
+    # Importado aqui para que o módulo continue executável como script
+    from common import spans
+
+    trace_dir = tempfile.mkdtemp(prefix='time_trace_')
+    try:
+        cmd = (shlex.split(command) + ['-ftime-trace', f'-ftime-trace-granularity={granularity}']
+               + [os.path.abspath(source) for source in sources])
+        process = spans.run('compile', 'time trace', cmd, cwd=trace_dir, env=env, stdout=subprocess.DEVNULL)
+        if process.returncode != 0:
+            print(f'Time trace compilation failed (exit {process.returncode}): {command}')
+        with spans.span('parse', 'time trace'):
+            return aggregate(sorted(glob.glob(f'{trace_dir}/*.json')), sources)
+    finally:
+        with spans.span('cleanup', 'time trace'):
+            shutil.rmtree(trace_dir, ignore_errors=True)
+
+def add_time_trace_arguments(parser):
+    """Acrescenta as opções do '-ftime-trace' a um argparse.ArgumentParser."""
+    parser.add_argument('--time-trace', action='store_true',
+                        help="Compila cada célula do Clang mais uma vez com '-ftime-trace' e grava a tabela de tempos")
+    parser.add_argument('--time-trace-granularity', type=int, default=GRANULARITY,
+                        help=f'Duração mínima, em µs, dos eventos do trace (padrão: {GRANULARITY})')
+
+if __name__ == '__main__':
+    # Agrega traces já gravados (um por unidade de tradução) e mostra a tabela compacta
+    if len(sys.argv) < 2:
+        print('Usage: python time_trace.py <trace.json> [<trace.json> ...]')
+        sys.exit(1)
+    for line in rows([], aggregate(sys.argv[1:])):
+        print(*line, sep=',')
@@ -0,0 +1,257 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : timing.py
+# Descrição       : Executor de medições de tempo usado no lugar do hyperfine.
+#                   Cria o processo diretamente, obtém o tempo de parede e os
+#                   tempos de usuário/sistema pelo rusage do wait4 e devolve
+#                   todas as amostras com mediana, MAD, mínimo e intervalo de
+#                   confiança por bootstrap. No modo adaptativo, o número de
+#                   execuções é decidido pela largura do intervalo de confiança.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, glob, time, shlex, random, statistics, subprocess
+
+from common import hygiene, spans
+
+# Estatísticas de cada medição que viram colunas extras nos CSVs
+SUMMARY_FIELDS = ['median', 'mad', 'min', 'ci_low', 'ci_high', 'user', 'sys', 'runs']
+
+# Configuração do intervalo de confiança por bootstrap
+CONFIDENCE = 0.95
+BOOTSTRAP_RESAMPLES = 2000
+
+# Configuração do modo adaptativo (None desativa; ver enable_adaptive)
+ADAPTIVE = None
+
+def command(cmd, cwd=None):
+    """
+    Converte um comando em texto para uma lista de argumentos, expandindo
+    os padrões glob como o shell faria, para que não seja preciso criar um shell.
+
+    Parameters:
+        cmd (str | list[str]): Comando a ser convertido.
+        cwd (str): Diretório em que os padrões glob são expandidos.
+
+    Returns:
+        list[str]: Argumentos do comando.
+    """
+    if not isinstance(cmd, str):
+        return list(cmd)
+
+    args = []
+    for arg in shlex.split(cmd):
+        matches = sorted(glob.glob(arg, root_dir=cwd)) if any(c in arg for c in '*?[') else []
+        args.extend(matches or [arg])
+    return args
+
+def run_once(cmd, cwd=None, env=None, show_output=False):
+    """
+    Executa o comando uma vez e mede seus tempos.
+
+    Parameters:
+        cmd (str | list[str]): Comando a ser executado.
+        cwd (str): Diretório de execução.
+        env (dict): Variáveis de ambiente do processo.
+        show_output (bool): Mostra a saída padrão do comando.
+
+    Returns:
+        dict: Tempos 'wall', 'user' e 'sys' em segundos e o 'returncode'.
+    """
+    stdout = None if show_output else subprocess.DEVNULL
+
+    start   = time.perf_counter()
+    process = subprocess.Popen(command(cmd, cwd), cwd=cwd, env=env, stdout=stdout, preexec_fn=hygiene.preexec_fn())
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    return {'wall': wall, 'user': rusage.ru_utime, 'sys': rusage.ru_stime, 'returncode': process.returncode}
+
+def bootstrap_ci(values, statistic=statistics.median, confidence=CONFIDENCE, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """
+    Calcula o intervalo de confiança de uma estatística por bootstrap percentil.
+
+    Parameters:
+        values (list[float]): Amostras.
+        statistic (callable): Estatística calculada em cada reamostragem.
+        confidence (float): Nível de confiança.
+        resamples (int): Número de reamostragens.
+        seed (int): Semente do gerador, para resultados reprodutíveis.
+
+    Returns:
+        tuple[float, float]: Limites inferior e superior do intervalo.
+    """
+    if len(values) < 2:
+        return values[0], values[0]
+
+    rng       = random.Random(seed)
+    estimates = sorted(statistic(rng.choices(values, k=len(values))) for _ in range(resamples))
+    alpha     = (1 - confidence) / 2
+
+    return estimates[int(alpha * (resamples - 1))], estimates[int((1 - alpha) * (resamples - 1))]
+
+def enable_adaptive(target_ci, min_runs=5, max_runs=100, statistic='median'):
+    """
+    Ativa o modo adaptativo: cada medição continua amostrando até a largura
+    relativa do intervalo de confiança ficar abaixo de 'target_ci', respeitando
+    os limites mínimo e máximo de execuções. O número fixo de execuções passado
+    para measure é ignorado enquanto o modo estiver ativo.
+
+    Parameters:
+        target_ci (float): Largura relativa máxima do intervalo (ex.: 0.02 = 2%).
+        min_runs (int): Número mínimo de execuções medidas.
+        max_runs (int): Número máximo de execuções medidas.
+        statistic (str): 'median' ou 'mean'.
+    """
+    global ADAPTIVE
+
+    if statistic not in ('median', 'mean'):
+        raise ValueError(f'Unknown statistic {statistic!r}')
+
+    ADAPTIVE = {'target_ci': target_ci, 'min_runs': max(min_runs, 2), 'max_runs': max(max_runs, min_runs), 'statistic': statistic}
+
+def add_adaptive_arguments(parser):
+    """Acrescenta as opções do modo adaptativo a um argparse.ArgumentParser."""
+    parser.add_argument('--adaptive', type=float, default=None, metavar='WIDTH',
+                        help='Amostra até a largura relativa do intervalo de confiança ficar abaixo de WIDTH (ex.: 0.02)')
+    parser.add_argument('--min-runs', type=int, default=5, help='Mínimo de execuções no modo adaptativo')
+    parser.add_argument('--max-runs', type=int, default=100, help='Máximo de execuções no modo adaptativo')
+    parser.add_argument('--statistic', choices=['median', 'mean'], default='median',
+                        help='Estatística cujo intervalo de confiança controla o modo adaptativo')
+
+def enable_from_args(args):
+    """Ativa o modo adaptativo a partir das opções de add_adaptive_arguments, se '--adaptive' foi usado."""
+    if args.adaptive is not None:
+        enable_adaptive(args.adaptive, args.min_runs, args.max_runs, args.statistic)
+
+def confidence_interval(values, statistic='median', confidence=CONFIDENCE):
+    """
+    Calcula o intervalo de confiança usado pelo modo adaptativo: intervalo t de
+    Student para a média, ou intervalo por estatísticas de ordem (binomial) para
+    a mediana, que não depende da distribuição das amostras.
+
+    Parameters:
+        values (list[float]): Amostras.
+        statistic (str): 'median' ou 'mean'.
+        confidence (float): Nível de confiança.
+
+    Returns:
+        tuple[float, float, float]: Estimativa, limite inferior e limite superior.
+    """
+    from scipy import stats
+
+    n = len(values)
+
+    if statistic == 'mean':
+        center = statistics.fmean(values)
+        sem    = statistics.stdev(values) / n ** 0.5
+        if sem == 0:
+            return center, center, center
+        low, high = stats.t.interval(confidence, n - 1, loc=center, scale=sem)
+        return center, float(low), float(high)
+
+    ordered = sorted(values)
+    alpha   = (1 - confidence) / 2
+    low     = int(stats.binom.ppf(alpha, n, 0.5))
+    high    = int(stats.binom.isf(alpha, n, 0.5))
+    return statistics.median(ordered), ordered[max(low - 1, 0)], ordered[min(high, n - 1)]
+
+def converged(samples):
+    """Indica se as amostras já atingiram a largura relativa alvo do modo adaptativo."""
+    wall = [sample['wall'] for sample in samples]
+    if len(wall) < ADAPTIVE['min_runs']:
+        return False
+
+    center, low, high = confidence_interval(wall, ADAPTIVE['statistic'])
+    return center > 0 and (high - low) / center <= ADAPTIVE['target_ci']
+
+def summarize(samples):
+    """
+    Resume as amostras de uma medição.
+
+    Parameters:
+        samples (list[dict]): Amostras retornadas por run_once.
+
+    Returns:
+        dict: Amostras e estatísticas do tempo de parede, mais as médias de
+              tempo de usuário e de sistema.
+    """
+    wall   = [sample['wall'] for sample in samples]
+    median = statistics.median(wall)
+    ci_low, ci_high = bootstrap_ci(wall)
+
+    return {
+        'samples': samples,
+        'runs': len(wall),
+        'mean': statistics.fmean(wall),
+        'median': median,
+        'mad': statistics.median(abs(value - median) for value in wall),
+        'min': min(wall),
+        'max': max(wall),
+        'stddev': statistics.stdev(wall) if len(wall) > 1 else 0.0,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'user': statistics.fmean(sample['user'] for sample in samples),
+        'sys': statistics.fmean(sample['sys'] for sample in samples),
+    }
+
+def measure(cmd, runs, warmup=0, cwd=None, env=None, show_output=False, ignore_failure=False, sampler=run_once):
+    """
+    Mede o comando várias vezes, após execuções de aquecimento. No modo
+    adaptativo (enable_adaptive), o número de execuções medidas é decidido
+    pelo intervalo de confiança em vez de 'runs'.
+
+    Parameters:
+        cmd (str | list[str]): Comando a ser medido.
+        runs (int): Número de execuções medidas.
+        warmup (int): Número de execuções de aquecimento, descartadas.
+        cwd (str): Diretório de execução.
+        env (dict): Variáveis de ambiente do processo.
+        show_output (bool): Mostra a saída padrão do comando.
+        ignore_failure (bool): Aceita códigos de saída diferentes de zero.
+        sampler (callable): Função que executa e mede uma vez; recebe os
+                            mesmos argumentos de run_once.
+
+    Returns:
+        dict: Resultado de summarize.
+
+    Raises:
+        subprocess.CalledProcessError: Se o comando falhar e ignore_failure for False.
+        hygiene.NoisyMachineError: Se o modo de higiene recusar a máquina (ver common/hygiene.py).
+    """
+    samples = []
+
+    hygiene.check()
+
+    def sample_once():
+        sample = sampler(cmd, cwd=cwd, env=env, show_output=show_output)
+        if sample['returncode'] != 0:
+            current.set(returncode=sample['returncode'])
+            if not ignore_failure:
+                raise subprocess.CalledProcessError(sample['returncode'], cmd)
+        return sample
+
+    with spans.span('measure', os.path.basename(command(cmd, cwd)[0]), cmd) as current:
+        current.set(returncode=0, warmup=warmup)
+
+        for _ in range(warmup):
+            sample_once()
+
+        if ADAPTIVE is None:
+            samples = [sample_once() for _ in range(runs)]
+        else:
+            while len(samples) < ADAPTIVE['max_runs'] and not converged(samples):
+                samples.append(sample_once())
+
+        current.set(runs=len(samples))
+
+    return summarize(samples)
+
+def summary_columns(prefix):
+    """Nomes das colunas extras de uma medição no CSV (ex.: 'execution_time_median')."""
+    return [f'{prefix}_{field}' for field in SUMMARY_FIELDS]
+
+def summary_values(result):
+    """Valores das colunas extras de uma medição, na ordem de summary_columns."""
+    return [result[field] for field in SUMMARY_FIELDS]
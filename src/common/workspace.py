@@ -0,0 +1,223 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : workspace.py
+# Descrição       : Área de trabalho em memória (tmpfs, /dev/shm) para os
+#                   projetos copiados, arquivos intermediários e binários.
+#                   Verifica o espaço livre antes de cada cópia, usa o disco
+#                   quando a memória não comporta o projeto e remove tudo ao
+#                   sair, inclusive em SIGTERM/SIGINT; áreas deixadas por
+#                   processos que morreram são removidas na próxima execução.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, sys, errno, atexit, signal, shutil, tempfile, threading
+
+from common import spans
+
+# Sistema de arquivos em memória usado por padrão
+RAM_ROOT = os.environ.get('BENCHGEN_RAM_ROOT', '/dev/shm')
+
+# Espaço livre mínimo, em bytes, que deve sobrar no tmpfs depois de cada cópia
+RAM_RESERVE = int(os.environ.get('BENCHGEN_RAM_RESERVE', 512 * 1024 ** 2))
+
+# Estimativa do espaço ocupado por um projeto já compilado, em múltiplos do tamanho dos fontes
+BUILD_FACTOR = 10
+
+PREFIX = 'benchgen-ws-'
+
+def directory_size(path):
+    """Soma o tamanho dos arquivos de um diretório."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def free_bytes(path):
+    """Espaço livre, em bytes, no sistema de arquivos de 'path'."""
+    stat = os.statvfs(path)
+    return stat.f_bavail * stat.f_frsize
+
+def remove_stale(root):
+    """
+    Remove as áreas de trabalho de processos que já terminaram, como as
+    deixadas por uma execução interrompida com SIGKILL ou por falta de memória.
+
+    Parameters:
+        root (str): Diretório onde as áreas de trabalho são criadas.
+
+    Returns:
+        int: Número de áreas removidas.
+    """
+    removed = 0
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return 0
+
+    for name in names:
+        if not name.startswith(PREFIX):
+            continue
+        try:
+            pid = int(name[len(PREFIX):].split('-')[0])
+            os.kill(pid, 0)
+        except ValueError:
+            continue
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed += 1
+        except PermissionError:
+            continue
+    return removed
+
+class Workspace:
+    """Área de trabalho temporária, em memória quando possível e em disco caso contrário."""
+
+    def __init__(self, use_ram=True, ram_root=RAM_ROOT, disk_root=None, reserve=RAM_RESERVE):
+        """
+        Parameters:
+            use_ram (bool): Tenta usar o tmpfs; False usa apenas o disco.
+            ram_root (str): Sistema de arquivos em memória.
+            disk_root (str): Diretório em disco usado quando a memória não
+                             comporta o projeto (padrão: diretório temporário do sistema).
+            reserve (int): Espaço livre, em bytes, mantido no tmpfs.
+        """
+        self.owner     = os.getpid()
+        self.reserve   = reserve
+        self.disk_root = disk_root or tempfile.gettempdir()
+        self.ram_dir   = None
+        self.disk_dir  = None
+        self.spilled   = 0
+        self.claims    = {}
+        # Protege claims e a criação do diretório em disco; stage é chamado por várias threads
+        self.lock      = threading.RLock()
+
+        remove_stale(self.disk_root)
+
+        if use_ram and os.path.isdir(ram_root) and os.access(ram_root, os.W_OK):
+            remove_stale(ram_root)
+            self.ram_dir = tempfile.mkdtemp(prefix=f'{PREFIX}{self.owner}-', dir=ram_root)
+        elif use_ram:
+            print(f'{ram_root} is not available, using {self.disk_root} for the workspace')
+
+        atexit.register(self.cleanup)
+        for signum in (signal.SIGTERM, signal.SIGHUP):
+            if signal.getsignal(signum) in (signal.SIG_DFL, None):
+                signal.signal(signum, _exit_on_signal)
+
+    @property
+    def root(self):
+        """Diretório principal da área de trabalho."""
+        return self.ram_dir or self._disk()
+
+    def _disk(self):
+        with self.lock:
+            if self.disk_dir is None:
+                self.disk_dir = tempfile.mkdtemp(prefix=f'{PREFIX}{self.owner}-', dir=self.disk_root)
+            return self.disk_dir
+
+    def has_room(self, needed):
+        """
+        Indica se o tmpfs comporta 'needed' bytes mantendo a reserva livre,
+        descontando o espaço estimado que os diretórios já criados ainda vão ocupar.
+        """
+        if self.ram_dir is None:
+            return False
+        with self.lock:
+            self.claims = {path: claim for path, claim in self.claims.items() if os.path.isdir(path)}
+            pending = sum(max(claim - directory_size(path), 0) for path, claim in self.claims.items())
+            return free_bytes(self.ram_dir) - pending - needed >= self.reserve
+
+    def mkdtemp(self, prefix='work_', needed=0):
+        """
+        Cria um diretório temporário na memória, ou em disco se não houver espaço.
+
+        Parameters:
+            prefix (str): Prefixo do nome do diretório.
+            needed (int): Espaço estimado, em bytes, que o diretório vai ocupar.
+
+        Returns:
+            str: Caminho do diretório criado.
+        """
+        # A verificação e a reserva do espaço são feitas juntas, para que duas
+        # threads não contem com o mesmo espaço livre
+        with self.lock:
+            if self.has_room(needed):
+                path = tempfile.mkdtemp(prefix=prefix, dir=self.ram_dir)
+                self.claims[path] = needed
+                return path
+
+            if self.ram_dir is not None:
+                self.spilled += 1
+                print(f'Workspace in {os.path.dirname(self.ram_dir)} is full, using {self.disk_root}')
+        return tempfile.mkdtemp(prefix=prefix, dir=self._disk())
+
+    def stage(self, project_path, prefix=None):
+        """
+        Copia um projeto para a área de trabalho, onde ele é compilado e
+        executado. Se a memória encher durante a cópia, o projeto vai para o disco.
+
+        Parameters:
+            project_path (str): Diretório do projeto gerado.
+            prefix (str): Prefixo do diretório temporário (padrão: nome do projeto).
+
+        Returns:
+            str: Caminho da cópia do projeto, com o mesmo nome do original.
+        """
+        name   = os.path.basename(os.path.normpath(project_path))
+        needed = directory_size(project_path) * BUILD_FACTOR
+        parent = self.mkdtemp(prefix=f'{prefix or name}_', needed=needed)
+
+        with spans.span('generate', 'stage copy', f'cp -r {project_path}'):
+            try:
+                shutil.copytree(project_path, os.path.join(parent, name), symlinks=True)
+            except (OSError, shutil.Error) as error:
+                shutil.rmtree(parent, ignore_errors=True)
+                with self.lock:
+                    self.claims.pop(parent, None)
+                if self.ram_dir is None or not parent.startswith(self.ram_dir) or not _is_no_space(error):
+                    raise
+                with self.lock:
+                    self.spilled += 1
+                print(f'Workspace in {os.path.dirname(self.ram_dir)} filled up, copying {name} to {self.disk_root}')
+                parent = tempfile.mkdtemp(prefix=f'{prefix or name}_', dir=self._disk())
+                shutil.copytree(project_path, os.path.join(parent, name), symlinks=True)
+
+        return os.path.join(parent, name)
+
+    def release(self, path):
+        """Remove uma cópia criada por stage ou um diretório criado por mkdtemp."""
+        path = os.path.abspath(path)
+        for root in (self.ram_dir, self.disk_dir):
+            if root is not None and path.startswith(root + os.sep):
+                top = os.path.join(root, os.path.relpath(path, root).split(os.sep)[0])
+                with spans.span('cleanup', 'release', f'rm -r {top}'):
+                    shutil.rmtree(top, ignore_errors=True)
+                with self.lock:
+                    self.claims.pop(top, None)
+                return
+
+    def cleanup(self):
+        """Remove a área de trabalho inteira; só o processo que a criou o faz."""
+        if os.getpid() != self.owner:
+            return
+        for root in (self.ram_dir, self.disk_dir):
+            if root is not None:
+                shutil.rmtree(root, ignore_errors=True)
+        self.ram_dir = self.disk_dir = None
+
+def _is_no_space(error):
+    if isinstance(error, shutil.Error):
+        return any('No space left' in str(entry) for entry in error.args[0])
+    return error.errno == errno.ENOSPC
+
+def _exit_on_signal(signum, frame):
+    # sys.exit executa os handlers do atexit, que removem a área de trabalho
+    sys.exit(128 + signum)
+
+def add_workspace_arguments(parser):
+    """Acrescenta a opção '--ram-workspace' a um argparse.ArgumentParser."""
+    parser.add_argument('--ram-workspace', action='store_true',
+                        help='Compila e executa em cópias dos projetos em /dev/shm, usando o disco quando a memória enche')
@@ -6,7 +6,11 @@
 # Versão          : 1.0
 # ---------------------------------------------------------------------------------
 
-import os, sys, json, csv
+import os, sys, glob, shutil, tempfile, argparse, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import compile_cache, program_store, elf, timing, results, workspace, source_metrics, hygiene, time_trace, spans
 
 # Versões dos compiladores
 GCC_VERSION   = 14
@@ -23,146 +27,293 @@ programs = ['ex8', 'ex9']
 data_structures = ['array'] #', sortedlist'] Pode adicionar mais estruturas de dados na lista
 iterations = [8, 10]
 
-# Configurações de execução para o hyperfine
+# Configurações de execução das medições de tempo
 EXECUTION_WARMUP = 2
 NUMBER_OF_EXECUTIONS = 2
 
-csv_data = [['binary_size','compilation_time','execution_time','opt','compiler','program','data_structure','iterations']]
+# Cache de binários compartilhado entre os scripts de artefato
+binary_cache = compile_cache.CompileCache()
+
+CSV_HEADER = (['binary_size','compilation_time','execution_time','opt','compiler','program','data_structure','iterations','data_size','bss_size']
+              + timing.summary_columns('compilation_time') + timing.summary_columns('execution_time')
+              + source_metrics.COLUMNS + hygiene.ENV_COLUMNS)
+
+# Tamanho de cada função dos binários, em formato longo
+SYMBOL_HEADER = ['program','data_structure','iterations','compiler','opt','symbol','size']
+
+# Colunas que identificam uma célula, usadas para retomar uma execução interrompida
+KEY_COLUMNS = ['program','data_structure','iterations','compiler','opt']
+
+# Tempos do '-ftime-trace' por arquivo e por função (só com --time-trace e só para o Clang)
+TRACE_HEADER = KEY_COLUMNS + time_trace.COLUMNS
+
+# Granularidade do '-ftime-trace' em µs; None desativa a coleta
+TIME_TRACE = None
 
-def generate_csv():
-    """Gera o arquivo CSV com os dados coletados."""
-    print(csv_data)
-    with open(f'/tmp/compilers_comparison.csv', 'w', newline='', encoding='utf-8') as file_csv:
-        writer = csv.writer(file_csv)
-        writer.writerows(csv_data)
+# Arquivos de resultado, abertos por open_results
+csv_writer    = None
+symbol_writer = None
+trace_writer  = None
+
+def open_results(output_dir, resume=False):
+    """
+    Abre os CSVs de resultado, que são gravados linha a linha.
+
+    Parameters:
+        output_dir (str): Diretório dos CSVs.
+        resume (bool): Mantém as células já gravadas para que sejam puladas.
+    """
+    global csv_writer, symbol_writer, trace_writer
+
+    csv_writer    = results.ResultWriter(f'{output_dir}/compilers_comparison.csv', CSV_HEADER, KEY_COLUMNS, resume)
+    symbol_writer = results.ResultWriter(f'{output_dir}/compilers_comparison_symbols.csv', SYMBOL_HEADER, KEY_COLUMNS,
+                                         resume, only=csv_writer.done)
+    if TIME_TRACE is not None:
+        trace_writer = results.ResultWriter(f'{output_dir}/compilers_comparison_time_trace.csv', TRACE_HEADER,
+                                            KEY_COLUMNS, resume, only=csv_writer.done)
+
+def is_done(manifest, compiler, opt):
+    """Indica se a célula já está no CSV de uma execução anterior."""
+    return csv_writer.is_done(manifest['grammar'], manifest['data_structure'], manifest['iteration'], compiler, opt)
+
+def close_results():
+    """Fecha os CSVs de resultado."""
+    csv_writer.close()
+    symbol_writer.close()
+    if trace_writer is not None:
+        trace_writer.close()
         
 def generatePrograms(benchGen_path):
     """
-    Gera programas de benchmark a partir de regras e seeds utilizando o BenchGen.
+    Gera programas de benchmark a partir de regras e seeds utilizando o BenchGen,
+    com várias gerações simultâneas (ver program_store.generate_all).
+    Programas já presentes no repositório de projetos são reaproveitados.
 
     Parameters:
         benchGen_path (str): Caminho raiz do diretório BenchGen.
 
     Returns:
-        list[str]: Lista com os nomes dos diretórios dos programas gerados.
+        iterator[str]: Caminhos dos projetos, entregues à medida que ficam prontos.
     
     Raises:
         OSError: Em caso de erro de diretório ou execução.
     """
-    program_names = []
+    program_store.ensure_benchgen(benchGen_path)
 
-    try:
-        os.chdir(f'{benchGen_path}/src/gen/')
-        
-        try_find_exec_stats = os.system('find benchGen')
+    return program_store.generate_all(benchGen_path, [(grammar_id, iteration, data_structure)
+                                                      for grammar_id in programs
+                                                      for iteration in iterations
+                                                      for data_structure in data_structures])
 
-        if try_find_exec_stats != 0:
-            print('Compiling BenchGen...')
-            os.system('make 2>/dev/null')
-        
-        for grammar_id in programs:
-            production_rule = f'./examples/{grammar_id}/production_rule.txt'
-            seed_string     = f'./examples/{grammar_id}/seed_string.txt'
-
-            for iteration in iterations:
-                for data_structure in data_structures:
-                    program_name = f'{data_structure}_{iteration}_{grammar_id}'
-                    program_names.append(program_name)
-
-                    cmd = f'./benchGen {iteration} {production_rule} {seed_string} {program_name} {data_structure}'
-                    print(f'Generating program: {grammar_id} iteration: {iteration} data_structure: {data_structure}')
-                    os.system(f'{cmd} 2>/dev/null')
-
-                    os.system(f"echo '{grammar_id}' > ./{program_name}/src/grammar.txt")
-                    os.system(f"echo '{iteration}' > ./{program_name}/src/iteration.txt")
-                    os.system(f"echo '{data_structure}' > ./{program_name}/src/data_structure.txt")
-
-        return program_names
-
-    except OSError:
-        raise OSError("There's an error!")
-
-def read_time(file_path):
+def get_compilation_time(compiling_cmd):
     """
-    Lê o tempo médio de execução do arquivo JSON gerado pelo hyperfine.
+    Mede o tempo de compilação no diretório atual.
 
     Parameters:
-        file_path (str): Caminho do arquivo JSON.
+        compiling_cmd (str): Comando de compilação.
 
     Returns:
-        float: Tempo médio de execução.
+        dict: Amostras e estatísticas da medição (ver common/timing.py).
     """
-    with open(file=file_path, mode='r', encoding='utf-8') as file:
-        data = json.load(file)
-    return float(data['results'][0]['mean'])
+    return timing.measure(compiling_cmd, NUMBER_OF_EXECUTIONS, EXECUTION_WARMUP, show_output=True)
 
-def read_size(file):
+def get_binary_size(binary='./a.out'):
     """
-    Lê o tamanho (em bytes) de um binário a partir de um arquivo texto.
+    Obtém o tamanho das seções do binário compilado, lendo o ELF diretamente.
 
     Parameters:
-        file (str): Caminho do arquivo.
+        binary (str): Caminho do binário.
 
     Returns:
-        float: Tamanho lido do arquivo.
+        dict: Tamanhos 'text', 'data' e 'bss' em bytes.
     """
-    f = open(file=file, mode='r', encoding='utf-8')
-    return float(str(f.read()).strip())
+    return elf.section_sizes(binary)
 
-def get_compilation_time(compiling_cmd, grammar_id):
+def get_time_trace(compiler, opt):
     """
-    Executa a medição do tempo de compilação usando o hyperfine.
+    Compila os fontes do diretório atual mais uma vez com '-ftime-trace', fora da
+    medição do tempo de compilação, e agrega os traces (ver common/time_trace.py).
 
-    Parameters:
-        compiling_cmd (str): Comando de compilação.
-        grammar_id (str): Identificador do programa benchmark.
+    Returns:
+        dict | None: Tempos por arquivo e por função; None se a coleta estiver
+                     desativada ou o compilador não for o Clang.
+    """
+    if TIME_TRACE is None or not time_trace.is_clang(compiler):
+        return None
+    return time_trace.collect(f'{compiler} {opt} -c', sorted(glob.glob('src/*.c')), TIME_TRACE)
+
+def get_execution_time():
+    """
+    Mede o tempo de execução do binário './a.out'.
 
     Returns:
-        float: Tempo médio de compilação.
+        dict: Amostras e estatísticas da medição (ver common/timing.py).
     """
-    os.system(f"hyperfine --show-output -w {EXECUTION_WARMUP} -r {NUMBER_OF_EXECUTIONS} '{compiling_cmd}' --export-json /tmp/result_{NUMBER_OF_EXECUTIONS}_{grammar_id}.json")
-    return read_time(f"/tmp/result_{NUMBER_OF_EXECUTIONS}_{grammar_id}.json")
+    return timing.measure('./a.out', NUMBER_OF_EXECUTIONS, EXECUTION_WARMUP, show_output=True)
 
-def get_binary_size(grammar_id):
+def append_row(manifest, compiler, opt, comp_time, binary_size, exec_time, functions, traces=None):
     """
-    Obtém o tamanho do binário compilado.
+    Grava nos CSVs os resultados de uma célula (programa, compilador, otimização).
+    Os tamanhos das funções são gravados antes, para que a linha principal
+    marque a célula como concluída só depois de tudo estar em disco.
 
     Parameters:
-        grammar_id (str): Identificador do programa benchmark.
+        manifest (dict): Manifesto do programa gerado.
+        compiler (str): Compilador utilizado.
+        opt (str): Otimização utilizada.
+        comp_time (dict): Medição do tempo de compilação.
+        binary_size (dict): Tamanhos das seções do binário.
+        exec_time (dict): Medição do tempo de execução.
+        functions (dict): Tamanho de cada função do binário.
+        traces (dict): Tempos do '-ftime-trace' (ver get_time_trace), se coletados.
+    """
+    key_values = [manifest['grammar'], manifest['data_structure'], manifest['iteration'], compiler, opt]
+    symbol_writer.write_rows([key_values + [symbol, size] for symbol, size in sorted(functions.items())])
+    if traces is not None:
+        trace_writer.write_rows(time_trace.rows(key_values, traces))
+
+    csv_writer.write([binary_size['text'], comp_time['mean'], exec_time['mean'], opt, compiler,
+                      manifest['grammar'], manifest['data_structure'], manifest['iteration'],
+                      binary_size['data'], binary_size['bss']]
+                     + timing.summary_values(comp_time) + timing.summary_values(exec_time)
+                     + source_metrics.values(manifest) + hygiene.env_values(manifest, compiler))
+
+def cache_binary(compiler, opt, binary='./a.out'):
+    """
+    Guarda no cache o binário recém-compilado no diretório atual.
 
-    Returns:
-        float: Tamanho do binário em bytes.
+    Parameters:
+        compiler (str): Compilador utilizado.
+        opt (str): Otimização utilizada.
+        binary (str): Caminho do binário gerado.
     """
-    os.system("size ./a.out | awk 'NR==2 {print $1}' > /tmp/size_"+str(NUMBER_OF_EXECUTIONS)+"_"+grammar_id+".txt")
-    return read_size(f'/tmp/size_{NUMBER_OF_EXECUTIONS}_{grammar_id}.txt')
+    if compile_cache.ENABLED and os.path.isfile(binary):
+        sources = glob.glob('src/*.c') + glob.glob('src/*.h')
+        binary_cache.store(compile_cache.cache_key(sources, compiler, opt), binary, {'compiler': compiler, 'flags': opt})
 
-def get_execution_time(grammar_id):
+def compile_job(job):
     """
-    Mede o tempo de execução do binário usando o hyperfine.
+    Mede o tempo de compilação e o tamanho do binário de uma célula (programa,
+    compilador, otimização) em um diretório de trabalho próprio, para que
+    várias células possam ser compiladas ao mesmo tempo. Cada processo do pool
+    fica fixo em uma CPU (ver hygiene.pin_worker), assim como as compilações
+    que ele mede.
 
     Parameters:
-        grammar_id (str): Identificador do programa benchmark.
+        job (tuple): (diretório do programa, compilador, otimização,
+                     diretório de trabalho vazio, já criado).
 
     Returns:
-        float: Tempo médio de execução.
+        tuple: (tempo de compilação, tamanhos das seções, tamanho de cada
+               função, tempos do '-ftime-trace', diretório de trabalho).
+    """
+    program_dir, compiler, opt, scratch_dir = job
+    compiling_cmd = f'{compiler} {opt} src/*.c src/*.h'
+
+    with spans.span('generate', 'stage copy', f'cp -r {program_dir}/src'):
+        shutil.copytree(f'{program_dir}/src', f'{scratch_dir}/src')
+    os.chdir(scratch_dir)
+
+    comp_time   = get_compilation_time(compiling_cmd)
+    cache_binary(compiler, opt)
+    binary_size = get_binary_size()
+    functions   = elf.function_sizes('./a.out')
+    traces      = get_time_trace(compiler, opt)
+
+    return comp_time, binary_size, functions, traces, scratch_dir
+
+def parse_args(argv):
     """
-    os.system(f'hyperfine --show-output -w {EXECUTION_WARMUP} -r {NUMBER_OF_EXECUTIONS} "./a.out" --export-json /tmp/result_{NUMBER_OF_EXECUTIONS}_{grammar_id}.json')
-    return read_time(f"/tmp/result_{NUMBER_OF_EXECUTIONS}_{grammar_id}.json")
+    Lê as opções de linha de comando do script.
 
-def get_info(file):
-    """Lê informações básicas de arquivos auxiliares."""
-    with open(file=file, mode='r', encoding='utf-8') as f:
-        return f.read().strip()
+    Parameters:
+        argv (list[str]): Argumentos recebidos, sem o nome do script.
 
-def usage():
+    Returns:
+        argparse.Namespace: Opções interpretadas.
     """
-    Exibe instruções de uso do script na linha de comando.
+    parser = argparse.ArgumentParser(
+        prog='compilers_comparison.py',
+        description="BenchGen 'Comparação de Compiladores' artifact")
+    parser.add_argument('benchGen_root_path', help='Caminho raiz do BenchGen')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Número de compilações simultâneas (padrão: 1, modo sequencial)')
+    parser.add_argument('--scratch-dir', default=tempfile.gettempdir(),
+                        help='Diretório onde cada compilação paralela cria sua pasta de trabalho')
+    workspace.add_workspace_arguments(parser)
+    timing.add_adaptive_arguments(parser)
+    hygiene.add_hygiene_arguments(parser)
+    time_trace.add_time_trace_arguments(parser)
+    results.add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+def run_parallel(benchGen_root_path, programs_path, jobs, scratch_root, area=None):
     """
-    print("BenchGen 'Comparação de Compiladores' artifact")
-    print("Usage: python compilers_comparison.py <OPTIONS>")
-    print("OPTIONS: (-h | --help) | ('BenchGen root path')")
+    Executa a compilação, com a medição do seu tempo, e a medição de tamanho
+    em um pool de processos, cada um fixo em uma CPU própria (as de
+    --pin-cpus, se informadas). O tempo de execução é medido depois, de forma
+    sequencial e com o pool já encerrado, para não sofrer interferência das
+    compilações.
 
-def main(benchGen_root_path, execution_warmup, number_of_executions):
+    Parameters:
+        benchGen_root_path (str): Caminho raiz do BenchGen.
+        programs_path (iterable[str]): Projetos gerados pelo BenchGen; as
+                                       compilações de cada um começam assim que ele fica pronto.
+        jobs (int): Número de processos de compilação; limitado ao número de CPUs disponíveis.
+        scratch_root (str): Diretório raiz das pastas de trabalho.
+        area (workspace.Workspace): Área de trabalho em memória; None usa scratch_root.
+    """
+    cells = []
+
+    # Uma CPU por processo, para que as compilações medidas não disputem o mesmo núcleo
+    cpus = hygiene.worker_cpus(jobs)
+    if len(cpus) < jobs:
+        print(f'Only {len(cpus)} CPUs available, compiling with {len(cpus)} jobs')
+        jobs = len(cpus)
+    queue = multiprocessing.Queue()
+    for cpu in cpus:
+        queue.put(cpu)
+
+    # Os intervalos de cada compilação ficam nos processos do pool; aqui fica o tempo de espera por eles
+    with ProcessPoolExecutor(max_workers=jobs, initializer=hygiene.pin_worker, initargs=(queue, jobs)) as executor, spans.span('compile', f'compile pool (-j {jobs})'):
+        # O pool cria os processos (fork) no primeiro submit; isso deve acontecer antes das
+        # threads de geração começarem, para que nenhum filho herde uma trava presa por elas
+        # (e todos precisam existir: cada um pega a sua CPU ao iniciar)
+        for future in [executor.submit(os.getpid) for _ in range(jobs)]:
+            future.result()
+
+        for program_path in programs_path:
+            manifest = program_store.load_manifest(program_path)
+
+            for compiler in compilers:
+                for opt in opts if compiler == f"gcc-{GCC_VERSION}" else opts + ["-Oz"]:
+                    if is_done(manifest, compiler, opt):
+                        continue
+                    prefix = f"{manifest['grammar']}_"
+                    if area is None:
+                        scratch_dir = tempfile.mkdtemp(prefix=prefix, dir=scratch_root)
+                    else:
+                        scratch_dir = area.mkdtemp(prefix, workspace.directory_size(program_path) * workspace.BUILD_FACTOR)
+                    job = (program_path, compiler, opt, scratch_dir)
+                    cells.append((manifest, compiler, opt, executor.submit(compile_job, job)))
+
+        compiled = [future.result() for _, _, _, future in cells]
+
+    for (manifest, compiler, opt, _), (comp_time, binary_size, functions, traces, scratch_dir) in zip(cells, compiled):
+        os.chdir(scratch_dir)
+        exec_time = get_execution_time()
+
+        append_row(manifest, compiler, opt, comp_time, binary_size, exec_time, functions, traces)
+
+        os.chdir(benchGen_root_path)
+        if area:
+            area.release(scratch_dir)
+        else:
+            with spans.span('cleanup', 'release', f'rm -r {scratch_dir}'):
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+def main(benchGen_root_path, execution_warmup, number_of_executions, jobs=1, scratch_root=tempfile.gettempdir(),
+         output_dir=results.DEFAULT_OUTPUT_DIR, resume=False, ram_workspace=False):
     """
     Executa o pipeline de benchmarks com diferentes compiladores e otimizações.
 
@@ -170,46 +321,68 @@ def main(benchGen_root_path, execution_warmup, number_of_executions):
         benchGen_root_path (str): Caminho raiz do BenchGen.
         execution_warmup (int): Número de execuções de aquecimento.
         number_of_executions (int): Número de repetições para medição.
+        jobs (int): Número de compilações simultâneas; 1 mantém o modo sequencial.
+        scratch_root (str): Diretório raiz das pastas de trabalho do modo paralelo.
+        output_dir (str): Diretório dos CSVs de resultado.
+        resume (bool): Pula as células já gravadas em uma execução anterior.
+        ram_workspace (bool): Compila e executa em cópias dos projetos em memória.
     """
     dalloc_path = f'{benchGen_root_path}/src/Dalloc/src'
     
     programs_path = generatePrograms(benchGen_root_path)
 
-    for program_path in programs_path:
+    open_results(output_dir, resume)
+
+    area = workspace.Workspace(disk_root=scratch_root) if ram_workspace else None
+
+    if jobs > 1:
+        run_parallel(benchGen_root_path, programs_path, jobs, scratch_root, area)
+        close_results()
+        return
+
+    # No modo sequencial os tempos são medidos logo após cada compilação, então
+    # todas as gerações terminam antes, para não disputar a CPU com as medições
+    for program_path in list(programs_path):
     
-        os.chdir(f"{benchGen_root_path}/src/gen/{program_path}")
-        grammar_name = program_path.split("_")[-1].strip()
+        manifest = program_store.load_manifest(program_path)
+        work_path = area.stage(program_path) if area else program_path
+        os.chdir(work_path)
 
         for compiler in compilers:
             for opt in opts if compiler == f"gcc-{GCC_VERSION}" else opts + ["-Oz"]:
+                if is_done(manifest, compiler, opt):
+                    print(f"Skipping {manifest['name']} {compiler} {opt}: already in the results")
+                    continue
+
                 compiling_cmd = f'{compiler} {opt} src/*.c src/*.h'
 
-                comp_time   = get_compilation_time(compiling_cmd, grammar_name)
-                binary_size = get_binary_size(grammar_name)
-                exec_time   = get_execution_time(grammar_name)
+                comp_time   = get_compilation_time(compiling_cmd)
+                cache_binary(compiler, opt)
+                binary_size = get_binary_size()
+                exec_time   = get_execution_time()
+                traces      = get_time_trace(compiler, opt)
 
+                append_row(manifest, compiler, opt, comp_time, binary_size, exec_time, elf.function_sizes('./a.out'),
+                           traces)
 
-                iteration      = int(program_path.split('_')[1])
-                grammar        = program_path.split('_')[2]
-                data_structure = program_path.split('_')[0]
-                
-                csv_data.append([binary_size, comp_time, exec_time, opt, compiler, grammar, data_structure, iteration])
+        if area:
+            os.chdir(benchGen_root_path)
+            area.release(work_path)
 
-    generate_csv()
+    close_results()
     
 if __name__ == '__main__':
     if os.name == 'win32':
         raise Exception('This script is not compatible with Windows system!')
 
-    args = sys.argv
-
-    try:
-        option = args[1]
+    args = parse_args(sys.argv[1:])
+    benchGen_root_path = os.path.abspath(args.benchGen_root_path).rstrip('/')
 
-        if option == '-h' or option == '--help':
-            usage()
-        benchGen_root_path = option[:-1] if option.split()[-1:] == '/' else option
-    except ValueError:
-        raise ValueError(f'Argument is not a integer valid!')
+    timing.enable_from_args(args)
+    hygiene.enable_from_args(args)
+    spans.enable(args.output_dir, 'compilers_comparison')
+    if args.time_trace:
+        TIME_TRACE = args.time_trace_granularity
 
-    main(benchGen_root_path, EXECUTION_WARMUP, NUMBER_OF_EXECUTIONS)
+    main(benchGen_root_path, EXECUTION_WARMUP, NUMBER_OF_EXECUTIONS, args.jobs, args.scratch_dir,
+         os.path.abspath(args.output_dir), args.resume, args.ram_workspace)
@@ -1,5 +1,7 @@
-import sys, os, json, csv
-from scipy import stats
+import sys, os, glob, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import compile_cache, program_store, elf, timing, results, workspace, source_metrics, hygiene, spans
 
 GCC_VERSION = 14
 
@@ -30,127 +32,165 @@ opts = ['-O0',
 BEGIN_ITERATION_RANGE = 8
 FINAL_ITERATION_RANGE = 8
 
-csv_data = [['gcc_compilation_time','gcc_program_time','bin_size','opt', 'iteration', 'grammar_name', 'data_structure']]
-
-grammar_iterations = range(BEGIN_ITERATION_RANGE, FINAL_ITERATION_RANGE+1)
-
-def generate_csv():
-    print(csv_data)
-    with open(f'/tmp/data_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.csv', 'w', newline='', encoding='utf-8') as file_csv:
-        writer = csv.writer(file_csv)
-        writer.writerows(csv_data)
-
-def generatePrograms(benchGen_path):
-    
-    program_names = []
-
-    try:
-        os.chdir(f'{benchGen_path}/src/gen/')
+binary_cache = compile_cache.CompileCache()
 
-        try_find_exec_stats = os.system('find benchGen')
+CSV_HEADER = (['gcc_compilation_time','gcc_program_time','bin_size','opt', 'iteration', 'grammar_name', 'data_structure', 'data_size', 'bss_size']
+              + timing.summary_columns('gcc_compilation_time') + timing.summary_columns('gcc_program_time')
+              + source_metrics.COLUMNS + hygiene.ENV_COLUMNS)
 
-        if try_find_exec_stats != 0:
+SYMBOL_HEADER = ['opt', 'iteration', 'grammar_name', 'data_structure', 'symbol', 'size']
 
-            print('Compiling BenchGen...')
-            os.system('make 2>/dev/null')
-        
-        for grammar_id in grammar_ids:
+KEY_COLUMNS = ['opt', 'iteration', 'grammar_name', 'data_structure']
 
-            production_rule = f'./examples/{grammar_id}/production_rule.txt'
-            seed_string     = f'./examples/{grammar_id}/seed_string.txt'
+# Amostras de cada execução, em formato longo, usadas pelo detector de regressões (common/regression.py)
+RUNS_HEADER = KEY_COLUMNS + ['gcc_version', 'metric', 'run', 'value']
 
-            for iteration in grammar_iterations:
-                for data_structure in data_structures:
+csv_writer    = None
+symbol_writer = None
+runs_writer   = None
 
-                    program_name = f'{data_structure}_{iteration}_{grammar_id}'
-                    program_names.append(program_name)
+grammar_iterations = range(BEGIN_ITERATION_RANGE, FINAL_ITERATION_RANGE+1)
 
-                    cmd = f'./benchGen {iteration} {production_rule} {seed_string} {program_name} {data_structure}'
-                    print(f'Generating program: {grammar_id} iteration: {iteration} data_structure: {data_structure}')
-                    os.system(f'{cmd} 2>/dev/null')
+def open_results(output_dir, resume=False):
+    global csv_writer, symbol_writer, runs_writer
 
-                    os.system(f"echo '{grammar_id}' > ./{program_name}/src/grammar.txt")
-                    os.system(f"echo '{iteration}' > ./{program_name}/src/iteration.txt")
-                    os.system(f"echo '{data_structure}' > ./{program_name}/src/data_structure.txt")
+    csv_writer    = results.ResultWriter(f'{output_dir}/data_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.csv', CSV_HEADER, KEY_COLUMNS, resume)
+    symbol_writer = results.ResultWriter(f'{output_dir}/data_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}_symbols.csv', SYMBOL_HEADER, KEY_COLUMNS,
+                                         resume, only=csv_writer.done)
+    runs_writer   = results.ResultWriter(f'{output_dir}/data_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}_runs.csv', RUNS_HEADER, KEY_COLUMNS,
+                                         resume, only=csv_writer.done)
 
-        return program_names
+def close_results():
+    csv_writer.close()
+    symbol_writer.close()
+    runs_writer.close()
 
-    except OSError:
-        raise OSError("There's an error!")
+def sample_rows(key_values, version, compilation_time, run_time):
+    """Linhas de RUNS_HEADER com cada amostra dos tempos de compilação e de execução."""
+    return [key_values + [version, metric, run, sample['wall']]
+            for metric, measurement in (('gcc_compilation_time', compilation_time), ('gcc_program_time', run_time))
+            for run, sample in enumerate(measurement['samples'])]
 
-def read_compilation_time(file):
+def generatePrograms(benchGen_path):
 
-    with open(file=file, mode='r', encoding='utf-8') as file:
-        data = json.load(file)
-    return float(data['results'][0]['mean'])
+    program_store.ensure_benchgen(benchGen_path)
 
-def read_time(file):
-    f = open(file=file, mode='r', encoding='utf-8')
-    return float(str(f.read()).strip())
+    # Gerações simultâneas; todas terminam antes das medições, que começam logo na primeira compilação
+    return list(program_store.generate_all(benchGen_path, [(grammar_id, iteration, data_structure)
+                                                           for grammar_id in grammar_ids
+                                                           for iteration in grammar_iterations
+                                                           for data_structure in data_structures]))
 
 def get_compilation_time(benchGen_root_path, opt):
     dalloc_path = f'{benchGen_root_path}/src/Dalloc/src/'
-    os.system(f'hyperfine --warmup {WARMUP} --runs {RUN} --show-output --ignore-failure "{CC} {opt} *.c *.h -I{dalloc_path} -o main" --export-json /tmp/compilation_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.json')
-    return read_compilation_time(f"/tmp/compilation_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.json")
+    compilation_time = timing.measure(f'{CC} {opt} *.c *.h -I{dalloc_path} -o main', RUN, WARMUP,
+                                      show_output=True, ignore_failure=True)
+
+    if compile_cache.ENABLED and os.path.isfile('main'):
+        flags = f'{opt} -I{dalloc_path}'
+        key   = compile_cache.cache_key(glob.glob('*.c') + glob.glob('*.h') + compile_cache.include_headers(dalloc_path),
+                                        CC, flags)
+        binary_cache.store(key, 'main', {'compiler': CC, 'flags': flags})
+
+    return compilation_time
 
 def get_run_time(opt):
-    dalloc_path = f'{benchGen_root_path}/src/Dalloc/src/'
-    os.system(f'hyperfine --warmup {WARMUP} --runs {RUN} --show-output --ignore-failure "./main" --export-json /tmp/runtime_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.json')
-    return read_compilation_time(f'/tmp/runtime_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.json')
+    return timing.measure('./main', RUN, WARMUP, show_output=True, ignore_failure=True)
 
 def get_binary_size(opt):
-    os.system("size ./main | awk 'NR==2 {print $1}' > /tmp/size_"+str(GCC_VERSION)+"_"+str(RUN)+"_"+GRAMMAR_ID+".txt")
-    return read_time(f'/tmp/size_{GCC_VERSION}_{RUN}_{GRAMMAR_ID}.txt')
-
-def get_info(file):
-    print(file)
-    f = open(file=file, mode='r', encoding='utf-8')
-    return str(f.read()).strip()
+    # Uma compilação com falha não deixa binário; as colunas de tamanho ficam vazias
+    if not os.path.isfile('./main'):
+        return {'text': '', 'data': '', 'bss': ''}
+    return elf.section_sizes('./main')
 
-def clear(benchGen_root_path, program_names):
+def clear(benchGen_root_path, program_paths):
 
     os.chdir(f'{benchGen_root_path}/src/gen')
 
-    for program_name in program_names:
-        os.system(f'rm -r {program_name}')
-        
+    for program_path in program_paths:
+        spans.system('cleanup', 'generated project', f'rm -r {program_path}')
+
+def parse_args(argv):
+    """
+    Lê as opções de linha de comando do script.
+
+    Parameters:
+        argv (list[str]): Argumentos recebidos, sem o nome do script.
+
+    Returns:
+        argparse.Namespace: Opções interpretadas.
+    """
+    parser = argparse.ArgumentParser(
+        prog='gcc_versions.py',
+        description="BenchGen 'Versões do GCC' artifact")
+    parser.add_argument('benchGen_root_path', help='Caminho raiz do BenchGen')
+    parser.add_argument('gcc_version', help='Versão do GCC, instalada em /usr/local/gcc<versão>/bin/gcc')
+    parser.add_argument('--clean', action='store_true', help='Remove os programas gerados ao final')
+    workspace.add_workspace_arguments(parser)
+    timing.add_adaptive_arguments(parser)
+    hygiene.add_hygiene_arguments(parser)
+    results.add_output_arguments(parser)
+    return parser.parse_args(argv)
+
 if __name__ == '__main__':
     
     if os.name == 'win32':
         raise Exception('This script is not compatible with Windows system!')
 
-    args = sys.argv
+    args = parse_args(sys.argv[1:])
+    timing.enable_from_args(args)
+    hygiene.enable_from_args(args)
+
+    GCC_VERSION = args.gcc_version
+    CC   = f'/usr/local/gcc{GCC_VERSION}/bin/gcc'
+    
+    print(f'RUNNING PROGRAM {GRAMMAR_ID} RUN {RUN}')
+    benchGen_root_path = os.path.abspath(args.benchGen_root_path)
+    spans.enable(os.path.abspath(args.output_dir), f'gcc_versions_{GCC_VERSION}')
 
-    if len(args) > 2:
+    print('Generating programs...')
+    program_paths = generatePrograms(benchGen_root_path)
 
-        GCC_VERSION = args[2]
-        CC   = f'/usr/local/gcc{GCC_VERSION}/bin/gcc'
-        
-        print(f'RUNNING PROGRAM {GRAMMAR_ID} RUN {RUN}')
-        benchGen_root_path = args[1]
-
-        print('Generating programs...')
-        program_names = generatePrograms(benchGen_root_path)
-
-        print('Compiling programs')
-        for program_name in program_names:
-            
-            for opt in opts:
-                program_src_path = f'{benchGen_root_path}/src/gen/{program_name}/src/'
-
-                os.chdir(program_src_path)
-                                
-                clang_time = get_compilation_time(benchGen_root_path, opt)
-                run_time   = get_run_time(opt)
-                bin_size   = get_binary_size(opt)
-                   
-                iteration      = get_info(f'{program_src_path}iteration.txt')
-                grammar        = get_info(f'{program_src_path}grammar.txt')
-                data_structure = get_info(f'{program_src_path}data_structure.txt')
-
-                csv_data.append([clang_time, run_time,bin_size, opt, iteration, grammar, data_structure])
+    open_results(os.path.abspath(args.output_dir), args.resume)
+
+    area = workspace.Workspace() if args.ram_workspace else None
+
+    print('Compiling programs')
+    for program_path in program_paths:
         
-        generate_csv()
-        clear(benchGen_root_path, program_names)
-    else:
-        raise Exception("Argument 'BenchGen path' is missing")
+        manifest  = program_store.load_manifest(program_path)
+        work_path = area.stage(program_path) if area else program_path
+
+        for opt in opts:
+            if csv_writer.is_done(opt, manifest['iteration'], manifest['grammar'], manifest['data_structure']):
+                print(f"Skipping {manifest['name']} {opt}: already in the results")
+                continue
+
+            program_src_path = f'{work_path}/src/'
+
+            os.chdir(program_src_path)
+                            
+            clang_time = get_compilation_time(benchGen_root_path, opt)
+            run_time   = get_run_time(opt)
+            bin_size   = get_binary_size(opt)
+               
+            iteration      = manifest['iteration']
+            grammar        = manifest['grammar']
+            data_structure = manifest['data_structure']
+
+            if os.path.isfile('./main'):
+                symbol_writer.write_rows(elf.symbol_rows('./main', [opt, iteration, grammar, data_structure]))
+            runs_writer.write_rows(sample_rows([opt, iteration, grammar, data_structure], GCC_VERSION, clang_time, run_time))
+            csv_writer.write([clang_time['mean'], run_time['mean'], bin_size['text'], opt, iteration, grammar, data_structure,
+                              bin_size['data'], bin_size['bss']]
+                             + timing.summary_values(clang_time) + timing.summary_values(run_time)
+                             + source_metrics.values(manifest) + hygiene.env_values(manifest, CC))
+
+        if area:
+            os.chdir(benchGen_root_path)
+            area.release(work_path)
+    
+    close_results()
+
+    if args.clean:
+        clear(benchGen_root_path, program_paths)
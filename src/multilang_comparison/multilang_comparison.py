@@ -1,16 +1,52 @@
-import sys, os, csv, re, subprocess
-
-BENCHGEN_PATH = sys.argv[1]
-
-LANGS = ["ada", "nim", "go", "c", "cpp", "julia", "go", "v", "odin"]
+import sys, os, shutil, argparse, subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import program_store, results, workspace, source_metrics, hygiene, perf, spans
+
+def parse_args(argv):
+    """
+    Parses the command line options of the script.
+
+    Parameters:
+        argv (list[str]): Arguments, without the script name.
+
+    Returns:
+        argparse.Namespace: Parsed options.
+    """
+    parser = argparse.ArgumentParser(
+        prog='multilang_comparison.py',
+        description='Builds the same BenchGen program in several languages and measures it with perf')
+    parser.add_argument('benchGen_root_path', help='BenchGen root path')
+    parser.add_argument('--jobs', type=int, default=JOBS,
+                        help='Number of simultaneous builds (default: all CPUs)')
+    parser.add_argument('--perf-repeat', type=int, default=1,
+                        help='Repetitions of each perf event group (default: 1)')
+    workspace.add_workspace_arguments(parser)
+    hygiene.add_hygiene_arguments(parser)
+    results.add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+# Number of simultaneous builds (--jobs)
+JOBS = os.cpu_count() or 1
+
+# Repetitions of each perf event group (--perf-repeat)
+PERF_REPEAT = 1
+
+# BenchGen root path, set from the command line
+BENCHGEN_PATH = None
+
+LANGS = ["ada", "nim", "go", "c", "cpp", "julia", "go-run", "v", "odin"]
 depths = [11]
 programs = ["ex8"]
 
+# Variant -> [build or run command, is compiled, source extension]; 'go-run' is Go run without a
+# separate build step (it used to share the 'go' key, so one of the two entries was lost)
 compilers = {
     'c'     : [f'gcc -O3 -Wno-unused-result *.c *.h'      , True, ''],
     'cpp'   : [f'g++ -O3 -Wno-unused-result *.cpp *.hpp'  , True, ''],
     'julia' : [f'julia'            , False, 'jl'],
-    'go'    : [f'go run'           , False, 'go'],
+    'go-run': [f'go run'           , False, 'go'],
     'go'    : [f'go build -ldflags="-s -w" -o a.out *.go', True , ''],
     'v'     : [f'v -enable-globals ./main/main.v -o a.out', True, ''],
     'odin'  : [f'odin build . -out:a.out -o:speed -no-bounds-check -disable-assert -microarch:native', True, ''],
@@ -20,139 +56,192 @@ compilers = {
     'cangjie': ['cjc *.cj -Woff unused -o a.out', True, '']
 }
 
-benchmark_names = []
-
-csv_data = [['program', 'depth', 'lang', 'cpu_cycle', 'cpu_instructions',
-             'cpu_branches', 'cpu_branch_misses', 'cpu_cache_references', 'cpu_cache_misses',
-             'cpu_stalled_cycles_frontend', 'cpu_stalled_cycles_backend',
-             'cpu_L1_dcache_loads', 'cpu_L1_dcache_load_misses',
-             'cpu_LLC_loads', 'cpu_LLC_load_misses',
-             'cpu_dTLB_loads', 'cpu_dTLB_load_misses', 'execution_time']]
-
-
-def generate_csv():
-    with open(f'/tmp/multilang.csv', 'w', newline='', encoding='utf-8') as file_csv:
-        writer = csv.writer(file_csv)
-        writer.writerows(csv_data)
-
+# BenchGen language of the variants whose name is not the language itself
+GENERATOR_LANG = {'go-run': 'go'}
+
+# Executables each variant needs; the first one identifies the toolchain in the results
+TOOLCHAINS = {
+    'c'      : ['gcc'],
+    'cpp'    : ['g++'],
+    'julia'  : ['julia'],
+    'go-run' : ['go'],
+    'go'     : ['go'],
+    'v'      : ['v'],
+    'odin'   : ['odin'],
+    'd'      : ['dmd'],
+    'nim'    : ['nim', 'make'],
+    'ada'    : ['gnatmake', 'make'],
+    'cangjie': ['cjc'],
+}
 
-def compile_program(compiling_cmd):
-    os.system(f'{compiling_cmd}')
+CPU_COLUMNS = ['cpu_cycle', 'cpu_instructions',
+               'cpu_branches', 'cpu_branch_misses', 'cpu_cache_references', 'cpu_cache_misses',
+               'cpu_stalled_cycles_frontend', 'cpu_stalled_cycles_backend',
+               'cpu_L1_dcache_loads', 'cpu_L1_dcache_load_misses',
+               'cpu_LLC_loads', 'cpu_LLC_load_misses',
+               'cpu_dTLB_loads', 'cpu_dTLB_load_misses']
+
+# Each event group is measured in its own runs: perf_groups is the number of groups, perf_min_running the
+# lowest percentage of time any counter was active (100 means nothing was multiplexed), and the *_stddev
+# columns the spread across the --perf-repeat repetitions
+CSV_HEADER = (['program', 'depth', 'lang'] + CPU_COLUMNS + ['execution_time']
+              + [f'{column}_stddev' for column in CPU_COLUMNS] + ['perf_groups', 'perf_min_running']
+              + perf.DERIVED_COLUMNS
+              + source_metrics.COLUMNS + hygiene.ENV_COLUMNS)
+
+# perf events, in the order of CPU_COLUMNS
+PERF_EVENTS = ['cycles', 'instructions', 'branches', 'branch-misses', 'cache-references', 'cache-misses',
+               'stalled-cycles-frontend', 'stalled-cycles-backend', 'L1-dcache-loads', 'L1-dcache-load-misses',
+               'LLC-loads', 'LLC-load-misses', 'dTLB-loads', 'dTLB-load-misses']
+
+# Columns that identify a cell, used to resume an interrupted run
+KEY_COLUMNS = ['program', 'depth', 'lang']
+
+# Variants that could not be built or run in this run, and why
+SKIPPED_HEADER = KEY_COLUMNS + ['reason']
+
+
+def discover_toolchains(variants):
+    """Split the variants into those whose toolchain is installed and those missing some executable."""
+    available, missing = [], {}
+    for variant in dict.fromkeys(variants):
+        absent = [tool for tool in TOOLCHAINS[variant] if shutil.which(tool) is None]
+        if absent:
+            missing[variant] = absent
+        else:
+            available.append(variant)
+
+    print('Toolchains: ' + ', '.join(f'{variant} ' + ('ok' if variant in available else f'missing {"/".join(missing[variant])}')
+                                      for variant in dict.fromkeys(variants)))
+    return available, missing
+
+def build_variant(area, variant, project_path):
+    """
+    Copy the project to its own directory and build it there, so that variants
+    sharing a project (go and go-run) and the builds running at the same time
+    do not touch each other's files.
+
+    Returns:
+        tuple: (work path, error message or None).
+    """
+    work_path = area.stage(project_path, prefix=variant)
+    if not compilers[variant][1]:
+        return work_path, None
+
+    print(f'Building {os.path.basename(project_path)} ({variant})')
+    result = spans.run('compile', variant, compilers[variant][0], shell=True, cwd=f'{work_path}/src',
+                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if result.returncode != 0 or not os.path.isfile(f'{work_path}/src/a.out'):
+        last_line = (result.stdout.strip().splitlines() or [''])[-1]
+        return work_path, f'build failed (exit {result.returncode}): {last_line}'
+    return work_path, None
+
+def run_command(variant, benchmark_name, src_path):
+    if compilers[variant][1]:
+        return ["./a.out"]
+    if variant == "julia":
+        return compilers[variant][0].split(" ") + [f"{benchmark_name}.{compilers[variant][2]}"]
+    extension = compilers[variant][2]
+    return compilers[variant][0].split(" ") + sorted(name for name in os.listdir(src_path) if name.endswith(f'.{extension}'))
+
+def run_perf(exec_file, cmd):
+    print(f'Running {exec_file} command {cmd}')
+    measurement = perf.stat(cmd, PERF_EVENTS, repeat=PERF_REPEAT, show_output=True)
+
+    for event, count in measurement['events'].items():
+        if count['status'] != 'counted':
+            print(f'{event}: <{count["status"]}>')
+        else:
+            spread = f' (+- {count["stddev"]:.0f})' if count['stddev'] is not None else ''
+            print(f'{event}: {count["value"]:.0f}{spread}, running {count["running"]:.2f}%')
+    print(f'{measurement["groups"]} perf groups, {measurement["execution_time"]} seconds time elapsed')
+    return measurement
 
-def run_perf(exec_file, perf_cmd):
-    print(f'Running {exec_file} command {perf_cmd}')
-    result = subprocess.run(perf_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    output = result.stderr
-    print(output)
-    pattern = re.compile(r"([\d,]+|<not\s+supported>|<not\s+counted>)\s+([a-zA-Z0-9\-]+)")
 
-    metrics = {}
-    for match in pattern.findall(output):
-        value, name = match
-        value = value.replace(",", "").strip()
-        if value != '<not supported>' and value != '<not counted>':
-            value = int(value)
-        metrics[name] = value
+def generate_programs(program_root_path, depth, lang, program, data_structure='array'):
+    return program_store.generate(BENCHGEN_PATH, program, depth, data_structure, lang)
 
-    pattern = re.compile(r"([\d\.]+)\s*seconds time elapsed")
-    for match in pattern.findall(output):
-        metrics["execution_time"] = float(match)
-    return metrics
 
+if __name__ == '__main__':
+    ARGS = parse_args(sys.argv[1:])
+    hygiene.enable_from_args(ARGS)
+    JOBS          = ARGS.jobs
+    PERF_REPEAT   = ARGS.perf_repeat
+    BENCHGEN_PATH = os.path.abspath(ARGS.benchGen_root_path)
 
-def generate_programs(program_root_path, depth, lang, program, data_structure='array'):
+    spans.enable(os.path.abspath(ARGS.output_dir), 'multilang')
 
-    program_path = f'./examples/{program}/'
-    benchgen_cmd = f"./benchGen {depth} {program_path}/production_rule.txt {program_path}/seed_string.txt {program}_{depth}_{lang} {data_structure} {lang}"
-    os.system(benchgen_cmd)
-    return f'{program}_{depth}_{lang}'
+    csv_writer  = results.ResultWriter(f'{os.path.abspath(ARGS.output_dir)}/multilang.csv', CSV_HEADER, KEY_COLUMNS, ARGS.resume)
+    skip_writer = results.ResultWriter(f'{os.path.abspath(ARGS.output_dir)}/multilang_skipped.csv', SKIPPED_HEADER, KEY_COLUMNS, ARGS.resume)
 
+    # Every variant is built in its own copy of the project, in memory with --ram-workspace
+    area = workspace.Workspace(ARGS.ram_workspace)
 
-if __name__ == '__main__':
+    available, missing = discover_toolchains(LANGS)
+    for variant, tools in missing.items():
+        for program in programs:
+            for depth in depths:
+                if not skip_writer.is_done(program, depth, variant):
+                    skip_writer.write([program, depth, variant, f'missing {", ".join(tools)}'])
 
     os.chdir(f'{BENCHGEN_PATH}/src/gen')
-    os.system("make CC=g++")
+    spans.system('generate', 'make benchGen', "make CC=g++")
 
-    for lang in LANGS:
+    cells = []
+    for variant in available:
         for depth in depths:
             for program in programs:
-                benchmark_name = generate_programs(
+                if csv_writer.is_done(program, depth, variant):
+                    print(f'SKIPPING PROGRAM {program} {depth} {variant}: already in the results')
+                    continue
+                benchmark_path = generate_programs(
                     program_root_path=f'{BENCHGEN_PATH}/src/gen',
                     depth=depth,
-                    lang=lang,
+                    lang=GENERATOR_LANG.get(variant, variant),
                     program=program
                 )
-                benchmark_names.append(benchmark_name)
-
-    for benchmark_name in benchmark_names:
-        os.chdir(f'{BENCHGEN_PATH}/src/gen/{benchmark_name}/src/')
-
-        print(f'RUNNING PROGRAM {benchmark_name}')
-        lang = benchmark_name.split('_')[-1]
-
-        is_compiled = compilers[lang][1]
-        compile_cmd = compilers[lang][0]
-
-      #  print(f'Running with {lang} language')
-
-        if is_compiled:
-            compile_program(compiling_cmd=compile_cmd)
-
-        cmd = [
-            "perf", "stat",
-            "-e", "cycles,instructions,branches,branch-misses,cache-references,cache-misses,"
-                    "stalled-cycles-frontend,stalled-cycles-backend,L1-dcache-loads,L1-dcache-load-misses,"
-                    "LLC-loads,LLC-load-misses,dTLB-loads,dTLB-load-misses"
-        ]
-
-        if is_compiled:
-                cmd.append("./a.out")
+                cells.append((variant, benchmark_path))
+
+    # Builds run in parallel; the measurements below run one at a time
+    with ThreadPoolExecutor(max_workers=JOBS) as executor:
+        builds = list(executor.map(lambda cell: build_variant(area, *cell), cells))
+
+    for (variant, benchmark_path), (work_path, error) in zip(cells, builds):
+        manifest       = program_store.load_manifest(benchmark_path)
+        benchmark_name = manifest['name']
+        program        = manifest['grammar']
+        depth          = manifest['iteration']
+
+        if error is None:
+            print(f'RUNNING PROGRAM {benchmark_name} ({variant})')
+            os.chdir(f'{work_path}/src')
+            measurement = run_perf(
+                exec_file=benchmark_name,
+                cmd=run_command(variant, benchmark_name, f'{work_path}/src'),
+            )
+
+            if measurement['returncode'] != 0:
+                error = f'run failed (exit {measurement["returncode"]})'
+
+        if error is not None:
+            print(f'SKIPPING {benchmark_name} ({variant}): {error}')
+            # Skipped cells are retried on --resume; their reason is only recorded once
+            if not skip_writer.is_done(program, depth, variant):
+                skip_writer.write([program, depth, variant, error])
         else:
-                if lang == "julia":
-                        extention = compilers[lang][2]
-                        cmd = cmd + compile_cmd.split(" ") + [f"{benchmark_name}.{extention}"]
-                else:
-                        result = subprocess.run(["ls"], capture_output=True, text=True, shell=False)
-                        files  = result.stdout.strip().split("\n")
-                        cmd = cmd + compile_cmd.split(" ") + files
-        
-        perf_metrics = run_perf(
-            exec_file=benchmark_name,
-            perf_cmd=cmd,
-        )
-
-        print("=== Métricas extraídas ===")
-        for k, v in perf_metrics.items():
-            print(f"{k}: {v}")
-
-        program_info = benchmark_name.split('_')
-        program = program_info[0]
-        depth   = program_info[1]
-        lang    = program_info[2]
-
-        cpu_cycle                   = perf_metrics['cycles']
-        cpu_instructions            = perf_metrics['instructions']
-        cpu_branches                = perf_metrics['branches']
-        cpu_branch_misses           = perf_metrics['branch-misses']
-        cpu_cache_references        = perf_metrics['cache-references']
-        cpu_cache_misses            = perf_metrics['cache-misses']
-        cpu_stalled_cycles_frontend = perf_metrics['stalled-cycles-frontend']
-        cpu_stalled_cycles_backend  = perf_metrics['stalled-cycles-backend']
-        cpu_L1_dcache_loads         = perf_metrics['L1-dcache-loads']
-        cpu_L1_dcache_load_misses   = perf_metrics['L1-dcache-load-misses']
-        cpu_LLC_loads               = perf_metrics['LLC-loads']
-        cpu_LLC_load_misses         = perf_metrics['LLC-load-misses']
-        cpu_dTLB_loads              = perf_metrics['dTLB-loads']
-        cpu_dTLB_load_misses        = perf_metrics['dTLB-load-misses']
-        cpu_execution_time          = perf_metrics['execution_time']
-
-        data = [program, depth, lang, cpu_cycle, cpu_instructions, cpu_branches,
-                cpu_branch_misses, cpu_cache_references, cpu_cache_misses,
-                cpu_stalled_cycles_frontend, cpu_stalled_cycles_backend,
-                cpu_L1_dcache_loads, cpu_L1_dcache_load_misses,
-                cpu_LLC_loads, cpu_LLC_load_misses,
-                cpu_dTLB_loads, cpu_dTLB_load_misses, cpu_execution_time]
-        csv_data.append(data)
-
-        if is_compiled: os.system('rm -r a.out')
-    generate_csv()
+            # Events perf could not report are left empty instead of failing the run
+            counts  = [measurement['events'][event] for event in PERF_EVENTS]
+            running = [count['running'] for count in counts if count['status'] == 'counted']
+            data = [program, depth, variant] + [count['value'] if count['value'] is not None else '' for count in counts]
+            data += [measurement['execution_time'] if measurement['execution_time'] is not None else '']
+            data += [count['stddev'] if count['stddev'] is not None else '' for count in counts]
+            data += [measurement['groups'], min(running) if running else '']
+            data += [value if value is not None else '' for value in perf.derived(measurement['events']).values()]
+            data += source_metrics.values(manifest) + hygiene.env_values(manifest, TOOLCHAINS[variant][0])
+            csv_writer.write(data)
+
+        os.chdir(BENCHGEN_PATH)
+        area.release(work_path)
+
+    csv_writer.close()
+    skip_writer.close()
@@ -1,70 +1,224 @@
-import sys, os, csv, json
+import sys, os, re, glob, json, shutil, hashlib, argparse, statistics
 
-HYPERFINE_WARMUP=2
-HYPERFINE_RUNS=50
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import compile_cache, program_store, timing, results, source_metrics, hygiene, perf, spans
+from common import workspace as work_area
+
+WARMUP=2
+RUNS=50
 
 CLANG_CC='clang-18'
 LLVM_PROFDATA='llvm-profdata-18'
 
+# Execuções do binário instrumentado combinadas em cada perfil de treino: tantas quanto as
+# execuções cronometradas (aquecimento incluído) em que o perfil era treinado antes
+TRAINING_RUNS = WARMUP + RUNS
+
 BENCHGEN_MAX=64
 INITIAL_PATH=0
 
+# Perfis de treino combinados, reaproveitados entre execuções (um por projeto, compilador, opt e caminho de treino)
+PROFILE_DIR = os.environ.get('BENCHGEN_PROFILE_DIR', os.path.expanduser('~/.cache/benchgen-artifact/profiles'))
+
+# Contadores de hardware coletados pelo perf nas mesmas execuções que são cronometradas
+PERF_EVENTS = ['cycles', 'instructions', 'branch-misses', 'cache-misses']
+
 programs = ['ex8']
 depths = [8]
 data_structures = ['array']
 
 opts = ['-O3']
 
-csv_data = [['execution_time', 'instructions_value', 'cpu_cycles','i_path', 'path_value','opt', 'iteration', 'program', 'data_structure']]
+binary_cache = compile_cache.CompileCache()
 
-def generate_program_project(benchgen_root_path, data_structure, program, depth=1):
-    production_rule_file = f'./examples/{program}/production_rule.txt'
-    seed_string_file     = f'./examples/{program}/seed_string.txt'
-    project_name         = f'{program}_{depth}_{data_structure}'
+CSV_HEADER = (['execution_time', 'instructions_value', 'cpu_cycles','i_path', 'path_value','opt', 'iteration', 'program', 'data_structure']
+              + timing.summary_columns('execution_time') + ['cpu_cycles_stddev', 'instructions_stddev']
+              + perf.DERIVED_COLUMNS + source_metrics.COLUMNS + hygiene.ENV_COLUMNS)
+
+# Valores de cada execução cronometrada, em formato longo
+RUNS_HEADER = ['program', 'iteration', 'data_structure', 'opt', 'i_path', 'path_value', 'run', 'execution_time'] + PERF_EVENTS
+
+# Colunas que identificam uma célula, usadas para retomar uma execução interrompida
+KEY_COLUMNS = ['program', 'iteration', 'data_structure', 'opt', 'i_path', 'path_value']
+
+# Modo caminho de treino x caminho de teste: cada caminho de teste é medido com o binário PGO de cada caminho de treino
+MATRIX_HEADER = (['program', 'iteration', 'data_structure', 'opt', 'train_i', 'train_path', 'i_path', 'path_value',
+                  'execution_time', 'instructions_value', 'cpu_cycles'] + timing.summary_columns('execution_time')
+                 + perf.DERIVED_COLUMNS + source_metrics.COLUMNS + hygiene.ENV_COLUMNS)
+
+MATRIX_KEY_COLUMNS = ['program', 'iteration', 'data_structure', 'opt', 'train_i', 'i_path']
 
-    os.system(f'./benchGen {depth} {production_rule_file} {seed_string_file} {project_name} {data_structure}')
-    
-    return f'{benchgen_root_path}/src/gen/{project_name}'
+csv_writer    = None
+runs_writer   = None
+matrix_writer = None
+
+# Área de trabalho em RAM onde os projetos são compilados e executados (None compila no diretório do projeto)
+area = None
+
+def generate_program_project(benchgen_root_path, data_structure, program, depth=1):
+    return program_store.generate(benchgen_root_path, program, depth, data_structure)
 
 def build_benchGen(benchgen_root_path):
-    os.system(f'make -C {benchgen_root_path}/src/gen/ CC=clang++')
+    spans.system('generate', 'make benchGen', f'make -C {benchgen_root_path}/src/gen/ CC=clang++')
 
 def clone_benchGen(workspace):
     os.chdir(workspace)
-    os.system("git clone https://github.com/lac-dcc/BenchGen.git")
+    spans.system('generate', 'clone benchGen', "git clone https://github.com/lac-dcc/BenchGen.git")
 
 def remove_benchGen(workspace):
     os.chdir(workspace)
-    os.system(f'rm -r {workspace}/BenchGen')
+    spans.system('cleanup', 'remove benchGen', f'rm -r {workspace}/BenchGen')
 
 def calculate_path(current_path, i):
     return current_path | (1 << i)
 
-def compile_program(opt, clang_flags):
-    os.system(f'{CLANG_CC} {clang_flags} {opt} ./src/*.c ./src/*.h')
-
-def execute_program(path_value, hyperfine_cmd=''):
-    os.system(f"{hyperfine_cmd} 'BENCH_PATH={path_value} ./a.out' --export-json /tmp/data.json")
-
-def run_perf(path_value, perf_cmd=''):
-    os.system(f"BENCH_PATH={path_value} {perf_cmd} ./a.out 2> out.txt")
-    
-def run_profdata():
-    os.system(f"{LLVM_PROFDATA} merge -output=default.profdata $(find -name *.profraw)")
-
-def get_perf_info(info_type):
-    os.system("grep '"+info_type+"' out.txt | awk '{gsub("+'","'+","+'""'+", $1); print $1}' > "+info_type+".txt")
-    file_out = open(file=f'{info_type}.txt', mode='r')
-    info_value = float(file_out.read().strip())
-    os.system(f'rm {info_type}.txt')
-    return info_value
-
-def read_execution_time(file):
-
-    with open(file=file, mode='r', encoding='utf-8') as file:
-        data = json.load(file)
-    
-    return float(data['results'][0]['mean'])
+def compile_program(opt, clang_flags, force=False):
+    sources = glob.glob('./src/*.c') + glob.glob('./src/*.h')
+    if '-fprofile-use' in clang_flags:
+        sources.append('default.profdata')
+
+    binary_cache.compile(f'{CLANG_CC} {clang_flags} {opt} ./src/*.c ./src/*.h', sources,
+                         CLANG_CC, f'{clang_flags} {opt}', 'a.out', force=force)
+
+perf_sampler = perf.sampler(PERF_EVENTS)
+
+def counter_values(result, event):
+    # Execuções em que o perf não conseguiu contar o evento ficam de fora
+    return [sample[event] for sample in result['samples'] if sample[event] is not None]
+
+def counter_mean(result, event):
+    values = counter_values(result, event)
+    return sum(values) / len(values) if values else None
+
+def counter_stddev(result, event):
+    values = counter_values(result, event)
+    return statistics.stdev(values) if len(values) > 1 else None
+
+def execute_program(path_value):
+    env = dict(os.environ, BENCH_PATH=str(path_value))
+    return timing.measure('./a.out', RUNS, WARMUP, env=env, show_output=True,
+                          ignore_failure=True, sampler=perf_sampler)
+
+def path_values():
+    values   = []
+    new_path = calculate_path(current_path=INITIAL_PATH, i=1)
+    for i in range(2, 65):
+        values.append((i, new_path))
+        new_path = calculate_path(current_path=new_path, i=i)
+    return values
+
+def all_path_values():
+    # O índice 0 é o caminho inicial, aquele em que o modo padrão treina
+    return [(0, INITIAL_PATH)] + path_values()
+
+def parse_indexes(text):
+    """Interpreta uma lista de índices de caminhos como '0,2-10,64'."""
+    valid   = dict(all_path_values())
+    indexes = set()
+    for part in text.split(','):
+        first, _, last = part.strip().partition('-')
+        indexes.update(range(int(first), int(last or first) + 1))
+    unknown = sorted(indexes - set(valid))
+    if unknown:
+        raise ValueError(f'Índices de caminho desconhecidos {unknown}: os válidos são 0 e de 2 a {BENCHGEN_MAX}')
+    return [(i, valid[i]) for i in sorted(indexes)]
+
+def profile_path(manifest, opt, train_path):
+    key = hashlib.sha256(json.dumps([manifest['key'], compile_cache.compiler_identity(CLANG_CC),
+                                     compile_cache.compiler_identity(LLVM_PROFDATA), opt, train_path]).encode()).hexdigest()
+    # Flags com espaços ou '=' viram '_' no nome; o hash já distingue os perfis
+    flags = re.sub(r'[^\w.+-]+', '_', opt)
+    return f"{PROFILE_DIR}/{manifest['grammar']}_{manifest['iteration']}_{manifest['data_structure']}_{flags}_{train_path}_{key[:12]}.profdata"
+
+def run_training(binary, train_path, profile_dir, cwd=None):
+    """
+    Executa o binário instrumentado TRAINING_RUNS vezes no caminho de treino; cada
+    execução grava o seu próprio .profraw em profile_dir.
+
+    Returns:
+        list[str]: Os perfis brutos.
+    """
+    pattern = os.path.abspath(f'{profile_dir}/train_{train_path}_%p.profraw')
+    for stale in glob.glob(pattern.replace('%p', '*')):
+        os.remove(stale)
+
+    env = dict(os.environ, BENCH_PATH=str(train_path), LLVM_PROFILE_FILE=pattern)
+    with spans.span('compile', 'pgo training runs', binary) as current:
+        codes = [timing.run_once(binary, cwd=cwd, env=env)['returncode'] for _ in range(TRAINING_RUNS)]
+        current.set(returncode=max(codes, key=abs), runs=TRAINING_RUNS, path=train_path)
+    return sorted(glob.glob(pattern.replace('%p', '*')))
+
+def merge_profile(raw_profiles, cached):
+    """Combina os perfis brutos no .profdata do cache (gravado por rename) e os remove."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    tmp_path = f'{cached}.{os.getpid()}'
+    if (not raw_profiles
+            or spans.system('compile', 'llvm-profdata merge', f'{LLVM_PROFDATA} merge -output={tmp_path} {" ".join(raw_profiles)}') != 0
+            or not os.path.isfile(tmp_path)):
+        raise RuntimeError(f'Não foi possível combinar o perfil de treino {os.path.basename(cached)}')
+    for raw_profile in raw_profiles:
+        os.remove(raw_profile)
+    os.replace(tmp_path, cached)
+    return cached
+
+def train_profile(manifest, opt, train_path, profile_dir='.'):
+    """
+    Retorna o perfil combinado de um caminho de treino, do cache de perfis quando ele
+    está lá. Senão, o binário instrumentado é compilado no diretório atual, executado
+    TRAINING_RUNS vezes no caminho de treino, e os perfis de todas as execuções são
+    combinados no cache.
+    """
+    cached = profile_path(manifest, opt, train_path)
+    if os.path.isfile(cached):
+        return cached
+
+    compile_program(opt=opt, clang_flags='-fprofile-generate')
+    return merge_profile(run_training('./a.out', train_path, profile_dir), cached)
+
+def use_profile(opt, profile):
+    shutil.copy2(profile, 'default.profdata')
+    compile_program(opt=opt, clang_flags='-fprofile-use=default.profdata')
+
+def record_cell(execution_time, i_path, path_value, opt, depth, program, data_structure, manifest=None):
+    cpu_cycle        = counter_mean(execution_time, 'cycles')
+    cpu_instructions = counter_mean(execution_time, 'instructions')
+
+    runs_writer.write_rows([[program, depth, data_structure, opt, i_path, path_value, run, sample['wall']]
+                            + [sample[event] for event in PERF_EVENTS]
+                            for run, sample in enumerate(execution_time['samples'])])
+
+    line = [execution_time['mean'], cpu_instructions, cpu_cycle, i_path, path_value, opt, depth, program, data_structure]
+    line += timing.summary_values(execution_time)
+    line += [counter_stddev(execution_time, 'cycles'), counter_stddev(execution_time, 'instructions')]
+    line += list(perf.derived({event: {'value': counter_mean(execution_time, event)} for event in PERF_EVENTS}).values())
+    line += source_metrics.values(manifest) + hygiene.env_values(manifest, CLANG_CC)
+    csv_writer.write(line)
+
+def record_matrix_cell(execution_time, train_i, train_path, i_path, path_value, opt, depth, program, data_structure,
+                       manifest=None):
+    line = [program, depth, data_structure, opt, train_i, train_path, i_path, path_value, execution_time['mean'],
+            counter_mean(execution_time, 'instructions'), counter_mean(execution_time, 'cycles')]
+    line += timing.summary_values(execution_time)
+    line += list(perf.derived({event: {'value': counter_mean(execution_time, event)} for event in PERF_EVENTS}).values())
+    line += source_metrics.values(manifest) + hygiene.env_values(manifest, CLANG_CC)
+    matrix_writer.write(line)
+
+def open_results(output_dir, resume=False):
+    global csv_writer, runs_writer
+
+    csv_writer  = results.ResultWriter(f'{output_dir}/path_experiments.csv', CSV_HEADER, KEY_COLUMNS, resume)
+    runs_writer = results.ResultWriter(f'{output_dir}/path_experiments_runs.csv', RUNS_HEADER, KEY_COLUMNS,
+                                       resume, only=csv_writer.done)
+
+def open_matrix(output_dir, resume=False):
+    global matrix_writer
+
+    matrix_writer = results.ResultWriter(f'{output_dir}/path_matrix.csv', MATRIX_HEADER, MATRIX_KEY_COLUMNS, resume)
+
+def close_results():
+    for writer in (csv_writer, runs_writer, matrix_writer):
+        if writer is not None:
+            writer.close()
 
 def run_experiments(benchgen_root_path):
     os.chdir(f"{benchgen_root_path}/src/gen")
@@ -82,72 +236,130 @@ def run_experiments(benchgen_root_path):
                 print(f"RUNNING DATA STRUCTURE {data_structure}")
 
                 project_name = generate_program_project(benchgen_root_path, data_structure, program, depth)
-                os.chdir(project_name)
+                manifest     = program_store.load_manifest(project_name)
+                work_path    = area.stage(project_name) if area else project_name
+                os.chdir(work_path)
                 
                 for opt in opts:
-                    compile_program(opt=opt, clang_flags='-fprofile-generate')
-                    execute_program(path_value=INITIAL_PATH, hyperfine_cmd=f'hyperfine --show-output --ignore-failure --warmup {HYPERFINE_WARMUP} --runs {HYPERFINE_RUNS}')
-                    execution_time = read_execution_time('/tmp/data.json')
-                    
-                    run_perf(path_value=INITIAL_PATH, perf_cmd=f"perf stat -e cycles,instructions")
-                    cpu_cycle        = get_perf_info(info_type='cycles')
-                    cpu_instructions = get_perf_info(info_type='instructions')
+                    pending = [(i, path_value) for i, path_value in path_values()
+                               if not csv_writer.is_done(program, depth, data_structure, opt, i, path_value)]
+                    trained = csv_writer.is_done(program, depth, data_structure, opt, 0, INITIAL_PATH)
 
-                    line = [execution_time, cpu_instructions, cpu_cycle, INITIAL_PATH, opt, depth, program, data_structure]
-                    csv_data.append(line)
+                    if trained and not pending:
+                        print(f"SKIPPING OPT {opt}: already in the results")
+                        continue
 
-                    run_profdata()
-                    compile_program(opt=opt, clang_flags='-fprofile-use=default.profdata')
-                    
-                    new_path = calculate_path(current_path=INITIAL_PATH, i=1)
-                    print(f"RUNNING PATH VALUE {new_path} INDEX VALUE 1")
+                    if not trained:
+                        compile_program(opt=opt, clang_flags='-fprofile-generate')
+                        execution_time = execute_program(path_value=INITIAL_PATH)
+                        record_cell(execution_time, 0, INITIAL_PATH, opt, depth, program, data_structure, manifest)
+
+                    use_profile(opt, train_profile(manifest, opt, INITIAL_PATH))
                     
-                    for i in range(2, 65):
-                       	
-                        
-                        execute_program(path_value=new_path, hyperfine_cmd=f'hyperfine --show-output --ignore-failure --warmup {HYPERFINE_WARMUP} --runs {HYPERFINE_RUNS}')
-                        execution_time = read_execution_time('/tmp/data.json')
+                    for i, new_path in pending:
+                        print(f"RUNNING PATH VALUE {new_path} INDEX VALUE {i - 1}")
 
-                        run_perf(path_value=new_path, perf_cmd=f"perf stat -e cycles,instructions")
-                        cpu_cycle        = get_perf_info(info_type='cycles')
-                        cpu_instructions = get_perf_info(info_type='instructions')
+                        execution_time = execute_program(path_value=new_path)
+                        record_cell(execution_time, i, new_path, opt, depth, program, data_structure, manifest)
                         
-                        os.system('rm out.txt')
-                        line = [execution_time, cpu_instructions, cpu_cycle, i,new_path, opt, depth, program, data_structure]
-                        csv_data.append(line)
-                        new_path = calculate_path(current_path=new_path, i=i)
-                        print(f"RUNNING PATH VALUE {new_path} INDEX VALUE {i}")
-                        
-                os.system('rm a.out *.profdata *.profraw')
+                spans.system('cleanup', 'pgo files', 'rm -f a.out *.profdata *.profraw')
 
-    generate_csv()
+                if area:
+                    os.chdir(f"{benchgen_root_path}/src/gen")
+                    area.release(work_path)
 
-def generate_csv():
-    with open(f'/tmp/path_experiments.csv', 'w', newline='', encoding='utf-8') as file_csv:
-        writer = csv.writer(file_csv)
-        writer.writerows(csv_data)
+def run_matrix(benchgen_root_path, train_paths, test_paths):
+    os.chdir(f"{benchgen_root_path}/src/gen")
+
+    for program in programs:
+        for depth in depths:
+            for data_structure in data_structures:
+                project_name = generate_program_project(benchgen_root_path, data_structure, program, depth)
+                manifest     = program_store.load_manifest(project_name)
+                work_path    = area.stage(project_name) if area else project_name
+                os.chdir(work_path)
+
+                for opt in opts:
+                    for train_i, train_path in train_paths:
+                        pending = [(i, path_value) for i, path_value in test_paths
+                                   if not matrix_writer.is_done(program, depth, data_structure, opt, train_i, i)]
+                        if not pending:
+                            print(f"SKIPPING TRAINING PATH {train_path} ({opt}): already in the results")
+                            continue
+
+                        print(f"TRAINING ON PATH VALUE {train_path} INDEX VALUE {train_i}")
+                        use_profile(opt, train_profile(manifest, opt, train_path))
+
+                        for i, path_value in pending:
+                            print(f"RUNNING PATH VALUE {path_value} INDEX VALUE {i} WITH PROFILE {train_path}")
+                            execution_time = execute_program(path_value=path_value)
+                            record_matrix_cell(execution_time, train_i, train_path, i, path_value, opt, depth,
+                                               program, data_structure, manifest)
+
+                spans.system('cleanup', 'pgo files', 'rm -f a.out *.profdata *.profraw')
+
+                if area:
+                    os.chdir(f"{benchgen_root_path}/src/gen")
+                    area.release(work_path)
+
+def path_indexes(text):
+    """Tipo do argparse para --train-paths e --test-paths (ver parse_indexes)."""
+    try:
+        return parse_indexes(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+def parse_args(argv):
+    """
+    Interpreta as opções de linha de comando do script.
+
+    Parameters:
+        argv (list[str]): Argumentos, sem o nome do script.
+
+    Returns:
+        argparse.Namespace: Opções interpretadas.
+    """
+    parser = argparse.ArgumentParser(
+        prog='path.py',
+        description="Artefato 'Path' do BenchGen: PGO treinado em um caminho e medido em outros")
+    parser.add_argument('workspace', help='Diretório onde o BenchGen é clonado e compilado')
+    parser.add_argument('-r', '--r', dest='remove', action='store_true',
+                        help='Remove o clone do BenchGen no diretório antes de cloná-lo de novo')
+    parser.add_argument('--train-paths', type=path_indexes, default=None, metavar='INDEXES',
+                        help='Modo caminho de treino x caminho de teste: treina em cada um destes índices de caminho (ex.: 0,8,32)')
+    parser.add_argument('--test-paths', type=path_indexes, default=all_path_values(), metavar='INDEXES',
+                        help='Índices de caminho medidos no modo matriz (padrão: todos os 64, ex.: 0,2-16,64)')
+    work_area.add_workspace_arguments(parser)
+    timing.add_adaptive_arguments(parser)
+    hygiene.add_hygiene_arguments(parser)
+    results.add_output_arguments(parser)
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
 
-    argv = sys.argv
+    args = parse_args(sys.argv[1:])
+    timing.enable_from_args(args)
+    hygiene.enable_from_args(args)
+    spans.enable(os.path.abspath(args.output_dir), 'path')
+
+    workspace = os.path.abspath(args.workspace)
+    if args.remove:
+        remove_benchGen(workspace)
 
-    if len(argv) <= 3:
-        
-        argument = argv[1]
-        
-        if(argument == '-r' or argument == '--r'):
-            remove_benchGen(argv[2])
-        
-        workspace = argument
+    os.chdir(workspace)
 
-        os.chdir(workspace)
-        
-        clone_benchGen(workspace)
-        
-        benchgen_root_path = f"{workspace}/BenchGen"
+    clone_benchGen(workspace)
 
-        build_benchGen(benchgen_root_path)
-        run_experiments(benchgen_root_path)
+    benchgen_root_path = f"{workspace}/BenchGen"
 
+    build_benchGen(benchgen_root_path)
+
+    if args.ram_workspace:
+        area = work_area.Workspace()
+    if args.train_paths is None:
+        open_results(os.path.abspath(args.output_dir), args.resume)
+        run_experiments(benchgen_root_path)
     else:
-        raise Exception("Invalid number of arguments")
+        open_matrix(os.path.abspath(args.output_dir), args.resume)
+        run_matrix(benchgen_root_path, args.train_paths, args.test_paths)
+    close_results()
@@ -0,0 +1,463 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : distributed.py
+# Descrição       : Modo coordenador/worker do planejador. O coordenador divide
+#                   a matriz de cada artefato da especificação (programa,
+#                   iteração, estrutura de dados, compilador, otimização,
+#                   caminho) em unidades de trabalho; os workers, na mesma ou
+#                   em outras máquinas, pedem unidades por um socket TCP, as
+#                   executam com o planejador e devolvem as linhas dos CSVs. As
+#                   unidades de um worker que morre ou para de responder voltam
+#                   para a fila. Cada linha leva a identificação da máquina que
+#                   a mediu (colunas env_* de common/hygiene.py).
+#
+#                   Protocolo: uma mensagem JSON por linha. O worker envia
+#                   'hello', 'request', 'rows', 'finished', 'failed' e
+#                   'heartbeat'; o coordenador responde a cada 'request' com
+#                   'unit', 'wait' ou 'done'.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, sys, csv, glob, json, time, socket, hashlib, argparse, tempfile, threading, subprocess, socketserver
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common import program_store, results, workspace, timing, hygiene, spans
+import planner
+
+# Porta padrão do coordenador
+PORT = 5757
+
+# Intervalo, em segundos, entre os heartbeats de um worker; sem mensagens por
+# HEARTBEAT_MISSES intervalos, o worker é considerado morto
+HEARTBEAT = 10
+HEARTBEAT_MISSES = 3
+
+# Tentativas de uma unidade que falha antes de ela ser marcada como 'failed'
+MAX_ATTEMPTS = 2
+
+# Índices de caminho por unidade do artefato 'path'
+PATH_CHUNK = 8
+
+# Linhas por mensagem 'rows'
+ROWS_PER_MESSAGE = 500
+
+# Registro das unidades concluídas, usado pelo --resume do coordenador
+JOURNAL_NAME   = 'distributed_units.csv'
+JOURNAL_HEADER = ['unit', 'status', 'artifact', 'spec', 'host', 'attempts', 'seconds']
+
+# Dimensões em que cada artefato é dividido: (chave da especificação, atributo com o padrão no script)
+SHARD_KEYS = {
+    'compilers_comparison': [('programs', 'programs'), ('iterations', 'iterations'),
+                             ('data_structures', 'data_structures')],
+    'gcc_versions'        : [('versions', None), ('grammars', 'grammar_ids'), ('iterations', 'grammar_iterations'),
+                             ('data_structures', 'data_structures'), ('opts', 'opts')],
+    'asymptotic_behavior' : [('grammars', 'grammar_ids'), ('iterations', 'grammar_iterations'),
+                             ('data_structures', 'data_structures'), ('opts', 'opts')],
+    'path'                : [('programs', 'programs'), ('depths', 'depths'), ('data_structures', 'data_structures'),
+                             ('opts', 'opts')],
+}
+
+def send(stream, message, lock=None):
+    """Envia uma mensagem (uma linha JSON) e a descarrega no socket."""
+    data = (json.dumps(message) + '\n').encode()
+    if lock is None:
+        stream.write(data)
+        stream.flush()
+        return
+    with lock:
+        stream.write(data)
+        stream.flush()
+
+def receive(stream):
+    """Lê a próxima mensagem; None se a conexão foi fechada."""
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+def unit_id(artifact, spec):
+    """Identificador estável de uma unidade, usado no registro e na retomada."""
+    return hashlib.sha256(json.dumps([artifact, spec], sort_keys=True).encode()).hexdigest()[:16]
+
+def _split(artifact, spec, dimensions, module):
+    if not dimensions:
+        return [spec]
+
+    (key, default), rest = dimensions[0], dimensions[1:]
+    if key in spec:
+        values = spec[key]
+    elif default is not None:
+        values = list(getattr(module, default))
+    else:
+        values = [module.GCC_VERSION]
+
+    return [unit for value in values for unit in _split(artifact, dict(spec, **{key: [value]}), rest, module)]
+
+def shard(spec, path_chunk=PATH_CHUNK):
+    """
+    Divide a especificação do planejador em unidades de trabalho: uma por
+    combinação de programa, iteração, estrutura de dados, compilador e
+    otimização. O artefato 'path' também é dividido em grupos de caminhos, e só
+    a primeira parte de cada célula grava a execução de treino.
+
+    Parameters:
+        spec (dict): Especificação por artefato (ver planner.load_spec).
+        path_chunk (int): Índices de caminho por unidade do artefato 'path'.
+
+    Returns:
+        list[tuple[str, dict]]: (artefato, especificação da unidade).
+    """
+    units = []
+
+    for artifact in planner.ARTIFACTS:
+        if artifact not in spec:
+            continue
+        module = planner.load_artifact(artifact)
+
+        for unit in _split(artifact, dict(spec[artifact]), SHARD_KEYS[artifact], module):
+            if artifact == 'compilers_comparison':
+                opts = unit.get('opts', planner.compilers_comparison_opts(module))
+                for compiler in unit.get('compilers', module.compilers):
+                    for opt in opts[compiler]:
+                        units.append((artifact, dict(unit, compilers=[compiler], opts={compiler: [opt]})))
+
+            elif artifact == 'path' and 'train_indexes' in unit:
+                for train_index in unit['train_indexes']:
+                    units.append((artifact, dict(unit, train_indexes=[train_index])))
+
+            elif artifact == 'path':
+                indexes = unit.get('path_indexes', [i for i, _ in module.path_values()])
+                for start in range(0, len(indexes), path_chunk):
+                    units.append((artifact, dict(unit, path_indexes=indexes[start:start + path_chunk], train=start == 0)))
+
+            else:
+                units.append((artifact, unit))
+
+    return units
+
+class Coordinator:
+    """Fila de unidades, estado dos workers e gravação dos resultados recebidos."""
+
+    def __init__(self, units, output_dir, resume=False):
+        self.output_dir = output_dir
+        self.resume     = resume
+        self.journal    = results.ResultWriter(f'{output_dir}/{JOURNAL_NAME}', JOURNAL_HEADER, ['unit', 'status'], resume)
+        self.units      = {unit_id(artifact, spec): (artifact, spec) for artifact, spec in units}
+        self.pending    = deque(unit for unit in self.units if not self.journal.is_done(unit, 'done'))
+        self.done       = {(unit,) for unit, status in self.journal.done if status == 'done'}
+        self.running    = {}
+        self.attempts   = {}
+        self.buffers    = {}
+        self.writers    = {}
+        self.condition  = threading.Condition()
+
+        skipped = len(self.units) - len(self.pending)
+        print(f'{len(self.units)} units, {skipped} already done')
+
+    @property
+    def finished(self):
+        return not self.pending and not self.running
+
+    def next_unit(self, worker):
+        """Entrega a próxima unidade ao worker; None se não houver nenhuma pendente."""
+        with self.condition:
+            if not self.pending:
+                return None
+            unit = self.pending.popleft()
+            self.running[unit]  = {'worker': worker, 'start': time.time()}
+            self.attempts[unit] = self.attempts.get(unit, 0) + 1
+            self.buffers[unit]  = {}
+            return unit
+
+    def add_rows(self, unit, name, header, rows):
+        """Guarda as linhas recebidas; só são gravadas quando a unidade termina."""
+        with self.condition:
+            if unit in self.buffers:
+                self.buffers[unit].setdefault(name, (header, []))[1].extend(rows)
+
+    def writer(self, name, header):
+        # Os CSVs do coordenador são abertos quando a primeira unidade que os produz termina.
+        # Cada linha leva a unidade que a produziu; na retomada, as linhas de unidades que
+        # não chegaram ao registro (ex.: queda entre a gravação das linhas e a do registro)
+        # são descartadas, já que a unidade volta para a fila
+        if name not in self.writers:
+            self.writers[name] = results.ResultWriter(f'{self.output_dir}/{name}', header + ['unit'], ['unit'],
+                                                      self.resume, only=self.done if self.resume else None)
+        return self.writers[name]
+
+    def record(self, unit, status, worker, start):
+        """Grava o registro de uma unidade que terminou, com sucesso ou não."""
+        artifact, spec = self.units[unit]
+        self.journal.write([unit, status, artifact, json.dumps(spec, sort_keys=True), worker,
+                            self.attempts[unit], time.time() - start])
+        print(f'Unit {unit} ({artifact}) {status} on {worker}; {len(self.pending)} pending, {len(self.running)} running')
+
+    def finish(self, unit, worker, status='done'):
+        """Grava os resultados de uma unidade concluída e o seu registro."""
+        with self.condition:
+            if self.running.get(unit, {}).get('worker') != worker:
+                return
+            running = self.running.pop(unit)
+            buffers = self.buffers.pop(unit, {})
+
+            if status == 'done':
+                for name, (header, rows) in sorted(buffers.items()):
+                    self.writer(name, header).write_rows([row + [unit] for row in rows])
+            elif self.attempts[unit] < MAX_ATTEMPTS:
+                print(f'Unit {unit} failed on {worker}, requeued')
+                self.pending.append(unit)
+                self.condition.notify_all()
+                return
+
+            self.record(unit, status, worker, running['start'])
+            self.condition.notify_all()
+
+    def requeue(self, worker):
+        """
+        Devolve para o início da fila as unidades de um worker que caiu; as que
+        já usaram MAX_ATTEMPTS tentativas são marcadas como 'failed'.
+        """
+        with self.condition:
+            lost = [unit for unit, state in self.running.items() if state['worker'] == worker]
+            if lost:
+                print(f'Worker {worker} lost with {len(lost)} units')
+            for unit in lost:
+                running = self.running.pop(unit)
+                self.buffers.pop(unit, None)
+                if self.attempts[unit] < MAX_ATTEMPTS:
+                    self.pending.appendleft(unit)
+                else:
+                    self.record(unit, 'failed', worker, running['start'])
+            self.condition.notify_all()
+
+    def wait(self):
+        """Bloqueia até todas as unidades terminarem."""
+        with self.condition:
+            while not self.finished:
+                self.condition.wait(HEARTBEAT)
+
+    def close(self):
+        self.journal.close()
+        for writer in self.writers.values():
+            writer.close()
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    """Conexão de um worker com o coordenador."""
+
+    timeout = HEARTBEAT * HEARTBEAT_MISSES
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker      = f'{self.client_address[0]}:{self.client_address[1]}'
+
+        try:
+            while True:
+                message = receive(self.rfile)
+                if message is None:
+                    break
+
+                kind = message['type']
+                if kind == 'hello':
+                    worker = f"{message['fingerprint']['env_host']}/{message['worker']}"
+                    print(f"Worker {worker} joined ({message['fingerprint']['env_cpu']})")
+                elif kind == 'request':
+                    unit = coordinator.next_unit(worker)
+                    if unit is not None:
+                        artifact, spec = coordinator.units[unit]
+                        send(self.wfile, {'type': 'unit', 'unit': unit, 'artifact': artifact, 'spec': spec})
+                    elif coordinator.finished:
+                        send(self.wfile, {'type': 'done'})
+                        break
+                    else:
+                        send(self.wfile, {'type': 'wait', 'seconds': 1})
+                elif kind == 'rows':
+                    coordinator.add_rows(message['unit'], message['file'], message['header'], message['rows'])
+                elif kind == 'finished':
+                    coordinator.finish(message['unit'], worker)
+                elif kind == 'failed':
+                    print(f"Unit {message['unit']} failed on {worker}: {message['error']}")
+                    coordinator.finish(message['unit'], worker, status='failed')
+        except (OSError, ValueError) as error:
+            print(f'Connection to {worker} broken: {error}')
+        finally:
+            coordinator.requeue(worker)
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+def start_workers(count, port, args):
+    """Inicia workers locais, um processo cada, ligados ao coordenador."""
+    command = [sys.executable, os.path.abspath(__file__), 'worker', args.benchGen_root_path,
+               '--host', '127.0.0.1', '--port', str(port), '--scratch-dir', args.scratch_dir]
+    if args.ram_workspace:
+        command.append('--ram-workspace')
+    return [subprocess.Popen(command + ['--name', f'local{index}']) for index in range(count)]
+
+def coordinate(args):
+    """Divide a especificação, atende os workers e grava os CSVs até todas as unidades terminarem."""
+    spec        = planner.load_spec(args.spec)
+    output_dir  = os.path.abspath(args.output_dir)
+    coordinator = Coordinator(shard(spec, args.path_chunk), output_dir, args.resume)
+
+    server = CoordinatorServer((args.bind, args.port), WorkerHandler)
+    server.coordinator = coordinator
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f'Coordinator listening on {args.bind}:{server.server_address[1]}')
+
+    workers = start_workers(args.local_workers, server.server_address[1], args) if args.local_workers else []
+    try:
+        coordinator.wait()
+        # O servidor continua atendendo até os workers locais receberem 'done'; um worker que
+        # só se conecta depois (ex.: todas as unidades já feitas no --resume) ficaria esperando
+        for process in workers:
+            process.wait()
+    finally:
+        server.shutdown()
+        server.server_close()
+        coordinator.close()
+        for process in workers:
+            process.wait()
+
+def run_unit(benchgen_root, area, artifact, spec):
+    """
+    Executa uma unidade com o planejador, em um diretório de resultados próprio.
+
+    Returns:
+        str: Diretório com os CSVs da unidade.
+    """
+    output_dir = area.mkdtemp(prefix='unit_')
+    unit       = planner.Planner(benchgen_root, area, output_dir)
+    try:
+        getattr(unit, f'add_{artifact}')(spec)
+        unit.plan.run()
+    finally:
+        unit.close()
+    return output_dir
+
+def send_results(stream, lock, unit, output_dir):
+    """Envia as linhas de todos os CSVs da unidade, em blocos de ROWS_PER_MESSAGE."""
+    for path in sorted(glob.glob(f'{output_dir}/*.csv')):
+        with open(path, mode='r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                continue
+            block = []
+            for row in reader:
+                block.append(row)
+                if len(block) == ROWS_PER_MESSAGE:
+                    send(stream, {'type': 'rows', 'unit': unit, 'file': os.path.basename(path), 'header': header, 'rows': block}, lock)
+                    block = []
+            if block:
+                send(stream, {'type': 'rows', 'unit': unit, 'file': os.path.basename(path), 'header': header, 'rows': block}, lock)
+
+def work(args):
+    """Pede unidades ao coordenador e as executa até ele responder 'done'."""
+    benchgen_root = os.path.abspath(args.benchGen_root_path).rstrip('/')
+    area          = workspace.Workspace(args.ram_workspace, disk_root=args.scratch_dir)
+    program_store.ensure_benchgen(benchgen_root)
+
+    connection = socket.create_connection((args.host, args.port))
+    stream     = connection.makefile('rwb')
+    lock       = threading.Lock()
+    stop       = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT):
+            try:
+                send(stream, {'type': 'heartbeat'}, lock)
+            except OSError:
+                return
+
+    send(stream, {'type': 'hello', 'worker': args.name or str(os.getpid()),
+                  'fingerprint': hygiene.fingerprint(None, '')}, lock)
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    try:
+        while True:
+            send(stream, {'type': 'request'}, lock)
+            message = receive(stream)
+            if message is None or message['type'] == 'done':
+                break
+            if message['type'] == 'wait':
+                time.sleep(message['seconds'])
+                continue
+
+            unit = message['unit']
+            print(f"Running unit {unit} ({message['artifact']}): {json.dumps(message['spec'], sort_keys=True)}")
+            try:
+                output_dir = run_unit(benchgen_root, area, message['artifact'], message['spec'])
+            except Exception as error:
+                send(stream, {'type': 'failed', 'unit': unit, 'error': f'{type(error).__name__}: {error}'}, lock)
+                continue
+
+            send_results(stream, lock, unit, output_dir)
+            send(stream, {'type': 'finished', 'unit': unit}, lock)
+            area.release(output_dir)
+    finally:
+        stop.set()
+        connection.close()
+        area.cleanup()
+
+def parse_args(argv):
+    """
+    Lê as opções de linha de comando do coordenador e do worker.
+
+    Parameters:
+        argv (list[str]): Argumentos recebidos, sem o nome do script.
+
+    Returns:
+        argparse.Namespace: Opções interpretadas.
+    """
+    parser = argparse.ArgumentParser(
+        prog='distributed.py',
+        description='Divide os experimentos do planejador entre vários workers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coordinator = commands.add_parser('coordinator', help='Divide a especificação e grava os resultados')
+    coordinator.add_argument('--spec', default=planner.DEFAULT_SPEC,
+                             help='Especificação JSON dos experimentos (padrão: planner/experiments.json)')
+    coordinator.add_argument('--bind', default='0.0.0.0', help='Endereço em que o coordenador escuta')
+    coordinator.add_argument('--port', type=int, default=PORT, help=f'Porta do coordenador (padrão: {PORT}; 0 escolhe uma livre)')
+    coordinator.add_argument('--path-chunk', type=int, default=PATH_CHUNK,
+                             help=f"Índices de caminho por unidade do artefato 'path' (padrão: {PATH_CHUNK})")
+    coordinator.add_argument('--local-workers', type=int, default=0, metavar='N',
+                             help='Inicia N workers nesta máquina (exige o caminho do BenchGen)')
+    coordinator.add_argument('--output-dir', default=results.DEFAULT_OUTPUT_DIR,
+                             help='Diretório dos CSVs de resultado (padrão: /tmp)')
+    coordinator.add_argument('--resume', action='store_true',
+                             help='Continua uma execução interrompida, pulando as unidades já concluídas')
+
+    worker = commands.add_parser('worker', help='Executa as unidades pedidas ao coordenador')
+    worker.add_argument('--host', default='127.0.0.1', help='Endereço do coordenador')
+    worker.add_argument('--port', type=int, default=PORT, help=f'Porta do coordenador (padrão: {PORT})')
+    worker.add_argument('--name', default=None, help='Nome do worker nos registros (padrão: o PID)')
+    timing.add_adaptive_arguments(worker)
+    hygiene.add_hygiene_arguments(worker)
+
+    for command in (coordinator, worker):
+        command.add_argument('benchGen_root_path', nargs='?' if command is coordinator else None,
+                             help='Caminho raiz do BenchGen')
+        command.add_argument('--scratch-dir', default=tempfile.gettempdir(),
+                             help='Diretório onde as pastas de trabalho das unidades são criadas')
+        command.add_argument('--ram-workspace', action='store_true',
+                             help='Cria as pastas de trabalho em /dev/shm, usando --scratch-dir quando a memória enche')
+
+    args = parser.parse_args(argv)
+    if args.command == 'coordinator' and args.local_workers and not args.benchGen_root_path:
+        parser.error('--local-workers needs the BenchGen root path')
+    return args
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        raise Exception('This script is not compatible with Windows system!')
+
+    args = parse_args(sys.argv[1:])
+
+    if args.command == 'coordinator':
+        coordinate(args)
+    else:
+        timing.enable_from_args(args)
+        hygiene.enable_from_args(args)
+        # O trace do harness de cada worker fica na máquina dele, em --scratch-dir
+        spans.enable(args.scratch_dir, f'distributed_worker_{args.name or os.getpid()}')
+        work(args)
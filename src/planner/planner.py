@@ -0,0 +1,512 @@
+# ---------------------------------------------------------------------------------
+# Nome do Arquivo : planner.py
+# Descrição       : Planejador de experimentos entre artefatos. Lê uma
+#                   especificação declarativa dos experimentos, monta um único
+#                   grafo geração → compilação → medição, unifica as tarefas
+#                   idênticas entre os artefatos e executa o grafo uma vez,
+#                   gravando o CSV de cada artefato no formato original.
+# Versão          : 1.0
+# ---------------------------------------------------------------------------------
+
+import os, sys, glob, json, shutil, tempfile, argparse, importlib.util
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sys.path.insert(0, SRC_DIR)
+from common import compile_cache, program_store, elf, timing, results, plan, workspace, source_metrics, hygiene, spans
+
+# Especificação padrão: um objeto vazio usa as matrizes definidas no próprio script do artefato
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'experiments.json')
+
+ARTIFACTS = ['compilers_comparison', 'gcc_versions', 'asymptotic_behavior', 'path']
+
+binary_cache = compile_cache.CompileCache()
+
+def load_artifact(name):
+    """Importa o script de um artefato como módulo, sem executar o seu '__main__'."""
+    spec   = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, name, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def compilers_comparison_opts(module):
+    """Otimizações padrão de cada compilador do artefato 'Comparação de Compiladores'."""
+    return {compiler: module.opts if compiler == f'gcc-{module.GCC_VERSION}' else module.opts + ['-Oz']
+            for compiler in module.compilers}
+
+def load_spec(path):
+    """
+    Lê a especificação dos experimentos.
+
+    Parameters:
+        path (str): Arquivo JSON com um objeto por artefato.
+
+    Returns:
+        dict: Especificação por artefato.
+
+    Raises:
+        ValueError: Se a especificação citar um artefato desconhecido.
+    """
+    with open(path, mode='r', encoding='utf-8') as f:
+        spec = json.load(f)
+
+    unknown = set(spec) - set(ARTIFACTS)
+    if unknown:
+        raise ValueError(f'Unknown artifacts in {path}: {", ".join(sorted(unknown))}')
+    return spec
+
+class Planner:
+    """Monta as tarefas de cada artefato em um grafo compartilhado."""
+
+    def __init__(self, benchgen_root, area, output_dir, resume=False):
+        self.benchgen_root  = benchgen_root
+        self.area           = area
+        self.output_dir     = output_dir
+        self.resume         = resume
+        self.dalloc_path    = f'{benchgen_root}/src/Dalloc/src/'
+        # Os cabeçalhos do Dalloc entram nas chaves das compilações, junto com os fontes do projeto
+        self.dalloc_headers = compile_cache.include_headers(self.dalloc_path)
+        self.dalloc_digest  = compile_cache.files_digest(self.dalloc_headers)
+        self.plan           = plan.Plan()
+        self.writers        = []
+
+    # --------------------------------------------------------------------- tarefas
+
+    def scratch_copy(self, project_path, prefix):
+        """Copia um projeto para uma pasta de trabalho própria e retorna o seu diretório 'src'."""
+        return f'{self.area.stage(project_path, prefix)}/src'
+
+    def generate(self, user, grammar_id, iteration, data_structure, lang=None):
+        """Tarefa que gera (ou reaproveita) um projeto do BenchGen."""
+        params = (grammar_id, int(iteration), data_structure, lang)
+
+        def action():
+            return program_store.generate(self.benchgen_root, grammar_id, iteration, data_structure, lang)
+
+        return self.plan.add('generate', params, action, stage='generate', user=user)
+
+    def generate_all(self):
+        """
+        Gera ao mesmo tempo todos os projetos do plano (ver program_store.generate_all);
+        as tarefas 'generate' do grafo passam a só reaproveitá-los.
+        """
+        projects = [node.params for node in self.plan.nodes.values() if node.kind == 'generate']
+        for _ in program_store.generate_all(self.benchgen_root, projects):
+            pass
+
+    def compile_command(self, compiler, flags, output='a.out'):
+        command = f'{compiler} {flags} *.c *.h -I{self.dalloc_path}'
+        return command + (f' -o {output}' if output else '')
+
+    def compile_time(self, user, project, compiler, flags, runs, warmup, output='a.out', ignore_failure=False):
+        """
+        Tarefa que mede o tempo de compilação de um projeto. O binário gerado
+        vai para o cache, de onde a tarefa 'compile' equivalente o reaproveita.
+        Uma tarefa compartilhada só aceita falhas se todos os artefatos aceitarem.
+        """
+        params = (project.params, compile_cache.compiler_identity(compiler), ' '.join(flags.split()),
+                  self.dalloc_digest, runs, warmup, output)
+
+        def action(project_path):
+            src_dir = self.scratch_copy(project_path, 'compile_time')
+            result  = timing.measure(self.compile_command(compiler, flags, output), runs, warmup, cwd=src_dir,
+                                     show_output=True, ignore_failure=node.ignore_failure)
+
+            binary = os.path.join(src_dir, output or '')
+            if output and compile_cache.ENABLED and os.path.isfile(binary):
+                sources = glob.glob(f'{src_dir}/*.c') + glob.glob(f'{src_dir}/*.h') + self.dalloc_headers
+                binary_flags = f'{flags} -I{self.dalloc_path}'
+                binary_cache.store(compile_cache.cache_key(sources, compiler, binary_flags), binary,
+                                   {'compiler': compiler, 'flags': binary_flags})
+
+            self.area.release(src_dir)
+            return result
+
+        node = self.plan.add('compile_time', params, action, [project], user=user)
+        node.ignore_failure = ignore_failure and getattr(node, 'ignore_failure', True)
+        return node
+
+    def compile(self, user, project, compiler, flags, profile=None):
+        """
+        Tarefa que produz o binário de um projeto (pelo cache, quando possível)
+        e lê os tamanhos das seções e das funções.
+
+        Parameters:
+            profile (Node): Tarefa 'pgo_profile' cujo .profdata é copiado para
+                            'default.profdata' antes da compilação.
+        """
+        params = (project.params, compile_cache.compiler_identity(compiler), ' '.join(flags.split()),
+                  self.dalloc_digest, profile.params if profile else None)
+        deps   = [project] + ([profile] if profile else [])
+
+        def action(project_path, profdata=None):
+            src_dir = self.scratch_copy(project_path, 'compile')
+            sources = glob.glob(f'{src_dir}/*.c') + glob.glob(f'{src_dir}/*.h') + self.dalloc_headers
+
+            if profdata:
+                shutil.copy2(profdata, f'{src_dir}/default.profdata')
+                sources.append(f'{src_dir}/default.profdata')
+
+            cwd = os.getcwd()
+            os.chdir(src_dir)
+            try:
+                binary_cache.compile(self.compile_command(compiler, flags), sources, compiler,
+                                     f'{flags} -I{self.dalloc_path}', 'a.out')
+            finally:
+                os.chdir(cwd)
+
+            binary = f'{src_dir}/a.out'
+            return {'dir': src_dir, 'binary': binary,
+                    'sizes': elf.section_sizes(binary), 'functions': elf.function_sizes(binary)}
+
+        # A cópia compilada é removida quando a última medição, cadeia ou treino que a usa termina
+        return self.plan.add('compile', params, action, deps, user=user,
+                             release=lambda compiled: self.area.release(compiled['dir']))
+
+    def run_time(self, user, binary, runs, warmup, env=(), sampler=None, ignore_failure=False):
+        """
+        Tarefa que mede o tempo de execução de um binário.
+
+        Parameters:
+            env (tuple): Pares (variável, valor) acrescentados ao ambiente.
+            sampler (tuple): (nome, função) usada no lugar de timing.run_once.
+        """
+        params = (binary.params, runs, warmup, tuple(env), sampler[0] if sampler else None)
+
+        def action(compiled):
+            return timing.measure(compiled['binary'], runs, warmup, cwd=compiled['dir'], env=dict(os.environ, **dict(env)),
+                                  show_output=True, ignore_failure=node.ignore_failure,
+                                  sampler=sampler[1] if sampler else timing.run_once)
+
+        node = self.plan.add('run_time', params, action, [binary], stage='measure', user=user)
+        node.ignore_failure = ignore_failure and getattr(node, 'ignore_failure', True)
+        return node
+
+    def open_writer(self, path, header, key_columns, only=None):
+        writer = results.ResultWriter(f'{self.output_dir}/{path}', header, key_columns, self.resume, only=only)
+        self.writers.append(writer)
+        return writer
+
+    # -------------------------------------------------------------------- artefatos
+
+    def add_compilers_comparison(self, spec):
+        """Células do artefato 'Comparação de Compiladores'."""
+        module = load_artifact('compilers_comparison')
+        module.open_results(self.output_dir, self.resume)
+        self.writers += [module.csv_writer, module.symbol_writer]
+
+        opts   = spec.get('opts', compilers_comparison_opts(module))
+        runs   = spec.get('runs', module.NUMBER_OF_EXECUTIONS)
+        warmup = spec.get('warmup', module.EXECUTION_WARMUP)
+
+        for grammar_id in spec.get('programs', module.programs):
+            for iteration in spec.get('iterations', module.iterations):
+                for data_structure in spec.get('data_structures', module.data_structures):
+                    project = self.generate('compilers_comparison', grammar_id, iteration, data_structure)
+
+                    for compiler in spec.get('compilers', module.compilers):
+                        for opt in opts[compiler]:
+                            if module.csv_writer.is_done(grammar_id, data_structure, iteration, compiler, opt):
+                                continue
+
+                            comp_time = self.compile_time('compilers_comparison', project, compiler, opt, runs, warmup)
+                            binary    = self.compile('compilers_comparison', project, compiler, opt)
+                            exec_time = self.run_time('compilers_comparison', binary, runs, warmup)
+
+                            def emit(project_path, comp_time, compiled, exec_time, compiler=compiler, opt=opt):
+                                module.append_row(program_store.load_manifest(project_path), compiler, opt, comp_time,
+                                                  compiled['sizes'], exec_time, compiled['functions'])
+
+                            self.plan.add_cell([project, comp_time, binary, exec_time], emit)
+
+    def add_gcc_versions(self, spec):
+        """Células do artefato 'Versões do GCC', com um CSV por versão e gramática."""
+        module = load_artifact('gcc_versions')
+
+        runs   = spec.get('runs', module.RUN)
+        warmup = spec.get('warmup', module.WARMUP)
+        iterations = spec.get('iterations', list(module.grammar_iterations))
+
+        for version in spec.get('versions', [module.GCC_VERSION]):
+            compiler = spec.get('compiler', '/usr/local/gcc{version}/bin/gcc').format(version=version)
+
+            for grammar_id in spec.get('grammars', module.grammar_ids):
+                name = f'data_{version}_{runs}_{grammar_id}'
+                csv_writer    = self.open_writer(f'{name}.csv', module.CSV_HEADER, module.KEY_COLUMNS)
+                symbol_writer = self.open_writer(f'{name}_symbols.csv', module.SYMBOL_HEADER, module.KEY_COLUMNS,
+                                                 only=csv_writer.done)
+                runs_writer   = self.open_writer(f'{name}_runs.csv', module.RUNS_HEADER, module.KEY_COLUMNS,
+                                                 only=csv_writer.done)
+
+                for iteration in iterations:
+                    for data_structure in spec.get('data_structures', module.data_structures):
+                        project = self.generate('gcc_versions', grammar_id, iteration, data_structure)
+
+                        for opt in spec.get('opts', module.opts):
+                            if csv_writer.is_done(opt, iteration, grammar_id, data_structure):
+                                continue
+
+                            comp_time = self.compile_time('gcc_versions', project, compiler, opt, runs, warmup,
+                                                          ignore_failure=True)
+                            binary    = self.compile('gcc_versions', project, compiler, opt)
+                            run_time  = self.run_time('gcc_versions', binary, runs, warmup, ignore_failure=True)
+
+                            def emit(comp_time, compiled, run_time, project_path, opt=opt, iteration=iteration, grammar_id=grammar_id,
+                                     data_structure=data_structure, version=version, csv_writer=csv_writer,
+                                     symbol_writer=symbol_writer, runs_writer=runs_writer):
+                                key_values = [opt, iteration, grammar_id, data_structure]
+                                sizes      = compiled['sizes']
+                                symbol_writer.write_rows([key_values + [symbol, size]
+                                                          for symbol, size in sorted(compiled['functions'].items())])
+                                manifest   = program_store.load_manifest(project_path)
+                                runs_writer.write_rows(module.sample_rows(key_values, version, comp_time, run_time))
+                                csv_writer.write([comp_time['mean'], run_time['mean'], sizes['text']] + key_values
+                                                 + [sizes['data'], sizes['bss']]
+                                                 + timing.summary_values(comp_time) + timing.summary_values(run_time)
+                                                 + source_metrics.values(manifest) + hygiene.env_values(manifest, compiler))
+
+                            self.plan.add_cell([comp_time, binary, run_time, project], emit)
+
+    def add_asymptotic_behavior(self, spec):
+        """Células do artefato 'Comportamento Assintótico'."""
+        module = load_artifact('asymptotic_behavior')
+        module.TIME_TRACE = spec.get('time_trace')
+        module.open_results(self.output_dir, self.resume)
+        self.writers += [module.csv_writer, module.symbol_writer, module.pass_writer]
+        if module.trace_writer is not None:
+            self.writers.append(module.trace_writer)
+
+        module.RUN          = spec.get('runs', module.RUN)
+        module.REUSE_STAGES = not spec.get('full_pipeline', False)
+        iterations = spec.get('iterations', list(module.grammar_iterations))
+
+        for grammar_id in spec.get('grammars', module.grammar_ids):
+            for iteration in iterations:
+                for data_structure in spec.get('data_structures', module.data_structures):
+                    project = self.generate('asymptotic_behavior', grammar_id, iteration, data_structure)
+
+                    for opt in spec.get('opts', module.opts):
+                        if module.csv_writer.is_done(opt, iteration, grammar_id, data_structure):
+                            continue
+
+                        pipeline = self.llvm_pipeline(module, project, opt)
+
+                        def emit(pipeline, project_path, opt=opt, iteration=iteration, grammar_id=grammar_id,
+                                 data_structure=data_structure):
+                            manifest   = program_store.load_manifest(project_path)
+                            sizes      = pipeline['bin_size']
+                            clang_time = pipeline['clang_time']
+                            opt_avg    = sum(pipeline['opt_times']) / len(pipeline['opt_times'])
+                            llc_avg    = sum(pipeline['llc_times']) / len(pipeline['llc_times'])
+
+                            module.symbol_writer.write_rows(pipeline['symbols'])
+                            module.pass_writer.write_rows(pipeline['passes'])
+                            if 'time_trace' in pipeline:
+                                module.trace_writer.write_rows(pipeline['time_trace'])
+                            module.csv_writer.write([clang_time['mean'], opt_avg, llc_avg, sizes['text'],
+                                                     opt, iteration, grammar_id, data_structure, sizes['data'], sizes['bss']]
+                                                    + timing.summary_values(clang_time)
+                                                    + source_metrics.values(manifest) + hygiene.env_values(manifest, module.CC))
+
+                        self.plan.add_cell([pipeline, project], emit)
+
+    def llvm_pipeline(self, module, project, opt):
+        """Tarefa que executa a cadeia clang → opt → llc do artefato 'Comportamento Assintótico' em uma pasta própria."""
+        params = (project.params, compile_cache.compiler_identity(module.CC), opt, module.RUN, module.REUSE_STAGES,
+                  module.TIME_TRACE)
+
+        def action(project_path):
+            manifest   = program_store.load_manifest(project_path)
+            key_values = [opt, manifest['iteration'], manifest['grammar'], manifest['data_structure']]
+            src_dir    = self.scratch_copy(project_path, 'llvm')
+            cwd        = os.getcwd()
+            os.chdir(src_dir)
+            try:
+                pipeline = module.run_pipeline(self.benchgen_root, opt, manifest['grammar'], key_values)
+            finally:
+                os.chdir(cwd)
+            self.area.release(src_dir)
+            return pipeline
+
+        return self.plan.add('llvm_pipeline', params, action, [project], user='asymptotic_behavior')
+
+    def add_path(self, spec):
+        """
+        Células do artefato de caminhos (PGO), treinado no caminho inicial. Com
+        'train_indexes', gera a matriz caminho de treino x caminho de teste. Com
+        'train' falso, a linha da execução de treino não é gravada (o perfil
+        continua sendo gerado), como nas partes do modo distribuído.
+        """
+        module = load_artifact('path')
+
+        runs    = spec.get('runs', module.RUNS)
+        warmup  = spec.get('warmup', module.WARMUP)
+        sampler = ('perf', module.perf_sampler)
+        indexes = spec.get('path_indexes')
+        train   = spec.get('train_indexes')
+
+        if train is not None:
+            module.open_matrix(self.output_dir, self.resume)
+            self.writers.append(module.matrix_writer)
+            values = [(i, value) for i, value in module.all_path_values() if indexes is None or i in indexes]
+            train  = [(i, value) for i, value in module.all_path_values() if i in train]
+        else:
+            module.open_results(self.output_dir, self.resume)
+            self.writers += [module.csv_writer, module.runs_writer]
+            values = [(i, value) for i, value in module.path_values() if indexes is None or i in indexes]
+
+        for program in spec.get('programs', module.programs):
+            for depth in spec.get('depths', module.depths):
+                for data_structure in spec.get('data_structures', module.data_structures):
+                    project = self.generate('path', program, depth, data_structure)
+
+                    for opt in spec.get('opts', module.opts):
+                        if train is not None:
+                            self.add_path_matrix(module, project, program, depth, data_structure, opt, train, values,
+                                                 runs, warmup, sampler)
+                            continue
+
+                        trained = (not spec.get('train', True)
+                                   or module.csv_writer.is_done(program, depth, data_structure, opt, 0, module.INITIAL_PATH))
+                        pending = [(i, value) for i, value in values
+                                   if not module.csv_writer.is_done(program, depth, data_structure, opt, i, value)]
+                        if trained and not pending:
+                            continue
+
+                        def emit(execution_time, project_path, i=0, value=module.INITIAL_PATH, opt=opt, depth=depth,
+                                 program=program, data_structure=data_structure):
+                            module.record_cell(execution_time, i, value, opt, depth, program, data_structure,
+                                               program_store.load_manifest(project_path))
+
+                        instrumented = self.compile('path', project, module.CLANG_CC, f'-fprofile-generate {opt}')
+                        if not trained:
+                            training = self.run_time('path', instrumented, runs, warmup,
+                                                     (('BENCH_PATH', str(module.INITIAL_PATH)),), sampler, True)
+                            self.plan.add_cell([training, project], emit)
+
+                        profile = self.pgo_profile(module, project, instrumented, opt, module.INITIAL_PATH)
+                        binary  = self.compile('path', project, module.CLANG_CC, f'-fprofile-use=default.profdata {opt}',
+                                               profile=profile)
+
+                        for i, value in pending:
+                            execution_time = self.run_time('path', binary, runs, warmup,
+                                                           (('BENCH_PATH', str(value)),), sampler, True)
+                            self.plan.add_cell([execution_time, project],
+                                               lambda result, project_path, i=i, value=value, emit=emit: emit(result, project_path, i, value))
+
+    def add_path_matrix(self, module, project, program, depth, data_structure, opt, train, values, runs, warmup, sampler):
+        """Células da matriz de PGO: um binário por perfil de treino, medido em cada caminho de teste."""
+        instrumented = self.compile('path', project, module.CLANG_CC, f'-fprofile-generate {opt}')
+
+        for train_i, train_value in train:
+            pending = [(i, value) for i, value in values
+                       if not module.matrix_writer.is_done(program, depth, data_structure, opt, train_i, i)]
+            if not pending:
+                continue
+
+            profile = self.pgo_profile(module, project, instrumented, opt, train_value)
+            binary  = self.compile('path', project, module.CLANG_CC, f'-fprofile-use=default.profdata {opt}',
+                                   profile=profile)
+
+            for i, value in pending:
+                def emit(execution_time, project_path, train_i=train_i, train_value=train_value, i=i, value=value):
+                    module.record_matrix_cell(execution_time, train_i, train_value, i, value, opt, depth, program,
+                                              data_structure, program_store.load_manifest(project_path))
+
+                execution_time = self.run_time('path', binary, runs, warmup, (('BENCH_PATH', str(value)),), sampler, True)
+                self.plan.add_cell([execution_time, project], emit)
+
+    def pgo_profile(self, module, project, instrumented, opt, path_value):
+        """
+        Tarefa que executa o binário instrumentado no caminho de treino (as
+        TRAINING_RUNS execuções de path.py) e gera o .profdata, guardado no
+        cache de perfis de path.py entre execuções.
+        """
+        params = (instrumented.params, path_value)
+
+        def action(project_path, compiled):
+            cached = module.profile_path(program_store.load_manifest(project_path), opt, path_value)
+            if os.path.isfile(cached):
+                return cached
+
+            profile_dir = self.area.mkdtemp(prefix='profile_')
+            try:
+                raw_profiles = module.run_training(compiled['binary'], path_value, profile_dir, cwd=compiled['dir'])
+                return module.merge_profile(raw_profiles, cached)
+            finally:
+                self.area.release(profile_dir)
+
+        return self.plan.add('pgo_profile', params, action, [project, instrumented], user='path')
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+def print_summary(planner):
+    print(f"{'task':<16}{'requested':>10}{'unique':>8}{'shared':>8}")
+    for kind, requested, unique, shared in planner.plan.summary():
+        print(f'{kind:<16}{requested:>10}{unique:>8}{shared:>8}')
+
+def parse_args(argv):
+    """
+    Lê as opções de linha de comando do planejador.
+
+    Parameters:
+        argv (list[str]): Argumentos recebidos, sem o nome do script.
+
+    Returns:
+        argparse.Namespace: Opções interpretadas.
+    """
+    parser = argparse.ArgumentParser(
+        prog='planner.py',
+        description='Executa vários artefatos do BenchGen em um único grafo de tarefas')
+    parser.add_argument('benchGen_root_path', help='Caminho raiz do BenchGen')
+    parser.add_argument('--spec', default=DEFAULT_SPEC,
+                        help='Especificação JSON dos experimentos (padrão: planner/experiments.json)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Só mostra quantas tarefas cada etapa teria, sem executá-las')
+    parser.add_argument('--scratch-dir', default=tempfile.gettempdir(),
+                        help='Diretório onde as pastas de trabalho das tarefas são criadas')
+    parser.add_argument('--ram-workspace', action='store_true',
+                        help='Cria as pastas de trabalho em /dev/shm, usando --scratch-dir quando a memória enche')
+    timing.add_adaptive_arguments(parser)
+    hygiene.add_hygiene_arguments(parser)
+    results.add_output_arguments(parser)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        raise Exception('This script is not compatible with Windows system!')
+
+    args = parse_args(sys.argv[1:])
+    benchGen_root_path = os.path.abspath(args.benchGen_root_path).rstrip('/')
+
+    timing.enable_from_args(args)
+    hygiene.enable_from_args(args)
+
+    spec = load_spec(args.spec)
+    area = workspace.Workspace(args.ram_workspace, disk_root=args.scratch_dir)
+
+    # Sem --resume os CSVs são recriados, então o dry run escreve em uma pasta descartável
+    output_dir = os.path.abspath(args.output_dir)
+    if args.dry_run and not args.resume:
+        output_dir = os.path.join(area.root, 'results')
+    else:
+        spans.enable(output_dir, 'planner')
+
+    planner = Planner(benchGen_root_path, area, output_dir, args.resume)
+
+    try:
+        for artifact in ARTIFACTS:
+            if artifact in spec:
+                getattr(planner, f'add_{artifact}')(spec[artifact])
+
+        print_summary(planner)
+
+        if not args.dry_run:
+            program_store.ensure_benchgen(benchGen_root_path)
+            planner.generate_all()
+            planner.plan.run()
+    finally:
+        planner.close()
+        area.cleanup()